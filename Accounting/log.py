@@ -0,0 +1,94 @@
+"""
+Logging helpers for the Accounting project.
+
+Log records are handed to a queue by the request thread and written to the
+console/rotating file by a background ``QueueListener`` thread, so a slow disk
+never holds up a gunicorn worker.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import queue
+from logging.config import ConvertingList
+from logging.handlers import QueueHandler, QueueListener
+
+# Per-request fields (request_id, method, path, user_id) attached to every
+# record emitted while the request is being handled.
+request_context = contextvars.ContextVar('request_context', default={})
+
+REQUEST_FIELDS = ('request_id', 'method', 'path', 'user_id', 'status', 'duration_ms')
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the current request context onto the record."""
+
+    def filter(self, record):
+        context = request_context.get()
+        for field in REQUEST_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field, '-'))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in REQUEST_FIELDS:
+            value = getattr(record, field, '-')
+            if value != '-':
+                payload[field] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler that owns a QueueListener feeding the given handlers.
+
+    ``handlers`` is a list of ``cfg://handlers.<name>`` references so the
+    target handlers can be declared in the same ``LOGGING`` dict.
+    """
+
+    def __init__(self, handlers, respect_handler_level=True, queue_size=-1):
+        super().__init__(queue.Queue(queue_size))
+        handlers = self._resolve_handlers(handlers)
+        self._listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self._listener.start()
+        atexit.register(self.stop)
+
+    @staticmethod
+    def _resolve_handlers(handlers):
+        if not isinstance(handlers, ConvertingList):
+            return list(handlers)
+        # Indexing a ConvertingList resolves the cfg:// references.
+        return [handlers[i] for i in range(len(handlers))]
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        # The listener thread no longer has the request context, keep the
+        # fields the filter attached in the calling thread.
+        for field in REQUEST_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, '-')
+        return record
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -1,6 +1,7 @@
 # admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count
 from .models import *
 
 class CustomUserAdmin(UserAdmin):
@@ -28,78 +29,32 @@ class BranchAdmin(admin.ModelAdmin):
     ordering = ('-created_date',)
 
 
-@admin.register(IncomeCategory)
-class IncomeCategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'scope', 'branch', 'is_active', 'transaction_count', 'created_by')
-    list_filter = ('scope', 'is_active', 'branch')
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category_type', 'scope', 'branch', 'is_active', 'transaction_count', 'created_by')
+    list_filter = ('category_type', 'scope', 'is_active', 'branch')
     search_fields = ('name', 'description')
     autocomplete_fields = ('branch', 'created_by')
-    ordering = ('name',)
-    
-    def transaction_count(self, obj):
-        """Show number of transactions using this category"""
-        from .models import Transaction
-        count = Transaction.objects.filter(income_category=obj).count()
-        if count > 0:
-            return f"🔒 {count} transaction(s)"
-        return "-"
-    transaction_count.short_description = 'Transactions'
-    
-    def has_delete_permission(self, request, obj=None):
-        """
-        Prevent deletion of income categories used in transactions.
-        """
-        if obj:
-            from .models import Transaction
-            transaction_count = Transaction.objects.filter(income_category=obj).count()
-            if transaction_count > 0:
-                return False
-        return super().has_delete_permission(request, obj)
-    
-    def get_actions(self, request):
-        """
-        Remove bulk delete for categories with transactions.
-        """
-        actions = super().get_actions(request)
-        # Keep the delete action but it will be filtered by has_delete_permission
-        return actions
+    ordering = ('category_type', 'name')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(transaction_total=Count('transactions'))
 
-@admin.register(ExpenditureCategory)
-class ExpenditureCategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'scope', 'branch', 'is_active', 'transaction_count', 'created_by')
-    list_filter = ('scope', 'is_active', 'branch')
-    search_fields = ('name', 'description')
-    autocomplete_fields = ('branch', 'created_by')
-    ordering = ('name',)
-    
     def transaction_count(self, obj):
         """Show number of transactions using this category"""
-        from .models import Transaction
-        count = Transaction.objects.filter(expenditure_category=obj).count()
-        if count > 0:
-            return f"🔒 {count} transaction(s)"
+        if obj.transaction_total > 0:
+            return f"🔒 {obj.transaction_total} transaction(s)"
         return "-"
     transaction_count.short_description = 'Transactions'
-    
+    transaction_count.admin_order_field = 'transaction_total'
+
     def has_delete_permission(self, request, obj=None):
         """
-        Prevent deletion of expenditure categories used in transactions.
+        Prevent deletion of categories used in transactions.
         """
-        if obj:
-            from .models import Transaction
-            transaction_count = Transaction.objects.filter(expenditure_category=obj).count()
-            if transaction_count > 0:
-                return False
+        if obj and obj.transactions.exists():
+            return False
         return super().has_delete_permission(request, obj)
-    
-    def get_actions(self, request):
-        """
-        Remove bulk delete for categories with transactions.
-        """
-        actions = super().get_actions(request)
-        # Keep the delete action but it will be filtered by has_delete_permission
-        return actions
 
 
 @admin.register(FundAllocation)
@@ -133,7 +88,7 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ('branch', 'transaction_type', 'amount', 'date', 'is_fund_allocation', 'created_by', 'created_date')
     list_filter = ('transaction_type', 'branch', 'date')
     search_fields = ('description',)
-    autocomplete_fields = ('branch', 'income_category', 'expenditure_category', 'fund_allocation', 'created_by')
+    autocomplete_fields = ('branch', 'category', 'fund_allocation', 'created_by')
     date_hierarchy = 'date'
     ordering = ('-date', '-created_date')
     
@@ -166,4 +121,77 @@ class TransactionAdmin(admin.ModelAdmin):
         """
         if obj and obj.fund_allocation:
             return [f.name for f in self.model._meta.fields]
-        return super().get_readonly_fields(request, obj)
\ No newline at end of file
+        return super().get_readonly_fields(request, obj)
+
+@admin.register(BranchDailyBalance)
+class BranchDailyBalanceAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'date', 'shard', 'income', 'expenditure', 'closing_balance')
+    list_filter = ('branch',)
+    date_hierarchy = 'date'
+    ordering = ('branch', '-date')
+
+    def has_add_permission(self, request):
+        """Daily balances are maintained from transactions, never entered by hand."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(FiscalPeriod)
+class FiscalPeriodAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date', 'is_closed', 'closed_date', 'closed_by')
+    list_filter = ('is_closed',)
+    ordering = ('-start_date',)
+    readonly_fields = ('is_closed', 'closed_date', 'closed_by', 'created_by', 'created_date')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def has_change_permission(self, request, obj=None):
+        """Closed periods are frozen; periods are closed from the Fiscal Periods page."""
+        if obj and obj.is_closed:
+            return False
+        return super().has_change_permission(request, obj)
+
+@admin.register(PeriodBranchBalance)
+class PeriodBranchBalanceAdmin(admin.ModelAdmin):
+    list_display = ('period', 'branch', 'income', 'expenditure', 'closing_balance')
+    list_filter = ('period', 'branch')
+
+    def has_add_permission(self, request):
+        """Period snapshots are written when the period is closed."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(LedgerCube)
+class LedgerCubeAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'month', 'transaction_type', 'category', 'shard', 'total', 'count')
+    list_filter = ('transaction_type', 'branch')
+    date_hierarchy = 'month'
+
+    def has_add_permission(self, request):
+        """Cube cells are maintained from transactions, never entered by hand."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(SavedReport)
+class SavedReportAdmin(admin.ModelAdmin):
+    list_display = ('name', 'range_type', 'branch', 'report_type', 'is_scheduled', 'created_by')
+    list_filter = ('range_type', 'report_type', 'is_scheduled')
+    search_fields = ('name',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'is_heavy', 'attempts', 'created_by', 'created_date', 'finished_at')
+    list_filter = ('status', 'kind', 'is_heavy')
+    readonly_fields = ('params', 'result', 'error', 'worker', 'started_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        """Jobs are queued from the app; see jobs.enqueue."""
+        return False
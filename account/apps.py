@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AccountConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'account'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import signals, tasks  # noqa: F401
+
+        if settings.SQLITE_TUNING:
+            from .db import configure_sqlite
+            connection_created.connect(configure_sqlite, dispatch_uid='account.configure_sqlite')
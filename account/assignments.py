@@ -0,0 +1,49 @@
+"""
+Bulk assignment of admins to branches.
+
+An assignment edit covers a block of the admin x branch matrix: the admins
+and branches on screen, and the cells ticked within them. The block is
+diffed against the ``Branch.admins`` through table and applied with one
+bulk delete and one ``bulk_create``, however many cells changed; links
+outside the block are left alone.
+"""
+
+from django.db import transaction as db_transaction
+
+from .models import Branch
+
+# Largest block the matrix screen shows at once; filters narrow it further.
+MAX_ADMINS = 100
+MAX_BRANCHES = 40
+
+
+def assign(admin_ids, branch_ids, assigned_pairs):
+    """
+    Make the links between ``admin_ids`` and ``branch_ids`` exactly
+    ``assigned_pairs`` ((admin_id, branch_id) tuples). Returns the numbers
+    of links added and removed.
+    """
+    Membership = Branch.admins.through
+    admin_ids, branch_ids = set(admin_ids), set(branch_ids)
+    wanted = {
+        (admin_id, branch_id) for admin_id, branch_id in assigned_pairs
+        if admin_id in admin_ids and branch_id in branch_ids
+    }
+
+    with db_transaction.atomic():
+        current = {
+            (user_id, branch_id): link_id
+            for link_id, user_id, branch_id in Membership.objects.select_for_update().filter(
+                user_id__in=admin_ids, branch_id__in=branch_ids
+            ).values_list('id', 'user_id', 'branch_id')
+        }
+        removed = [link_id for pair, link_id in current.items() if pair not in wanted]
+        added = [
+            Membership(user_id=admin_id, branch_id=branch_id)
+            for admin_id, branch_id in wanted if (admin_id, branch_id) not in current
+        ]
+        if removed:
+            Membership.objects.filter(id__in=removed).delete()
+        if added:
+            Membership.objects.bulk_create(added, ignore_conflicts=True)
+    return len(added), len(removed)
@@ -0,0 +1,148 @@
+"""
+Sharded balance counters.
+
+A branch's current balance is kept in ``BranchBalanceShard`` rows and is
+their sum (``Branch.get_balance``), so reading it is one indexed sum
+instead of an aggregate over the branch's ledger. The main branch, which
+every allocation, reversal and main-branch expenditure touches, has
+``MAIN_BRANCH_BALANCE_SHARDS`` shards; sub branches have one. A credit
+goes to one shard picked at random and a debit to one shard that covers
+it, so the balance is not a single row every posting has to update.
+
+The no-negative-balance rule is enforced by reservation: a debit takes
+its amount from a single shard that holds enough, with a conditional
+``UPDATE ... WHERE balance >= amount`` that cannot overdraw however many
+run at once. Only when no one shard covers it are all of the branch's
+shards locked and summed; the debit is then refused with
+``InsufficientFunds`` or taken from the total, which is spread back
+evenly across the shards so later debits fit in one again.
+
+The shard a posting changes is also the unit its other ledger writes are
+serialized on: ``apply`` returns it, and the posting's daily balance and
+cube rows are those of that shard (see ledger.py). Its row stays locked
+until the posting commits, so postings that picked different shards run
+in parallel end to end.
+
+Shards are created on first use; ``rebuild`` recomputes them from the
+ledger.
+"""
+
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import F
+
+from .fields import money, to_kobo, to_naira
+from .models import BranchBalanceShard, Transaction
+
+
+class InsufficientFunds(ValidationError):
+    pass
+
+
+def shard_count(branch_type):
+    return settings.MAIN_BRANCH_BALANCE_SHARDS if branch_type == 'main' else 1
+
+
+def _create_shards(branch_id, shards):
+    BranchBalanceShard.objects.bulk_create(
+        [BranchBalanceShard(branch_id=branch_id, shard=shard) for shard in range(shards)],
+        ignore_conflicts=True,
+    )
+
+
+def credit(branch_id, amount, shards):
+    """Add ``amount`` (which may be zero, to just lock a shard) to one shard; returns the shard"""
+    shard = random.randrange(shards)
+    row = BranchBalanceShard.objects.filter(branch_id=branch_id, shard=shard)
+    if not row.update(balance=F('balance') + money(amount)):
+        _create_shards(branch_id, shards)
+        row.update(balance=F('balance') + money(amount))
+    return shard
+
+
+def debit(branch_id, amount, shards, allow_negative=False):
+    """
+    Take ``amount`` from the branch's balance; returns the shard it was
+    taken from. Raises InsufficientFunds if the balance does not cover it,
+    unless ``allow_negative`` (removals of income, which the views have
+    already checked).
+    """
+    start = random.randrange(shards)
+    for offset in range(shards):
+        # Reserve from one shard that holds enough; no lock on the others.
+        shard = (start + offset) % shards
+        if BranchBalanceShard.objects.filter(
+            branch_id=branch_id, shard=shard, balance__gte=amount,
+        ).update(balance=F('balance') - money(amount)):
+            return shard
+
+    # No single shard covers it: lock them all, check the total and rebalance.
+    _create_shards(branch_id, shards)
+    rows = list(BranchBalanceShard.objects.select_for_update().filter(branch_id=branch_id).order_by('shard'))
+    available = sum((row.balance for row in rows), Decimal('0'))
+    if available < amount and not allow_negative:
+        raise InsufficientFunds(
+            f"Insufficient funds. Available balance is ₦{available:,.2f}, "
+            f"but this posting needs ₦{amount:,.2f}."
+        )
+    # Spread what is left evenly; an overdraft (allow_negative) sits in the first shard.
+    remaining = to_kobo(available - amount)
+    even, extra = divmod(max(remaining, 0), len(rows))
+    for index, row in enumerate(rows):
+        row.balance = to_naira(even + (1 if index < extra else 0))
+    if remaining < 0:
+        rows[0].balance = to_naira(remaining)
+    BranchBalanceShard.objects.bulk_update(rows, ['balance'])
+    return rows[0].shard
+
+
+def apply(deltas, branch_types, enforce):
+    """
+    Apply net balance changes (``{branch_id: Decimal}``) inside the caller's
+    transaction; returns ``{branch_id: shard}``, the shard each branch's
+    change went to, which stays locked until the transaction ends (a zero
+    change still locks one). With ``enforce`` a change that would leave a
+    branch negative raises InsufficientFunds.
+    """
+    locked = {}
+    # Branch by branch in pk order, one shard each (or all of one branch's
+    # in shard order), so concurrent postings cannot deadlock.
+    for branch_id, delta in sorted(deltas.items()):
+        shards = shard_count(branch_types.get(branch_id))
+        if delta < 0:
+            locked[branch_id] = debit(branch_id, -delta, shards, allow_negative=not enforce)
+        else:
+            locked[branch_id] = credit(branch_id, delta, shards)
+    return locked
+
+
+def rebuild(branch_ids=None):
+    """
+    Recompute the balance shards from the raw ledger: each branch's balance
+    in its shard 0. The other shards are zeroed, not deleted, since they
+    enumerate the shards of the daily balance rows (see
+    ``BranchDailyBalance.balance_as_of``).
+    """
+    transactions = Transaction.objects.all()
+    shards = BranchBalanceShard.objects.all()
+    if branch_ids is not None:
+        transactions = transactions.filter(branch_id__in=branch_ids)
+        shards = shards.filter(branch_id__in=branch_ids)
+
+    with db_transaction.atomic():
+        shards.update(balance=0)
+        rows = transactions.values('branch_id').annotate(
+            **Transaction.objects.ledger_aggregates()
+        ).order_by()
+        BranchBalanceShard.objects.bulk_create([
+            BranchBalanceShard(
+                branch_id=row['branch_id'],
+                shard=0,
+                balance=(row['income'] or 0) - (row['expenditure'] or 0),
+            )
+            for row in rows
+        ], batch_size=1000, update_conflicts=True, unique_fields=['branch', 'shard'], update_fields=['balance'])
@@ -0,0 +1,23 @@
+"""
+Database connection helpers.
+"""
+
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Run ``PRAGMA name=value`` for each configured pragma."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver enabling WAL journaling and the other
+    SQLITE_PRAGMAS so readers no longer block behind writers and concurrent
+    writers wait for the lock instead of failing with "database is locked".
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, settings.SQLITE_PRAGMAS)
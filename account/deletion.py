@@ -0,0 +1,188 @@
+"""
+Background deletion of branches and users.
+
+Deleting a branch or a user cascades through every transaction it owns,
+which for a busy one holds the database for minutes. Instead the request
+only marks it ``pending_deletion`` and queues a job (see tasks.py):
+
+* The default managers hide pending branches and users at once. A pending
+  branch is deactivated without flipping ``Transaction.branch_active`` on
+  all its postings in the request; the job does that first, in chunks, so
+  reports drop them without one long write.
+* The job removes the dependent rows ``DELETION_CHUNK_SIZE`` at a time, one
+  short transaction per chunk, applying each chunk's ledger deltas and
+  allocation counters as it goes, and deletes the object itself last. For
+  a branch that includes other branches' postings in its categories, which
+  the final delete would otherwise cascade to behind the ledger's back.
+* Every chunk commits on its own, so a retried job resumes where the
+  failed attempt stopped. Chunks are read with ``select_for_update(
+  skip_locked=True)``, so two attempts never remove (and apply the
+  deltas of) the same rows.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import F, Min, Q
+
+from . import jobs, ledger, report_cache
+from .fields import money
+from .models import (
+    Branch, BranchBalanceShard, BranchDailyBalance, FiscalPeriod, FundAllocation, LedgerCube,
+    PeriodBranchBalance, PeriodCategoryTotal, Transaction, User,
+)
+
+
+def user_transactions(user_id):
+    """Transactions a user's deletion removes: theirs and those on their categories or allocations"""
+    return Transaction.objects.filter(
+        Q(created_by_id=user_id)
+        | Q(category__created_by_id=user_id)
+        | Q(fund_allocation__allocated_by_id=user_id)
+    )
+
+
+def category_transactions(branch_id):
+    """
+    Postings on other branches filed under the branch's own categories.
+    Deleting the branch cascades to its categories and from them to these,
+    so the job removes them first, with their ledger deltas.
+    """
+    return Transaction.objects.filter(category__branch_id=branch_id).exclude(branch_id=branch_id)
+
+
+def check_branch(branch_id):
+    """Raise ValidationError if deleting the branch would remove other branches' postings in a closed period"""
+    FiscalPeriod.check_open(category_transactions(branch_id).aggregate(Min('date'))['date__min'])
+
+
+def check_user(user_id):
+    """Raise ValidationError if deleting the user would remove postings in a closed period"""
+    FiscalPeriod.check_open(user_transactions(user_id).aggregate(Min('date'))['date__min'])
+
+
+def start(obj, requested_by):
+    """Hide ``obj`` (a Branch or User) and queue its deletion; returns the job"""
+    with db_transaction.atomic():
+        obj.pending_deletion = True
+        if isinstance(obj, Branch):
+            obj.is_active = False
+            # Not save(): that would flip branch_active on every posting at once.
+            Branch.all_objects.filter(pk=obj.pk).update(pending_deletion=True, is_active=False)
+            obj._saved_is_active = False
+            db_transaction.on_commit(report_cache.bump_ledger_version)
+            kind, name = 'delete_branch', obj.name
+        else:
+            obj.save(update_fields=['pending_deletion'])
+            kind, name = 'delete_user', obj.get_full_name() or obj.username
+        return jobs.enqueue(
+            kind, requested_by, {'id': obj.pk, 'name': name},
+            timeout_seconds=settings.DELETION_TIMEOUT_SECONDS,
+        )
+
+
+def delete_transactions(queryset, progress, apply_ledger=True):
+    """Delete ``queryset`` chunk by chunk; returns the number of transactions removed."""
+    deleted = 0
+    while True:
+        with db_transaction.atomic():
+            # Locked, so an overlapping attempt of the same job (or another
+            # deletion) skips these rows instead of applying their deltas twice.
+            # SQLite has no row locks but takes its write lock up front.
+            states = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .order_by('pk').values('pk', *Transaction.LEDGER_FIELDS)[:settings.DELETION_CHUNK_SIZE]
+            )
+            if not states:
+                return deleted
+            if apply_ledger:
+                ledger.record_bulk_delete(states)
+            chunk = Transaction.objects.filter(pk__in=[state['pk'] for state in states])
+            # No per-row signals: the chunk's ledger deltas were applied above
+            # and no table references transactions.
+            chunk._raw_delete(chunk.db)
+        deleted += len(states)
+        progress(deleted)
+
+
+def delete_allocations(queryset):
+    """Delete allocations (their transactions already removed), releasing active ones' allocated funds"""
+    deleted = 0
+    while True:
+        with db_transaction.atomic():
+            rows = list(queryset.select_for_update(skip_locked=True, of=('self',)).order_by('pk').values_list(
+                'pk', 'to_branch_id', 'amount', 'is_active', 'from_branch__branch_type'
+            )[:settings.DELETION_CHUNK_SIZE])
+            if not rows:
+                return deleted
+            released = defaultdict(Decimal)
+            for _, to_branch_id, amount, is_active, from_branch_type in rows:
+                # Only an active allocation out of the main branch is counted in allocated_funds.
+                if is_active and from_branch_type == 'main':
+                    released[to_branch_id] += amount
+            for branch_id, amount in released.items():
+                Branch.all_objects.filter(pk=branch_id).update(allocated_funds=F('allocated_funds') - money(amount))
+            chunk = FundAllocation.objects.filter(pk__in=[row[0] for row in rows])
+            chunk._raw_delete(chunk.db)
+        deleted += len(rows)
+
+
+def hide_transactions(branch_id):
+    """Clear branch_active on a pending branch's postings, one short transaction per chunk"""
+    while True:
+        with db_transaction.atomic():
+            chunk = list(Transaction.objects.filter(branch_id=branch_id, branch_active=True).order_by('pk').values_list(
+                'pk', flat=True
+            )[:settings.DELETION_CHUNK_SIZE])
+            if not chunk:
+                break
+            Transaction.objects.filter(pk__in=chunk).update(branch_active=False)
+            db_transaction.on_commit(report_cache.bump_ledger_version)
+
+
+def delete_branch(branch_id, progress):
+    """
+    Remove a pending branch: hide its postings, remove other branches'
+    postings in its categories (with their ledger deltas), drop its derived
+    rows, then its transactions and itself.
+    """
+    try:
+        check_branch(branch_id)
+    except ValidationError as e:
+        # A period was closed after the deletion was requested: keep the branch, inactive.
+        Branch.all_objects.filter(pk=branch_id).update(pending_deletion=False)
+        hide_transactions(branch_id)
+        return {'cancelled': e.messages[0]}
+    hide_transactions(branch_id)
+    # The final delete would cascade to these through the categories
+    # without touching the other branches' balances, daily rows or cube.
+    moved = delete_transactions(category_transactions(branch_id), progress)
+
+    with db_transaction.atomic():
+        for model in (BranchBalanceShard, BranchDailyBalance, LedgerCube, PeriodBranchBalance, PeriodCategoryTotal):
+            model.objects.filter(branch_id=branch_id).delete()
+        db_transaction.on_commit(report_cache.bump_ledger_version)
+
+    # The branch's own derived rows are gone, so there is no ledger to apply.
+    deleted = delete_transactions(
+        Transaction.objects.filter(branch_id=branch_id), lambda count: progress(moved + count), apply_ledger=False,
+    )
+    Branch.all_objects.filter(pk=branch_id, pending_deletion=True).delete()
+    return {'transactions': moved + deleted}
+
+
+def delete_user(user_id, progress):
+    """Remove a pending user: their transactions (with ledger deltas), allocations, then the user"""
+    try:
+        check_user(user_id)
+    except ValidationError as e:
+        # A period was closed after the deletion was requested: keep the user.
+        User.all_objects.filter(pk=user_id).update(pending_deletion=False)
+        return {'cancelled': e.messages[0]}
+    deleted = delete_transactions(user_transactions(user_id), progress)
+    allocations = delete_allocations(FundAllocation.objects.filter(allocated_by_id=user_id))
+    User.all_objects.filter(pk=user_id, pending_deletion=True).delete()
+    return {'transactions': deleted, 'allocations': allocations}
@@ -0,0 +1,41 @@
+"""
+JSON encoding that round-trips the types report pages compare and format.
+
+Plain JSON turns Decimal and dates into strings, which breaks template
+comparisons such as ``net_balance >= 0`` and the ``date`` filter. These are
+stored as tagged objects instead and restored on load.
+"""
+
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class ReportJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return {'__decimal__': str(o)}
+        if isinstance(o, datetime.datetime):
+            return {'__datetime__': o.isoformat()}
+        if isinstance(o, datetime.date):
+            return {'__date__': o.isoformat()}
+        return super().default(o)
+
+
+class ReportJSONDecoder(json.JSONDecoder):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('object_hook', self.object_hook)
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def object_hook(obj):
+        if len(obj) == 1:
+            if '__decimal__' in obj:
+                return Decimal(obj['__decimal__'])
+            if '__datetime__' in obj:
+                return datetime.datetime.fromisoformat(obj['__datetime__'])
+            if '__date__' in obj:
+                return datetime.date.fromisoformat(obj['__date__'])
+        return obj
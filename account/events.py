@@ -0,0 +1,127 @@
+"""
+In-process event broadcaster for live dashboard updates.
+
+One broadcaster per worker process. Postings, edits and deletions publish
+small delta events once; every connected dashboard stream (see ``views.dashboard_events``)
+receives it on its own asyncio queue, so N open dashboards cost one
+broadcast instead of N aggregate recomputations.
+"""
+
+import asyncio
+import threading
+
+from .models import Branch
+
+
+class Subscription:
+    def __init__(self, loop, branch_id=None, maxsize=100):
+        self.loop = loop
+        self.branch_id = branch_id
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def wants(self, event):
+        return self.branch_id is None or event.get('branch_id') == self.branch_id
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop the event rather than buffer without bound.
+            pass
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, branch_id=None):
+        """Subscribe the running event loop; ``branch_id=None`` receives everything."""
+        subscription = Subscription(asyncio.get_running_loop(), branch_id)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Thread-safe: may be called from sync request threads."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.wants(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Event loop already closed; the stream is gone.
+                self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+
+broadcaster = Broadcaster()
+
+
+def transaction_events(transaction, action, old_state=None):
+    """
+    Events for a posting that was ``created``, ``updated`` or ``deleted``.
+    Each carries a signed ``amount`` to add to the dashboard totals: a
+    deletion takes the posting off, an edit takes the old posting off and
+    adds the new one (as the ledger does). Only the added side carries the
+    row to show in the recent transactions.
+    """
+    events = []
+    if old_state is not None:
+        old_branch = transaction.branch
+        if old_state['branch_id'] != transaction.branch_id:
+            old_branch = Branch.all_objects.get(pk=old_state['branch_id'])
+        if old_branch.is_active:
+            events.append({
+                'type': 'transaction',
+                # Moved to another branch: gone from the old branch's dashboard.
+                'action': action if old_branch.pk == transaction.branch_id else 'deleted',
+                'id': transaction.id,
+                'branch_id': old_branch.pk,
+                'is_main': old_branch.is_main_branch,
+                'transaction_type': old_state['transaction_type'],
+                'amount': -old_state['amount'],
+                'transaction': None,
+            })
+    if action != 'deleted' and transaction.branch.is_active:
+        category = transaction.category
+        moved = old_state is not None and old_state['branch_id'] != transaction.branch_id
+        events.append({
+            'type': 'transaction',
+            'action': 'created' if moved else action,
+            'id': transaction.id,
+            'branch_id': transaction.branch_id,
+            'is_main': transaction.branch.is_main_branch,
+            'transaction_type': transaction.transaction_type,
+            # Previous values unknown (deferred load): only the row is refreshed.
+            'amount': transaction.amount if action == 'created' or old_state is not None else 0,
+            'transaction': {
+                'id': transaction.id,
+                'date': transaction.date,
+                'branch': transaction.branch.name,
+                'description': transaction.description,
+                'transaction_type': transaction.transaction_type,
+                'amount': transaction.amount,
+                'category': category.name if category else None,
+            },
+        })
+    return events
+
+
+def allocation_event(allocation):
+    # Reversals move funds back to the main branch and reduce allocated funds.
+    returned = allocation.to_branch.is_main_branch
+    return {
+        'type': 'allocation',
+        'branch_id': allocation.from_branch_id if returned else allocation.to_branch_id,
+        'allocated_delta': -allocation.amount if returned else allocation.amount,
+    }
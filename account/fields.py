@@ -0,0 +1,73 @@
+"""
+Money stored as whole kobo.
+
+``MoneyField`` keeps amounts in a ``BigIntegerField`` column as kobo (1/100
+naira), so the database adds integers: ``SUM`` is exact and, on SQLite,
+avoids the REAL arithmetic and per-row text conversion of a decimal
+column. In Python the value is a two-place ``Decimal`` in naira, so forms,
+templates, the ``₦`` formatting and lookups such as ``amount__gte=50`` are
+unchanged. Aggregates over a money column (``Sum('amount')``) come back in
+naira too.
+
+Arithmetic in the database must stay in kobo: wrap naira values with
+``money()`` when combining them with a money column in an expression, e.g.
+``update(allocated_funds=F('allocated_funds') - money(amount))``.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models import Value
+
+KOBO_PER_NAIRA = 100
+CENT = Decimal('0.01')
+
+
+def to_kobo(amount):
+    """Naira (Decimal, int or numeric string) as whole kobo, rounded half up"""
+    return int((Decimal(str(amount)) * KOBO_PER_NAIRA).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_naira(kobo):
+    return (Decimal(kobo) / KOBO_PER_NAIRA).quantize(CENT)
+
+
+class MoneyField(models.BigIntegerField):
+    description = 'Amount in naira, stored as whole kobo'
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        try:
+            return to_kobo(value)
+        except (InvalidOperation, TypeError, ValueError) as e:
+            raise ValueError(f"Field '{self.name}' expected a number but got {value!r}.") from e
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else to_naira(value)
+
+    def to_python(self, value):
+        if value is None:
+            return None
+        try:
+            return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+        except (InvalidOperation, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages['invalid'], code='invalid', params={'value': value},
+            )
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'max_digits': 15,
+            'decimal_places': 2,
+            **kwargs,
+        })
+
+
+def money(amount):
+    """``amount`` in naira as a kobo-valued expression, for arithmetic on money columns"""
+    return Value(amount, output_field=MoneyField())
@@ -103,6 +103,15 @@ class BranchAdminForm(forms.Form):
         )
         return user
 
+class BranchAdminImportForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'}))
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if upload.size > 5 * 1024 * 1024:
+            raise forms.ValidationError("The file is larger than 5 MB; split it.")
+        return upload
+
 class BranchAdminAssignmentForm(forms.Form):
     branch = forms.ModelChoiceField(
         queryset=Branch.objects.filter(is_active=True),
@@ -168,16 +177,27 @@ class FundAllocationForm(forms.ModelForm):
         return cleaned_data
 
 class TransactionForm(forms.ModelForm):
+    # One select per kind, as before the categories were unified; clean()
+    # stores the one matching the transaction type in ``category``.
+    income_category = forms.ModelChoiceField(
+        queryset=IncomeCategory.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        required=False
+    )
+    expenditure_category = forms.ModelChoiceField(
+        queryset=ExpenditureCategory.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        required=False
+    )
+
     class Meta:
         model = Transaction
-        fields = ['transaction_type', 'amount', 'description', 'date', 'income_category', 'expenditure_category']
+        fields = ['transaction_type', 'amount', 'description', 'date']
         widgets = {
             'transaction_type': forms.Select(attrs={'class': 'form-control'}),
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
-            'income_category': forms.Select(attrs={'class': 'form-control'}),
-            'expenditure_category': forms.Select(attrs={'class': 'form-control'}),
         }
 
     def __init__(self, *args, **kwargs):
@@ -195,7 +215,10 @@ class TransactionForm(forms.ModelForm):
                 args = (mutable_data,) + args[1:]
         
         super().__init__(*args, **kwargs)
-        
+
+        if self.instance.category_id:
+            self.initial.setdefault(f'{self.instance.transaction_type}_category', self.instance.category_id)
+
         # Store user for use in clean method
         self.user = user
 
@@ -250,6 +273,17 @@ class TransactionForm(forms.ModelForm):
             if transaction_type == 'income':
                 raise forms.ValidationError("Branch administrators can only add expenditure transactions. Income can only be added by the main administrator.")
         
+        transaction_type = cleaned_data.get('transaction_type')
+        if transaction_type in ('income', 'expenditure'):
+            self.instance.category = cleaned_data.get(f'{transaction_type}_category')
+
+        # Back-dated postings cannot land in a closed fiscal period
+        from django.core.exceptions import ValidationError
+        try:
+            FiscalPeriod.check_open(cleaned_data.get('date'))
+        except ValidationError as e:
+            raise forms.ValidationError(e.messages)
+
         # Add balance validation for expenditure transactions
         # PREVENT NEGATIVE BALANCES - No expenditure should exceed available balance
         transaction_type = cleaned_data.get('transaction_type')
@@ -321,3 +355,33 @@ class ExpenditureCategoryForm(forms.ModelForm):
                 required=False,
                 help_text='Leave empty for global categories'
             )
+
+class FiscalPeriodForm(forms.ModelForm):
+    class Meta:
+        model = FiscalPeriod
+        fields = ['name', 'start_date', 'end_date']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. January 2025'}),
+            'start_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        }
+
+class SavedReportForm(forms.ModelForm):
+    class Meta:
+        model = SavedReport
+        fields = ['name', 'range_type', 'start_date', 'end_date', 'branch', 'report_type', 'is_scheduled']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. Monthly overview'}),
+            'range_type': forms.Select(attrs={'class': 'form-control'}),
+            'start_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'report_type': forms.Select(attrs={'class': 'form-control'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        self.fields['branch'].queryset = Branch.objects.filter(is_active=True)
+        if user and user.user_type != 'super_admin':
+            # Branch admins always report on their own branch
+            del self.fields['branch']
@@ -0,0 +1,37 @@
+"""
+Password hashing across cores.
+
+The configured hasher (PBKDF2 by default) is CPU-bound by design, so hashing
+many passwords at once, as bulk onboarding does, is spread over a process
+pool of ``PASSWORD_HASH_WORKERS`` at full hasher strength. Spawned children
+import this module before Django is set up, so it must not import models.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# Below this many passwords, starting the pool costs more than it saves.
+POOL_MIN_PASSWORDS = 8
+
+
+def _init_worker():
+    # make_password needs the settings (PASSWORD_HASHERS) and the app registry.
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords):
+    """``make_password`` for each password, in order"""
+    passwords = list(passwords)
+    workers = settings.PASSWORD_HASH_WORKERS
+    if workers <= 1 or len(passwords) < POOL_MIN_PASSWORDS:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(passwords)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
@@ -0,0 +1,162 @@
+"""
+Lightweight database-backed job queue.
+
+Work that is too slow for a request (long-range reports, exports, bulk
+imports) is stored as a ``Job`` row and picked up by ``manage.py runjobs``,
+which runs jobs on a thread pool. There is no broker: workers claim queued
+rows with a conditional UPDATE, so any number of worker processes can share
+the table.
+
+* Handlers register with ``@job_handler(kind)`` (see tasks.py), take the
+  job and return a JSON-serializable result; they may also save a file to
+  ``job.result_file``.
+* A failed attempt is retried with exponential backoff until
+  ``max_attempts``.
+* A worker renews a lease (``heartbeat_at``) on its running jobs every
+  poll. A job is only taken back from a worker whose lease has lapsed
+  (``JOB_LEASE_SECONDS``), i.e. one that died, so an attempt that is still
+  running is never run a second time alongside itself.
+* A thread cannot be killed, so ``timeout_seconds`` is enforced by the
+  handler: long handlers call ``check_timeout(job)`` between units of work
+  and the attempt is failed (and retried) once it stops.
+* At most ``JOB_MAX_HEAVY`` heavy jobs run at once across all workers, so
+  they cannot starve the database or the interactive traffic.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+class JobTimedOut(Exception):
+    pass
+
+
+def job_handler(kind, heavy=False):
+    def register(func):
+        _handlers[kind] = (func, heavy)
+        return func
+    return register
+
+
+def enqueue(kind, user, params=None, timeout_seconds=None, max_attempts=None):
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        created_by=user,
+        is_heavy=_handlers[kind][1],
+        timeout_seconds=timeout_seconds or settings.JOB_TIMEOUT_SECONDS,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=timezone.now(),
+    )
+
+
+def heavy_running():
+    return Job.objects.filter(status='running', is_heavy=True).count()
+
+
+def claim(worker, allow_heavy=True):
+    """Claim the next runnable job for ``worker``, or return None."""
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_after__lte=now)
+    if not allow_heavy or heavy_running() >= settings.JOB_MAX_HEAVY:
+        candidates = candidates.filter(is_heavy=False)
+
+    for job_id, is_heavy in candidates.order_by('run_after', 'id').values_list('id', 'is_heavy')[:20]:
+        claimed = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            continue  # Another worker got it first.
+        if is_heavy and heavy_running() > settings.JOB_MAX_HEAVY:
+            # Another worker claimed a heavy job at the same moment; hand this one back.
+            Job.objects.filter(pk=job_id).update(
+                status='queued', worker='', started_at=None, heartbeat_at=None, attempts=F('attempts') - 1,
+            )
+            continue
+        return Job.objects.get(pk=job_id)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record its outcome."""
+    attempt = job.attempts
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind {job.kind!r}")
+        result = handler[0](job)
+    except JobTimedOut as e:
+        logger.warning('Job #%s (%s) attempt %s timed out', job.id, job.kind, attempt)
+        _fail(job, attempt, str(e))
+    except Exception:
+        logger.exception('Job #%s (%s) attempt %s failed', job.id, job.kind, attempt)
+        _fail(job, attempt, traceback.format_exc())
+    else:
+        finished = Job.objects.filter(pk=job.pk, status='running', attempts=attempt).update(
+            status='succeeded',
+            result=result,
+            result_file=job.result_file.name or '',
+            finished_at=timezone.now(),
+            error='',
+        )
+        if not finished:
+            logger.warning('Job #%s (%s) finished after losing its lease; result discarded', job.id, job.kind)
+    finally:
+        close_old_connections()
+
+
+def _fail(job, attempt, error, running=None):
+    if running is None:
+        running = Job.objects.filter(pk=job.pk, status='running', attempts=attempt)
+    if attempt < job.max_attempts:
+        delay = settings.JOB_RETRY_DELAY_SECONDS * 2 ** (attempt - 1)
+        running.update(status='queued', worker='', heartbeat_at=None, error=error,
+                       run_after=timezone.now() + timedelta(seconds=delay))
+    else:
+        running.update(status='failed', error=error, finished_at=timezone.now())
+
+
+def check_timeout(job):
+    """Raise JobTimedOut once ``job`` has run past its timeout; called by long handlers"""
+    if job.started_at + timedelta(seconds=job.timeout_seconds) < timezone.now():
+        raise JobTimedOut(f"Timed out after {job.timeout_seconds} seconds.")
+
+
+def heartbeat(worker, job_ids):
+    """Renew ``worker``'s lease on its running jobs"""
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status='running', worker=worker).update(heartbeat_at=timezone.now())
+
+
+def _lease_lapsed(now):
+    cutoff = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    return Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+
+
+def reap_expired():
+    """Retry (or fail) running jobs whose worker stopped renewing their lease, i.e. died."""
+    now = timezone.now()
+    reaped = 0
+    for job in Job.objects.filter(_lease_lapsed(now), status='running').only(
+        'id', 'kind', 'worker', 'attempts', 'max_attempts'
+    ):
+        # Re-checked in the update, so a lease renewed meanwhile is kept.
+        running = Job.objects.filter(_lease_lapsed(now), pk=job.pk, status='running', attempts=job.attempts)
+        logger.warning('Job #%s (%s) lost its worker %s', job.id, job.kind, job.worker)
+        _fail(job, job.attempts, f"Worker {job.worker} stopped responding.", running)
+        reaped += 1
+    return reaped
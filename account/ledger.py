@@ -0,0 +1,239 @@
+"""
+Incremental maintenance of the tables derived from ``Transaction``.
+
+Every posting, edit and deletion is turned into signed ledger entries
+(a deletion is the posting with a negative amount, an edit is the old
+posting removed plus the new one added) and applied to the maintained
+tables inside the same database transaction as the change itself:
+
+* ``BranchDailyBalance``: per-branch daily totals and closing balance.
+* ``LedgerCube``: per-branch, per-category monthly totals.
+* ``BranchBalanceShard``: each branch's current balance (see balances.py).
+  Postings checked for the no-negative-balance rule (``enforce_balance``)
+  are refused there with ``InsufficientFunds``.
+
+The branch rows are only share-locked (``Branch.lock_for_posting``); what
+serializes postings is the balance shard each one changes, which stays
+locked until it commits. The daily balance and cube rows are kept per
+shard and a posting writes those of its shard only, so postings to one
+branch that picked different shards touch no common row. A transaction
+that posts to a branch more than once should do so in one
+``apply_entries`` call, or it may hold two of its shards.
+"""
+
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction as db_transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from . import balances, report_cache
+from .fields import money
+from .models import Branch, BranchDailyBalance, FiscalPeriod, LedgerCube, Transaction
+
+LedgerEntry = namedtuple('LedgerEntry', Transaction.LEDGER_FIELDS + ('count',))
+
+_date_field = models.DateField()
+
+
+def _entry(state, sign):
+    return LedgerEntry(
+        branch_id=state['branch_id'],
+        date=_date_field.to_python(state['date']),
+        transaction_type=state['transaction_type'],
+        amount=Decimal(str(state['amount'])) * sign,
+        category_id=state['category_id'],
+        count=sign,
+    )
+
+
+def _current_state(instance):
+    return {field: getattr(instance, field) for field in Transaction.LEDGER_FIELDS}
+
+
+def record_save(instance, created):
+    new_state = _current_state(instance)
+    if created:
+        apply_entries([_entry(new_state, 1)], enforce_balance=True)
+        return
+
+    old_state = getattr(instance, '_ledger_state', None)
+    if old_state is None or set(old_state) != set(new_state):
+        # Previous values unknown (deferred or hand-built instance): rebuild.
+        rebuild_daily_balances([new_state['branch_id']])
+        rebuild_cube([new_state['branch_id']])
+        balances.rebuild([new_state['branch_id']])
+        return
+    if old_state != new_state:
+        apply_entries([_entry(old_state, -1), _entry(new_state, 1)], enforce_balance=True)
+
+
+def record_delete(instance):
+    apply_entries([_entry(_current_state(instance), -1)])
+
+
+def record_bulk_delete(states):
+    """Remove many postings at once; ``states`` hold each one's LEDGER_FIELDS."""
+    apply_entries([_entry(state, -1) for state in states])
+
+
+def apply_entries(entries, enforce_balance=False):
+    """
+    Apply signed ledger entries to every maintained table. With
+    ``enforce_balance`` a branch the entries would leave negative raises
+    InsufficientFunds (deletions are checked by their views instead).
+    """
+    daily = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    cube = defaultdict(lambda: [Decimal('0'), 0])
+    for entry in entries:
+        totals = daily[(entry.branch_id, entry.date)]
+        totals[0 if entry.transaction_type == 'income' else 1] += entry.amount
+
+        cell = cube[(
+            entry.branch_id, entry.date.replace(day=1), entry.transaction_type, entry.category_id,
+        )]
+        cell[0] += entry.amount
+        cell[1] += entry.count
+
+    with db_transaction.atomic():
+        # Shared: holds off (de)activation and period close, not other postings.
+        branches = Branch.lock_for_posting(branch_id for branch_id, _ in daily)
+        branch_types = {pk: branch_type for pk, (branch_type, _) in branches.items()}
+        # Checked under the lock, so a posting cannot race a period close.
+        FiscalPeriod.check_open(*(date for _, date in daily))
+
+        deltas = defaultdict(Decimal)
+        for (branch_id, _), (income, expenditure) in daily.items():
+            deltas[branch_id] += income - expenditure
+        shards = balances.apply(deltas, branch_types, enforce=enforce_balance)
+
+        for (branch_id, date), (income, expenditure) in sorted(daily.items()):
+            if income or expenditure:
+                _apply_daily_balance(branch_id, shards[branch_id], date, income, expenditure)
+
+        for cell, (total, count) in cube.items():
+            if total or count:
+                _apply_cube_cell(shards[cell[0]], cell, total, count)
+
+        db_transaction.on_commit(report_cache.bump_ledger_version)
+
+
+def _apply_daily_balance(branch_id, shard, date, income, expenditure):
+    delta = income - expenditure
+    rows = BranchDailyBalance.objects.filter(branch_id=branch_id, shard=shard)
+    day = rows.filter(date=date)
+    changes = {
+        'income': F('income') + money(income),
+        'expenditure': F('expenditure') + money(expenditure),
+        'closing_balance': F('closing_balance') + money(delta),
+    }
+    if not day.update(**changes):
+        previous = rows.filter(date__lt=date).order_by('-date').values_list('closing_balance', flat=True).first()
+        try:
+            with db_transaction.atomic():
+                BranchDailyBalance.objects.create(
+                    branch_id=branch_id,
+                    shard=shard,
+                    date=date,
+                    income=income,
+                    expenditure=expenditure,
+                    closing_balance=(previous or Decimal('0')) + delta,
+                )
+        except IntegrityError:
+            # Created concurrently; apply as an update instead.
+            day.update(**changes)
+
+    if delta:
+        # Back-dated posting: ripple the change through the shard's later days in one statement.
+        rows.filter(date__gt=date).update(closing_balance=F('closing_balance') + money(delta))
+
+
+def _apply_cube_cell(shard, cell, total, count):
+    branch_id, month, transaction_type, category_id = cell
+    cells = LedgerCube.objects.filter(
+        branch_id=branch_id,
+        month=month,
+        transaction_type=transaction_type,
+        category_id=category_id,
+    )
+    row = cells.filter(shard=shard)
+    changes = {'total': F('total') + money(total), 'count': F('count') + count}
+    if row.update(**changes):
+        return
+    if count < 0 and not cells.exists():
+        # A removal never creates a cell that is missing from every shard:
+        # it was deleted along with its category or branch.
+        return
+    try:
+        with db_transaction.atomic():
+            LedgerCube.objects.create(
+                branch_id=branch_id,
+                shard=shard,
+                month=month,
+                transaction_type=transaction_type,
+                category_id=category_id,
+                total=total,
+                count=count,
+            )
+    except IntegrityError:
+        # Created concurrently; apply as an update instead.
+        row.update(**changes)
+
+
+def rebuild_daily_balances(branch_ids=None, batch_size=1000):
+    """Recompute the daily balance table from the raw ledger, all in shard 0."""
+    transactions = Transaction.objects.all()
+    balances = BranchDailyBalance.objects.all()
+    if branch_ids is not None:
+        transactions = transactions.filter(branch_id__in=branch_ids)
+        balances = balances.filter(branch_id__in=branch_ids)
+
+    with db_transaction.atomic():
+        balances.delete()
+        rows = transactions.values('branch_id', 'date').annotate(
+            **Transaction.objects.ledger_aggregates()
+        ).order_by('branch_id', 'date')
+
+        batch = []
+        branch_id, closing_balance = None, Decimal('0')
+        for row in rows.iterator(chunk_size=batch_size):
+            if row['branch_id'] != branch_id:
+                branch_id, closing_balance = row['branch_id'], Decimal('0')
+            income = row['income'] or Decimal('0')
+            expenditure = row['expenditure'] or Decimal('0')
+            closing_balance += income - expenditure
+            batch.append(BranchDailyBalance(
+                branch_id=branch_id,
+                date=row['date'],
+                income=income,
+                expenditure=expenditure,
+                closing_balance=closing_balance,
+            ))
+            if len(batch) >= batch_size:
+                BranchDailyBalance.objects.bulk_create(batch)
+                batch = []
+        BranchDailyBalance.objects.bulk_create(batch)
+
+
+def rebuild_cube(branch_ids=None, batch_size=1000):
+    """Recompute the ledger cube from the raw ledger, all in shard 0."""
+    transactions = Transaction.objects.all()
+    cells = LedgerCube.objects.all()
+    if branch_ids is not None:
+        transactions = transactions.filter(branch_id__in=branch_ids)
+        cells = cells.filter(branch_id__in=branch_ids)
+
+    with db_transaction.atomic():
+        cells.delete()
+        rows = transactions.annotate(month=TruncMonth('date')).values(
+            'branch_id', 'month', 'transaction_type', 'category_id'
+        ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(LedgerCube(**row))
+            if len(batch) >= batch_size:
+                LedgerCube.objects.bulk_create(batch)
+                batch = []
+        LedgerCube.objects.bulk_create(batch)
@@ -0,0 +1,76 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from account.fields import to_naira
+
+
+class Command(BaseCommand):
+    help = (
+        'Money storage benchmark: SUM over a decimal (NUMERIC) amount column vs. '
+        'a whole-kobo INTEGER column, on the same rows, with the drift of each from the exact total.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--branches', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(path)
+            conn.execute(
+                'CREATE TABLE ledger (id INTEGER PRIMARY KEY, branch_id INTEGER, '
+                'amount NUMERIC, amount_kobo INTEGER)'
+            )
+            rng = random.Random(0)
+            exact = Decimal('0')
+            batch = []
+            for i in range(options['rows']):
+                kobo = rng.randint(1, 5000000)
+                exact += to_naira(kobo)
+                # Decimal columns are written as text, the way Django's SQLite backend does.
+                batch.append((i % options['branches'], str(to_naira(kobo)), kobo))
+                if len(batch) >= 10000:
+                    conn.executemany('INSERT INTO ledger (branch_id, amount, amount_kobo) VALUES (?, ?, ?)', batch)
+                    batch = []
+            conn.executemany('INSERT INTO ledger (branch_id, amount, amount_kobo) VALUES (?, ?, ?)', batch)
+            conn.execute('CREATE INDEX ledger_branch ON ledger (branch_id)')
+            conn.commit()
+
+            for label, sql, to_decimal in (
+                ('decimal column', 'SELECT SUM(amount) FROM ledger', lambda value: Decimal(str(value)).quantize(Decimal('0.01'))),
+                ('kobo column', 'SELECT SUM(amount_kobo) FROM ledger', to_naira),
+            ):
+                total_time, grouped_time = self._time(conn, sql, options['repeat'])
+                total = to_decimal(conn.execute(sql).fetchone()[0])
+                self.stdout.write(
+                    f'{label:<16} SUM: {total_time * 1000:>8.1f} ms  '
+                    f'SUM per branch: {grouped_time * 1000:>8.1f} ms  '
+                    f'total: {total:>20,}  drift: {total - exact}'
+                )
+            conn.close()
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def _time(conn, sql, repeat):
+        """Best of ``repeat`` runs of ``sql``, plain and grouped by branch"""
+        grouped = sql.replace(') FROM ledger', '), branch_id FROM ledger GROUP BY branch_id')
+        timings = []
+        for query in (sql, grouped):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(query).fetchall()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        return timings
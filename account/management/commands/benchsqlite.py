@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from account.db import apply_sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrency benchmark: writer threads posting rows while reader threads '
+        'aggregate, with Django\'s default SQLite settings (rollback journal, deferred '
+        'transactions, 5 s lock timeout) vs. the SQLITE_PRAGMAS profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--seed-rows', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        for label, pragmas, immediate in (
+            ('default (rollback journal)', {}, False),
+            ('tuned (SQLITE_PRAGMAS)', settings.SQLITE_PRAGMAS, True),
+        ):
+            result = self._run(pragmas, immediate, options)
+            self.stdout.write(
+                f'{label:<28} writes/s: {result["writes"] / options["seconds"]:>9.1f}  '
+                f'reads/s: {result["reads"] / options["seconds"]:>9.1f}  '
+                f'locked errors: {result["errors"]}'
+            )
+
+    def _run(self, pragmas, immediate, options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            setup = sqlite3.connect(path)
+            apply_sqlite_pragmas(setup, pragmas)
+            setup.execute(
+                'CREATE TABLE ledger (id INTEGER PRIMARY KEY, branch_id INTEGER, '
+                'amount NUMERIC, date TEXT)'
+            )
+            setup.execute('CREATE INDEX ledger_branch ON ledger (branch_id, date)')
+            setup.executemany(
+                'INSERT INTO ledger (branch_id, amount, date) VALUES (?, ?, ?)',
+                ((i % 20, '10.00', '2025-01-01') for i in range(options['seed_rows'])),
+            )
+            setup.commit()
+            setup.close()
+
+            counts = {'writes': 0, 'reads': 0, 'errors': 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + options['seconds']
+
+            def connect():
+                # sqlite3's own 5 s lock timeout, as Django connects by default;
+                # the tuned profile replaces it with its busy_timeout pragma.
+                conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+                apply_sqlite_pragmas(conn, pragmas)
+                return conn
+
+            def writer(branch_id):
+                conn = connect()
+                while time.monotonic() < deadline:
+                    try:
+                        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+                        conn.execute('SELECT SUM(amount) FROM ledger WHERE branch_id = ?', (branch_id,)).fetchone()
+                        conn.execute(
+                            'INSERT INTO ledger (branch_id, amount, date) VALUES (?, ?, ?)',
+                            (branch_id, '5.00', '2025-01-02'),
+                        )
+                        conn.execute('COMMIT')
+                        key = 'writes'
+                    except sqlite3.OperationalError:
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                        key = 'errors'
+                    with lock:
+                        counts[key] += 1
+                conn.close()
+
+            def reader(branch_id):
+                conn = connect()
+                while time.monotonic() < deadline:
+                    try:
+                        conn.execute('SELECT SUM(amount) FROM ledger WHERE branch_id = ?', (branch_id,)).fetchone()
+                        key = 'reads'
+                    except sqlite3.OperationalError:
+                        key = 'errors'
+                    with lock:
+                        counts[key] += 1
+                conn.close()
+
+            threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+            threads += [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return counts
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'SQLite maintenance: ANALYZE, incremental vacuum and WAL checkpoint, '
+        'then print table and index sizes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--skip-analyze', action='store_true')
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help='Free pages to release with incremental_vacuum (0 = all).',
+        )
+        parser.add_argument(
+            '--checkpoint', default='TRUNCATE', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            help='WAL checkpoint mode.',
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Switch auto_vacuum to INCREMENTAL (runs a full VACUUM once).',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('dbmaintain only supports SQLite databases.')
+
+        with connection.cursor() as cursor:
+            if options['enable_incremental_vacuum']:
+                self.stdout.write('Enabling incremental auto_vacuum (full VACUUM)...')
+                cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                cursor.execute('VACUUM')
+
+            if not options['skip_analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('ANALYZE complete.')
+
+            cursor.execute('PRAGMA auto_vacuum')
+            auto_vacuum = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            free_pages = cursor.fetchone()[0]
+            if auto_vacuum == 2:
+                pages = options['vacuum_pages']
+                cursor.execute(f'PRAGMA incremental_vacuum({pages})' if pages else 'PRAGMA incremental_vacuum')
+                cursor.fetchall()
+                self.stdout.write(f'Incremental vacuum released up to {pages or free_pages} of {free_pages} free page(s).')
+            else:
+                self.stdout.write(
+                    f'{free_pages} free page(s); incremental vacuum is off '
+                    f'(run with --enable-incremental-vacuum once to turn it on).'
+                )
+
+            cursor.execute(f'PRAGMA wal_checkpoint({options["checkpoint"]})')
+            busy, wal_pages, checkpointed = cursor.fetchone()
+            self.stdout.write(
+                f'WAL checkpoint ({options["checkpoint"]}): {checkpointed}/{wal_pages} page(s) '
+                f'checkpointed{" (busy)" if busy else ""}.'
+            )
+
+            self._print_sizes(cursor)
+
+    def _print_sizes(self, cursor):
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+
+        try:
+            cursor.execute(
+                "SELECT s.name, COALESCE(m.type, 'table'), COALESCE(m.tbl_name, s.name), SUM(s.pgsize) "
+                "FROM dbstat s LEFT JOIN sqlite_master m ON m.name = s.name "
+                "GROUP BY s.name ORDER BY SUM(s.pgsize) DESC"
+            )
+            rows = cursor.fetchall()
+        except Exception:
+            self.stdout.write(self.style.WARNING('dbstat is not available in this SQLite build; sizes skipped.'))
+            rows = []
+
+        self.stdout.write('')
+        self.stdout.write(f'{"Name":<45} {"Type":<6} {"Table":<30} {"Size":>12}')
+        for name, kind, table, size in rows:
+            self.stdout.write(f'{name:<45} {kind:<6} {table:<30} {self._human(size):>12}')
+        self.stdout.write(f'\nDatabase size: {self._human(page_size * page_count)}')
+
+    @staticmethod
+    def _human(size):
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024 or unit == 'GB':
+                return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+            size /= 1024
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from account.models import SavedReport
+from account.saved_reports import materialize
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute saved reports into their result rows. Run it from cron, '
+        'or with --daemon to stay running and materialize once a day at --at.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', type=int, action='append', dest='reports',
+                            help='Saved report id to materialize (repeatable). Defaults to all scheduled reports.')
+        parser.add_argument('--daemon', action='store_true',
+                            help='Keep running and materialize every day at the --at time.')
+        parser.add_argument('--at', default=settings.SAVED_REPORTS_RUN_AT,
+                            help='Daily run time (HH:MM, server local time) in --daemon mode.')
+
+    def handle(self, *args, **options):
+        if not options['daemon']:
+            self.run(options['reports'])
+            return
+
+        try:
+            run_at = datetime.strptime(options['at'], '%H:%M').time()
+        except ValueError:
+            raise CommandError('--at must be HH:MM.')
+        while True:
+            now = datetime.now()
+            next_run = datetime.combine(now.date(), run_at)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            self.stdout.write(f'Next run at {next_run:%Y-%m-%d %H:%M}.')
+            time.sleep((next_run - now).total_seconds())
+            self.run(options['reports'])
+
+    def run(self, report_ids):
+        saved_reports = SavedReport.objects.select_related('created_by', 'branch')
+        if report_ids:
+            saved_reports = saved_reports.filter(id__in=report_ids)
+        else:
+            saved_reports = saved_reports.filter(is_scheduled=True, created_by__is_active=True)
+
+        done = failed = 0
+        for saved_report in saved_reports.iterator():
+            try:
+                result = materialize(saved_report)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{saved_report.name} (#{saved_report.id}) failed: {e}')
+            else:
+                done += 1
+                self.stdout.write(f'{saved_report.name} (#{saved_report.id}): {result.duration_ms}ms')
+        self.stdout.write(self.style.SUCCESS(f'Materialized {done} saved report(s), {failed} failed.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from account.balances import rebuild
+from account.models import BranchBalanceShard
+
+
+class Command(BaseCommand):
+    help = 'Recompute the branch balance counters (balance shards) from the transaction ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, action='append', dest='branches',
+                            help='Branch id to rebuild (repeatable). Defaults to all branches.')
+
+    def handle(self, *args, **options):
+        rebuild(options['branches'])
+        count = BranchBalanceShard.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Balance shards rebuilt ({count} shard(s)).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from account.ledger import rebuild_daily_balances
+from account.models import BranchDailyBalance
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-branch daily closing balances from the transaction ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, action='append', dest='branches',
+                            help='Branch id to rebuild (repeatable). Defaults to all branches.')
+
+    def handle(self, *args, **options):
+        rebuild_daily_balances(options['branches'])
+        count = BranchDailyBalance.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Daily balances rebuilt ({count} row(s)).'))
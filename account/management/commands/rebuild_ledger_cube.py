@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from account.ledger import rebuild_cube
+from account.models import LedgerCube
+
+
+class Command(BaseCommand):
+    help = 'Recompute the branch x category x month ledger cube from the transaction ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, action='append', dest='branches',
+                            help='Branch id to rebuild (repeatable). Defaults to all branches.')
+
+    def handle(self, *args, **options):
+        rebuild_cube(options['branches'])
+        count = LedgerCube.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Ledger cube rebuilt ({count} cell(s)).'))
@@ -0,0 +1,57 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from account import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (reports, exports, imports) on a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS,
+                            help='Jobs run concurrently by this process.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write(f'Job worker {worker_id} started with {workers} slot(s).')
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job') as pool:
+            while not self.stopping:
+                for future in [future for future in running if future.done()]:
+                    del running[future]
+                jobs.heartbeat(worker_id, [job.pk for job in running.values()])
+                jobs.reap_expired()
+
+                while len(running) < workers and not self.stopping:
+                    # Heavy jobs never take the last free slot of this worker.
+                    heavy_here = sum(job.is_heavy for job in running.values())
+                    allow_heavy = heavy_here < settings.JOB_MAX_HEAVY and (
+                        workers == 1 or len(running) < workers - 1
+                    )
+                    job = jobs.claim(worker_id, allow_heavy=allow_heavy)
+                    if job is None:
+                        break
+                    self.stdout.write(f'Running job #{job.id} ({job.kind}), attempt {job.attempts}.')
+                    running[pool.submit(jobs.run, job)] = job
+
+                if options['once'] and not running:
+                    break
+                time.sleep(settings.JOB_POLL_SECONDS if not options['once'] else 0.1)
+            self.stdout.write('Waiting for running jobs to finish...')
+        self.stdout.write(self.style.SUCCESS('Job worker stopped.'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
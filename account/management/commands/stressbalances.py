@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction as db_transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from account import balances, ledger
+from account.fields import to_kobo, to_naira
+from account.models import Branch, BranchBalanceShard, Transaction, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress test for postings to one branch: threads post expenditures to the main branch through '
+        'the ledger, in a throwaway test database, with its balance in one shard, in --shards shards, and '
+        'in --shards shards with each posting also holding the branch row FOR UPDATE (as before postings '
+        'only share-locked it). Use PostgreSQL; SQLite serializes every writer anyway.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--postings', type=int, default=100, help='Postings per thread.')
+        parser.add_argument('--seed-rows', type=int, default=50000)
+        parser.add_argument('--shards', type=int, default=8)
+        parser.add_argument(
+            '--hold-ms', type=float, default=0,
+            help='Time each posting keeps its transaction open after posting, standing in for the round '
+                 'trips to a remote database and the rest of the request while its locks are held.',
+        )
+
+    def handle(self, *args, **options):
+        path = None
+        if connection.vendor == 'sqlite':
+            # A file rather than the in-memory default, so threads share it with WAL locking.
+            fd, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(fd)
+            connection.settings_dict['TEST']['NAME'] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            main = self._seed(options['seed_rows'])
+            for label, branch_lock, shards in (
+                (f'branch row lock, {options["shards"]} shards', True, options['shards']),
+                ('1 shard', False, 1),
+                (f'{options["shards"]} shards', False, options['shards']),
+            ):
+                self._spread(main, shards)
+                with override_settings(MAIN_BRANCH_BALANCE_SHARDS=shards):
+                    result = self._run(main, branch_lock, options)
+                totals = main.get_totals()
+                balance = totals['income'] - totals['expenditure']
+                consistent = main.get_balance() == balance == main.get_balance_as_of(timezone.now().date())
+                self.stdout.write(
+                    f'{label:<28} postings/s: {result["postings"] / result["seconds"]:>8.1f}  '
+                    f'refused: {result["refused"]}  errors: {result["errors"]}  '
+                    f'balances match ledger: {consistent}'
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def _seed(self, seed_rows):
+        user = User.objects.create(username='stress', email='stress@example.com', user_type='super_admin')
+        main = Branch.objects.create(name='Main', location='', state='', address='', branch_type='main', created_by=user)
+        today = timezone.now().date()
+        # Bulk-inserted history, then the derived tables rebuilt from it.
+        Transaction.objects.bulk_create([
+            Transaction(
+                branch=main, transaction_type='income', amount=Decimal('100'), description='seed',
+                date=today, created_by=user,
+            )
+            for _ in range(seed_rows)
+        ], batch_size=1000)
+        ledger.rebuild_daily_balances([main.pk])
+        ledger.rebuild_cube([main.pk])
+        balances.rebuild([main.pk])
+        return main
+
+    def _spread(self, main, shards):
+        """Spread the balance evenly over ``shards`` shards, as a rebalancing debit would"""
+        rows = [BranchBalanceShard(branch=main, shard=shard) for shard in range(shards)]
+        even, extra = divmod(to_kobo(main.get_balance()), shards)
+        for index, row in enumerate(rows):
+            row.balance = to_naira(even + (1 if index < extra else 0))
+        BranchBalanceShard.objects.filter(branch=main).update(balance=0)
+        BranchBalanceShard.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['branch', 'shard'], update_fields=['balance'],
+        )
+
+    def _run(self, main, branch_lock, options):
+        counts = {'postings': 0, 'refused': 0, 'errors': 0}
+        lock = threading.Lock()
+        user = User.objects.get(username='stress')
+        today = timezone.now().date()
+
+        def writer():
+            try:
+                for _ in range(options['postings']):
+                    try:
+                        with db_transaction.atomic():
+                            if branch_lock:
+                                # What every posting took before: the branch row, exclusively.
+                                Branch.all_objects.select_for_update().filter(pk=main.pk).exists()
+                            Transaction.objects.create(
+                                branch_id=main.pk, transaction_type='expenditure', amount=Decimal('1'),
+                                description='stress', date=today, created_by=user,
+                            )
+                            time.sleep(options['hold_ms'] / 1000)
+                        key = 'postings'
+                    except ValidationError:
+                        key = 'refused'
+                    except OperationalError:
+                        key = 'errors'
+                    with lock:
+                        counts[key] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts['seconds'] = time.perf_counter() - start
+        return counts
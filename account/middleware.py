@@ -0,0 +1,73 @@
+import logging
+import time
+import uuid
+
+from django.conf import settings
+
+from Accounting.log import request_context
+
+from .routers import SAFE_METHODS, pinned_to_primary
+
+logger = logging.getLogger('account.request')
+
+
+class RequestLogMiddleware:
+    """
+    Attach request fields to every log record and log one line per request
+    with its status and latency.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        context = {
+            'request_id': request_id,
+            'method': request.method,
+            'path': request.path,
+        }
+        token = request_context.set(context)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                context['user_id'] = user.pk
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            logger.info(
+                '%s %s %s %.2fms', request.method, request.path, response.status_code, duration_ms,
+                extra={'status': response.status_code, 'duration_ms': duration_ms},
+            )
+            response['X-Request-ID'] = request_id
+            return response
+        finally:
+            request_context.reset(token)
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a user's reads to the primary database for REPLICA_PIN_SECONDS after
+    any write request, so replica lag never hides their own postings.
+    """
+
+    cookie_name = 'pin_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = pinned_to_primary.set(self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            pinned_to_primary.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_protect_fund_allocations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fundallocation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['to_branch'], name='alloc_active_to_branch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['branch', 'transaction_type', 'date'], name='txn_branch_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'transaction_type'], name='txn_date_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_date'], name='txn_created_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('transaction_type', 'income')), fields=['branch', 'date'], include=('amount',), name='txn_income_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('transaction_type', 'expenditure')), fields=['branch', 'date'], include=('amount',), name='txn_expenditure_cover_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:43
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def backfill_daily_balances(apps, schema_editor):
+    Branch = apps.get_model('account', 'Branch')
+    Transaction = apps.get_model('account', 'Transaction')
+    BranchDailyBalance = apps.get_model('account', 'BranchDailyBalance')
+
+    # One branch at a time keeps memory bounded on large ledgers.
+    for branch_id in Branch.objects.values_list('id', flat=True).iterator():
+        rows = Transaction.objects.filter(branch_id=branch_id).values('date').annotate(
+            income=Sum('amount', filter=Q(transaction_type='income')),
+            expenditure=Sum('amount', filter=Q(transaction_type='expenditure')),
+        ).order_by('date')
+        closing_balance = Decimal('0')
+        batch = []
+        for row in rows.iterator(chunk_size=1000):
+            income = row['income'] or Decimal('0')
+            expenditure = row['expenditure'] or Decimal('0')
+            closing_balance += income - expenditure
+            batch.append(BranchDailyBalance(
+                branch_id=branch_id, date=row['date'], income=income,
+                expenditure=expenditure, closing_balance=closing_balance,
+            ))
+            if len(batch) >= 1000:
+                BranchDailyBalance.objects.bulk_create(batch)
+                batch = []
+        BranchDailyBalance.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('expenditure', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='account.branch')),
+            ],
+            options={
+                'ordering': ['branch', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'date'), name='unique_branch_daily_balance')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0006_branch_daily_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiscalPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('is_closed', models.BooleanField(default=False)),
+                ('closed_date', models.DateTimeField(blank=True, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_periods', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_periods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodBranchBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('expenditure', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='account.branch')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_balances', to='account.fiscalperiod')),
+            ],
+            options={
+                'ordering': ['period', 'branch'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expenditure', 'Expenditure')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_category_totals', to='account.branch')),
+                ('expenditure_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.expenditurecategory')),
+                ('income_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.incomecategory')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_totals', to='account.fiscalperiod')),
+            ],
+            options={
+                'ordering': ['period', 'branch', 'transaction_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='fiscalperiod',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__gte', models.F('start_date'))), name='fiscal_period_dates_ordered'),
+        ),
+        migrations.AddConstraint(
+            model_name='periodbranchbalance',
+            constraint=models.UniqueConstraint(fields=('period', 'branch'), name='unique_period_branch_balance'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_ledger_cube(apps, schema_editor):
+    Transaction = apps.get_model('account', 'Transaction')
+    LedgerCube = apps.get_model('account', 'LedgerCube')
+
+    rows = Transaction.objects.annotate(month=TruncMonth('date')).values(
+        'branch_id', 'month', 'transaction_type', 'income_category_id', 'expenditure_category_id'
+    ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(LedgerCube(**row))
+        if len(batch) >= 1000:
+            LedgerCube.objects.bulk_create(batch)
+            batch = []
+    LedgerCube.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_fiscal_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expenditure', 'Expenditure')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('count', models.IntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cube_rows', to='account.branch')),
+                ('expenditure_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.expenditurecategory')),
+                ('income_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.incomecategory')),
+            ],
+            options={
+                'ordering': ['branch', 'month'],
+                'indexes': [models.Index(fields=['month', 'transaction_type'], name='cube_month_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'month', 'transaction_type', 'income_category', 'expenditure_category'), name='unique_ledger_cube_cell')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:54
+
+import account.encoders
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_ledger_cube'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('range_type', models.CharField(choices=[('month_to_date', 'Month to Date'), ('last_month', 'Last Month'), ('quarter_to_date', 'Quarter to Date'), ('last_quarter', 'Last Quarter'), ('year_to_date', 'Year to Date'), ('last_30_days', 'Last 30 Days'), ('custom', 'Custom Range')], default='month_to_date', max_length=20)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('report_type', models.CharField(choices=[('overview', 'Overview'), ('detailed', 'Detailed Analysis'), ('trends', 'Trends & Patterns')], default='overview', max_length=20)),
+                ('is_scheduled', models.BooleanField(default=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_reports', to='account.branch')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedReportResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('payload', models.JSONField(decoder=account.encoders.ReportJSONDecoder, encoder=account.encoders.ReportJSONEncoder)),
+                ('computed_at', models.DateTimeField()),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('saved_report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result', to='account.savedreport')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['branch', 'date', 'created_date', 'id'], name='txn_statement_idx'),
+        ),
+    ]
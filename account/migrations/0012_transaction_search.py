@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# The search index as account.search queries it, written out here so the
+# migration keeps doing the same thing whatever later happens to search.py.
+SQLITE_SETUP = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS account_transaction_fts USING fts5("
+    "description, content='account_transaction', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ai AFTER INSERT ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ad AFTER DELETE ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_au AFTER UPDATE OF description ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO account_transaction_fts(account_transaction_fts) VALUES ('rebuild')",
+)
+SQLITE_TEARDOWN = (
+    "DROP TRIGGER IF EXISTS account_transaction_fts_ai",
+    "DROP TRIGGER IF EXISTS account_transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS account_transaction_fts_au",
+    "DROP TABLE IF EXISTS account_transaction_fts",
+)
+POSTGRESQL_SETUP = (
+    "ALTER TABLE account_transaction ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, ''))) STORED",
+    "CREATE INDEX txn_search_vector_idx ON account_transaction USING GIN (search_vector)",
+)
+POSTGRESQL_TEARDOWN = (
+    "DROP INDEX IF EXISTS txn_search_vector_idx",
+    "ALTER TABLE account_transaction DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_SETUP, 'postgresql': POSTGRESQL_SETUP})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_TEARDOWN, 'postgresql': POSTGRESQL_TEARDOWN})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_statement_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_transaction_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fundallocation',
+            index=models.Index(fields=['-allocated_date'], name='alloc_allocated_date_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:14
+
+import account.models
+import django.contrib.auth.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0013_allocation_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', account.models.VisibleUserManager()),
+                ('all_objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='branch',
+            name='pending_deletion',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pending_deletion',
+            field=models.BooleanField(default=False),
+        ),
+    ]
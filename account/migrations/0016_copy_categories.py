@@ -0,0 +1,61 @@
+from django.core.management.color import no_style
+from django.db import migrations, transaction
+from django.db.models import F, Max, Min
+
+CHUNK_SIZE = 5000
+
+
+def copy_categories(apps, schema_editor):
+    """
+    Copy both category tables into ``Category`` and point transactions,
+    cube cells and period totals at it, a primary-key range per
+    transaction so the ledger is never locked for long. Income categories
+    keep their ids; expenditure ids are shifted past them.
+    """
+    Category = apps.get_model('account', 'Category')
+    IncomeCategory = apps.get_model('account', 'IncomeCategory')
+    ExpenditureCategory = apps.get_model('account', 'ExpenditureCategory')
+    offset = IncomeCategory.objects.aggregate(Max('id'))['id__max'] or 0
+
+    fields = ('id', 'name', 'description', 'branch_id', 'created_by_id', 'scope', 'is_active')
+    for model, category_type, shift in ((IncomeCategory, 'income', 0), (ExpenditureCategory, 'expenditure', offset)):
+        last_id = 0
+        while True:
+            rows = list(model.objects.filter(id__gt=last_id).order_by('id').values(*fields)[:CHUNK_SIZE])
+            if not rows:
+                break
+            Category.objects.bulk_create([
+                Category(**{**row, 'id': row['id'] + shift, 'category_type': category_type}) for row in rows
+            ])
+            last_id = rows[-1]['id']
+    # Ids were set explicitly; move the sequence past them (PostgreSQL).
+    for statement in schema_editor.connection.ops.sequence_reset_sql(no_style(), [Category]):
+        schema_editor.execute(statement, params=None)
+
+    for model_name in ('Transaction', 'LedgerCube', 'PeriodCategoryTotal'):
+        model = apps.get_model('account', model_name)
+        bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            continue
+        for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+            with transaction.atomic():
+                rows = model.objects.filter(id__gte=start, id__lt=start + CHUNK_SIZE)
+                rows.filter(transaction_type='income', income_category__isnull=False).update(
+                    category_id=F('income_category_id')
+                )
+                rows.filter(transaction_type='expenditure', expenditure_category__isnull=False).update(
+                    category_id=F('expenditure_category_id') + offset
+                )
+
+
+class Migration(migrations.Migration):
+    # Each chunk commits on its own (see copy_categories).
+    atomic = False
+
+    dependencies = [
+        ('account', '0015_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_categories, migrations.RunPython.noop),
+    ]
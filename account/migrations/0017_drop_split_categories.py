@@ -0,0 +1,101 @@
+from django.db import migrations, models
+
+# The full-text search triggers from 0012, written out here so this
+# migration does not depend on live app code.
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ai AFTER INSERT ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ad AFTER DELETE ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_au AFTER UPDATE OF description ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO account_transaction_fts(account_transaction_fts) VALUES ('rebuild')",
+)
+
+
+def restore_search_triggers(apps, schema_editor):
+    # Only SQLite rebuilds the table; PostgreSQL's search column is untouched.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in SQLITE_SEARCH_TRIGGERS:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0016_copy_categories'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='ledgercube',
+            name='unique_ledger_cube_cell',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='income_category',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='expenditure_category',
+        ),
+        migrations.RemoveField(
+            model_name='ledgercube',
+            name='income_category',
+        ),
+        migrations.RemoveField(
+            model_name='ledgercube',
+            name='expenditure_category',
+        ),
+        migrations.RemoveField(
+            model_name='periodcategorytotal',
+            name='income_category',
+        ),
+        migrations.RemoveField(
+            model_name='periodcategorytotal',
+            name='expenditure_category',
+        ),
+        migrations.AddConstraint(
+            model_name='ledgercube',
+            constraint=models.UniqueConstraint(fields=('branch', 'month', 'transaction_type', 'category'), name='unique_ledger_cube_cell'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['category', 'date'], name='txn_category_date_idx'),
+        ),
+        migrations.DeleteModel(
+            name='IncomeCategory',
+        ),
+        migrations.DeleteModel(
+            name='ExpenditureCategory',
+        ),
+        migrations.CreateModel(
+            name='IncomeCategory',
+            fields=[],
+            options={
+                'verbose_name_plural': 'income categories',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('account.category',),
+        ),
+        migrations.CreateModel(
+            name='ExpenditureCategory',
+            fields=[],
+            options={
+                'verbose_name_plural': 'expenditure categories',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('account.category',),
+        ),
+        # Dropping the old columns rebuilds account_transaction on SQLite,
+        # which drops the full-text search triggers; put them back.
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+import account.fields
+import django.core.validators
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Money moves to whole-kobo integer columns (see account/fields.py): added
+    # here, filled in 0019, and swapped in for the decimal columns in 0020.
+
+    dependencies = [
+        ('account', '0017_drop_split_categories'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='allocated_funds_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fundallocation',
+            name='amount_kobo',
+            field=account.fields.MoneyField(default=0, validators=[django.core.validators.MinValueValidator(0.01)]),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='amount_kobo',
+            field=account.fields.MoneyField(default=0, validators=[django.core.validators.MinValueValidator(0.01)]),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='branchdailybalance',
+            name='income_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='branchdailybalance',
+            name='expenditure_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='branchdailybalance',
+            name='closing_balance_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgercube',
+            name='total_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='periodbranchbalance',
+            name='income_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='periodbranchbalance',
+            name='expenditure_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='periodbranchbalance',
+            name='closing_balance_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='periodcategorytotal',
+            name='total_kobo',
+            field=account.fields.MoneyField(default=0),
+        ),
+    ]
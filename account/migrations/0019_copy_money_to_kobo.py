@@ -0,0 +1,45 @@
+from django.db import migrations, transaction
+from django.db.models import F, Max, Min
+from django.db.models.functions import Round
+
+CHUNK_SIZE = 5000
+
+MONEY_COLUMNS = {
+    'Branch': ('allocated_funds',),
+    'FundAllocation': ('amount',),
+    'Transaction': ('amount',),
+    'BranchDailyBalance': ('income', 'expenditure', 'closing_balance'),
+    'LedgerCube': ('total',),
+    'PeriodBranchBalance': ('income', 'expenditure', 'closing_balance'),
+    'PeriodCategoryTotal': ('total',),
+}
+
+
+def copy_to_kobo(apps, schema_editor):
+    """
+    Fill each ``<column>_kobo`` from its decimal column, a primary-key range
+    per transaction. Rounded rather than truncated: SQLite holds the decimal
+    columns as REAL, where 10.05 * 100 is 1004.999...
+    """
+    for model_name, columns in MONEY_COLUMNS.items():
+        model = apps.get_model('account', model_name)
+        bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            continue
+        changes = {f'{column}_kobo': Round(F(column) * 100) for column in columns}
+        for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+            with transaction.atomic():
+                model.objects.filter(id__gte=start, id__lt=start + CHUNK_SIZE).update(**changes)
+
+
+class Migration(migrations.Migration):
+    # Each chunk commits on its own (see copy_to_kobo).
+    atomic = False
+
+    dependencies = [
+        ('account', '0018_money_kobo_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_kobo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,136 @@
+from django.db import migrations
+
+# The full-text search triggers from 0012, written out here so this
+# migration does not depend on live app code.
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ai AFTER INSERT ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ad AFTER DELETE ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_au AFTER UPDATE OF description ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO account_transaction_fts(account_transaction_fts) VALUES ('rebuild')",
+)
+
+
+def restore_search_triggers(apps, schema_editor):
+    # Only SQLite rebuilds the table; PostgreSQL's search column is untouched.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in SQLITE_SEARCH_TRIGGERS:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0019_copy_money_to_kobo'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='branch',
+            name='allocated_funds',
+        ),
+        migrations.RenameField(
+            model_name='branch',
+            old_name='allocated_funds_kobo',
+            new_name='allocated_funds',
+        ),
+        migrations.RemoveField(
+            model_name='fundallocation',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='fundallocation',
+            old_name='amount_kobo',
+            new_name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='amount_kobo',
+            new_name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='branchdailybalance',
+            name='income',
+        ),
+        migrations.RenameField(
+            model_name='branchdailybalance',
+            old_name='income_kobo',
+            new_name='income',
+        ),
+        migrations.RemoveField(
+            model_name='branchdailybalance',
+            name='expenditure',
+        ),
+        migrations.RenameField(
+            model_name='branchdailybalance',
+            old_name='expenditure_kobo',
+            new_name='expenditure',
+        ),
+        migrations.RemoveField(
+            model_name='branchdailybalance',
+            name='closing_balance',
+        ),
+        migrations.RenameField(
+            model_name='branchdailybalance',
+            old_name='closing_balance_kobo',
+            new_name='closing_balance',
+        ),
+        migrations.RemoveField(
+            model_name='ledgercube',
+            name='total',
+        ),
+        migrations.RenameField(
+            model_name='ledgercube',
+            old_name='total_kobo',
+            new_name='total',
+        ),
+        migrations.RemoveField(
+            model_name='periodbranchbalance',
+            name='income',
+        ),
+        migrations.RenameField(
+            model_name='periodbranchbalance',
+            old_name='income_kobo',
+            new_name='income',
+        ),
+        migrations.RemoveField(
+            model_name='periodbranchbalance',
+            name='expenditure',
+        ),
+        migrations.RenameField(
+            model_name='periodbranchbalance',
+            old_name='expenditure_kobo',
+            new_name='expenditure',
+        ),
+        migrations.RemoveField(
+            model_name='periodbranchbalance',
+            name='closing_balance',
+        ),
+        migrations.RenameField(
+            model_name='periodbranchbalance',
+            old_name='closing_balance_kobo',
+            new_name='closing_balance',
+        ),
+        migrations.RemoveField(
+            model_name='periodcategorytotal',
+            name='total',
+        ),
+        migrations.RenameField(
+            model_name='periodcategorytotal',
+            old_name='total_kobo',
+            new_name='total',
+        ),
+        # On SQLite these column changes can rebuild account_transaction,
+        # which drops the full-text search triggers; put them back.
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:25
+
+from django.db import migrations, models
+
+# The full-text search triggers from 0012, written out here so this
+# migration does not depend on live app code.
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ai AFTER INSERT ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_ad AFTER DELETE ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS account_transaction_fts_au AFTER UPDATE OF description ON account_transaction BEGIN "
+    "INSERT INTO account_transaction_fts(account_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO account_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO account_transaction_fts(account_transaction_fts) VALUES ('rebuild')",
+)
+
+
+def restore_search_triggers(apps, schema_editor):
+    # Only SQLite rebuilds the table; PostgreSQL's search column is untouched.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in SQLITE_SEARCH_TRIGGERS:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0020_drop_decimal_money'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='branch_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('branch_active', True)), fields=['date', 'transaction_type'], name='txn_active_date_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('branch_active', True)), fields=['-created_date'], name='txn_active_created_idx'),
+        ),
+        # Adding the column rebuilds account_transaction on SQLite, which
+        # drops the full-text search triggers; put them back.
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
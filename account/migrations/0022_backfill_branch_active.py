@@ -0,0 +1,34 @@
+from django.db import migrations, transaction
+from django.db.models import Max, Min
+
+CHUNK_SIZE = 5000
+
+
+def backfill_branch_active(apps, schema_editor):
+    """Clear branch_active on inactive branches' transactions, a primary-key range per transaction"""
+    Branch = apps.get_model('account', 'Branch')
+    Transaction = apps.get_model('account', 'Transaction')
+    inactive = list(Branch.objects.filter(is_active=False).values_list('id', flat=True))
+    if not inactive:
+        return
+    bounds = Transaction.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        with transaction.atomic():
+            Transaction.objects.filter(
+                id__gte=start, id__lt=start + CHUNK_SIZE, branch_id__in=inactive
+            ).update(branch_active=False)
+
+
+class Migration(migrations.Migration):
+    # Each chunk commits on its own (see backfill_branch_active).
+    atomic = False
+
+    dependencies = [
+        ('account', '0021_transaction_branch_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_branch_active, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:30
+
+import account.fields
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def fill_balance_shards(apps, schema_editor):
+    """Each branch's current balance from the ledger, in its shard 0 (see account.balances)"""
+    BranchBalanceShard = apps.get_model('account', 'BranchBalanceShard')
+    Transaction = apps.get_model('account', 'Transaction')
+    rows = Transaction.objects.values('branch_id').annotate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expenditure=Sum('amount', filter=Q(transaction_type='expenditure')),
+    ).order_by()
+    BranchBalanceShard.objects.bulk_create([
+        BranchBalanceShard(
+            branch_id=row['branch_id'], shard=0, balance=(row['income'] or 0) - (row['expenditure'] or 0),
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0022_backfill_branch_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchBalanceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('balance', account.fields.MoneyField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_shards', to='account.branch')),
+            ],
+            options={
+                'ordering': ['branch', 'shard'],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'shard'), name='unique_branch_balance_shard')],
+            },
+        ),
+        migrations.RunPython(fill_balance_shards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:45
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_uncategorized_cells(apps, schema_editor):
+    """Fold duplicate uncategorized cells into the oldest one before the constraint is added"""
+    LedgerCube = apps.get_model('account', 'LedgerCube')
+    duplicates = LedgerCube.objects.filter(category__isnull=True).values(
+        'branch_id', 'month', 'transaction_type'
+    ).annotate(
+        cells=Count('id'), keep=Min('id'), cell_total=Sum('total'), cell_count=Sum('count')
+    ).filter(cells__gt=1).order_by()
+    for row in duplicates:
+        LedgerCube.objects.filter(
+            category__isnull=True,
+            branch_id=row['branch_id'],
+            month=row['month'],
+            transaction_type=row['transaction_type'],
+        ).exclude(id=row['keep']).delete()
+        LedgerCube.objects.filter(id=row['keep']).update(total=row['cell_total'], count=row['cell_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0023_balance_shards'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized_cells, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ledgercube',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('branch', 'month', 'transaction_type'), name='unique_ledger_cube_uncategorized'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+
+def create_ledger_version(apps, schema_editor):
+    apps.get_model('account', 'LedgerVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0024_ledger_cube_uncategorized_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_ledger_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.4 on 2026-10-19 09:45
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fold_into_shard_zero(apps, schema_editor):
+    """Sum each branch's per-shard daily rows and cube cells into shard 0 before the old constraints return"""
+    BranchDailyBalance = apps.get_model('account', 'BranchDailyBalance')
+    LedgerCube = apps.get_model('account', 'LedgerCube')
+    branch_ids = set(BranchDailyBalance.objects.filter(shard__gt=0).values_list('branch_id', flat=True))
+    for branch_id in branch_ids:
+        rows = BranchDailyBalance.objects.filter(branch_id=branch_id)
+        days = list(rows.values('date').annotate(
+            day_income=Sum('income'), day_expenditure=Sum('expenditure')
+        ).order_by('date'))
+        rows.delete()
+        closing_balance = 0
+        for day in days:
+            closing_balance += day['day_income'] - day['day_expenditure']
+            BranchDailyBalance.objects.create(
+                branch_id=branch_id, shard=0, date=day['date'], income=day['day_income'],
+                expenditure=day['day_expenditure'], closing_balance=closing_balance,
+            )
+    cells = list(LedgerCube.objects.values('branch_id', 'month', 'transaction_type', 'category_id').annotate(
+        cell_total=Sum('total'), cell_count=Sum('count')
+    ).filter(branch_id__in=set(LedgerCube.objects.filter(shard__gt=0).values_list('branch_id', flat=True))).order_by())
+    for cell in cells:
+        total, count = cell.pop('cell_total'), cell.pop('cell_count')
+        LedgerCube.objects.filter(**cell).delete()
+        LedgerCube.objects.create(shard=0, total=total, count=count, **cell)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0026_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='branchdailybalance',
+            options={'ordering': ['branch', 'date', 'shard']},
+        ),
+        migrations.RemoveConstraint(
+            model_name='branchdailybalance',
+            name='unique_branch_daily_balance',
+        ),
+        migrations.RemoveConstraint(
+            model_name='ledgercube',
+            name='unique_ledger_cube_cell',
+        ),
+        migrations.RemoveConstraint(
+            model_name='ledgercube',
+            name='unique_ledger_cube_uncategorized',
+        ),
+        migrations.AddField(
+            model_name='branchdailybalance',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ledgercube',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, fold_into_shard_zero),
+        migrations.AddConstraint(
+            model_name='branchdailybalance',
+            constraint=models.UniqueConstraint(fields=('branch', 'shard', 'date'), name='unique_branch_daily_balance'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgercube',
+            constraint=models.UniqueConstraint(fields=('branch', 'shard', 'month', 'transaction_type', 'category'), name='unique_ledger_cube_cell'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgercube',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('branch', 'shard', 'month', 'transaction_type'), name='unique_ledger_cube_uncategorized'),
+        ),
+    ]
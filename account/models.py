@@ -1,8 +1,20 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db import connections, models, router, transaction as db_transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from datetime import timedelta
 from decimal import Decimal
 
+from .encoders import ReportJSONDecoder, ReportJSONEncoder
+from .fields import MoneyField
+
+class VisibleUserManager(UserManager):
+    """Users being deleted in the background (see deletion.py) are hidden everywhere"""
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class User(AbstractUser):
     USER_TYPES = (
         ('super_admin', 'Super Admin'),
@@ -14,6 +26,10 @@ class User(AbstractUser):
     last_name = models.CharField(max_length=30)
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=True)
+    pending_deletion = models.BooleanField(default=False)
+
+    objects = VisibleUserManager()
+    all_objects = UserManager()
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -23,6 +39,12 @@ class User(AbstractUser):
         """Get the first branch this user manages"""
         return self.managed_branches.filter(is_active=True).first()
 
+class VisibleBranchManager(models.Manager):
+    """Branches being deleted in the background (see deletion.py) are hidden everywhere"""
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_deletion=False)
+
+
 class Branch(models.Model):
     BRANCH_TYPES = (
         ('main', 'Main Branch (Enugu)'),
@@ -36,15 +58,36 @@ class Branch(models.Model):
     branch_type = models.CharField(max_length=10, choices=BRANCH_TYPES, default='sub')
     created_date = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
-    allocated_funds = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    allocated_funds = MoneyField(default=0)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_branches', null=True, blank=True)
+    pending_deletion = models.BooleanField(default=False)
 
     # Multiple admins can be assigned to a branch
     admins = models.ManyToManyField(User, related_name='managed_branches', blank=True)
 
+    objects = VisibleBranchManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return f"{self.name} - {self.location}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if getattr(self, '_saved_is_active', None) != self.is_active and (
+                update_fields is None or 'is_active' in update_fields
+            ):
+                # Activated or deactivated: flip Transaction.branch_active in one statement.
+                self.transactions.exclude(branch_active=self.is_active).update(branch_active=self.is_active)
+        self._saved_is_active = self.is_active
+
     def get_total_income(self):
         return self.transactions.filter(transaction_type='income').aggregate(
             models.Sum('amount'))['amount__sum'] or Decimal('0')
@@ -53,8 +96,46 @@ class Branch(models.Model):
         return self.transactions.filter(transaction_type='expenditure').aggregate(
             models.Sum('amount'))['amount__sum'] or Decimal('0')
 
+    def get_totals(self):
+        """Income and expenditure totals in a single query"""
+        return self.transactions.totals()
+
     def get_balance(self):
-        return self.get_total_income() - self.get_total_expenditure()
+        """Current balance: the sum of the branch's balance shards (see balances.py)"""
+        return self.balance_shards.aggregate(Sum('balance'))['balance__sum'] or Decimal('0')
+
+    def get_balance_as_of(self, date):
+        """Closing balance at the end of ``date`` from the daily balance table"""
+        closing_balance = Branch.all_objects.filter(pk=self.pk).annotate(
+            as_of_balance=BranchDailyBalance.balance_as_of(OuterRef('pk'), date)
+        ).values_list('as_of_balance', flat=True).get()
+        return closing_balance if closing_balance is not None else Decimal('0')
+
+    @classmethod
+    def lock_for_posting(cls, branch_ids):
+        """
+        Lock the branches' rows FOR SHARE and return ``{pk: (branch_type,
+        is_active)}``. Shared locks do not conflict with each other, so
+        postings to one branch do not queue on its row (they serialize per
+        balance shard instead, see balances.py), but they do hold off
+        (de)activation and period close, which update or lock the rows FOR
+        UPDATE. Django has no FOR SHARE, hence the raw query on PostgreSQL;
+        elsewhere select_for_update() (SQLite serializes writers anyway).
+        """
+        branch_ids = sorted(set(branch_ids))
+        connection = connections[router.db_for_write(cls)]
+        if connection.vendor != 'postgresql':
+            rows = cls.all_objects.using(connection.alias).select_for_update().filter(
+                pk__in=branch_ids).order_by('pk').values_list('pk', 'branch_type', 'is_active')
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id, branch_type, is_active FROM {cls._meta.db_table} '
+                    'WHERE id = ANY(%s) ORDER BY id FOR SHARE',
+                    [branch_ids],
+                )
+                rows = cursor.fetchall()
+        return {pk: (branch_type, is_active) for pk, branch_type, is_active in rows}
 
     def get_remaining_allocated_funds(self):
         return self.allocated_funds - self.get_total_expenditure()
@@ -63,13 +144,24 @@ class Branch(models.Model):
     def is_main_branch(self):
         return self.branch_type == 'main'
 
-class IncomeCategory(models.Model):
+class Category(models.Model):
+    """
+    An income or expenditure category. Both kinds share this table, so a
+    transaction, ledger cube cell or period total has a single category
+    column; ``IncomeCategory`` and ``ExpenditureCategory`` are proxies
+    restricted to one kind.
+    """
+    CATEGORY_TYPES = (
+        ('income', 'Income'),
+        ('expenditure', 'Expenditure'),
+    )
     CATEGORY_SCOPES = (
         ('main', 'Main Branch Only'),
         ('sub', 'Sub Branches Only'),
         ('all', 'All Branches'),
     )
 
+    category_type = models.CharField(max_length=20, choices=CATEGORY_TYPES)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
@@ -77,25 +169,49 @@ class IncomeCategory(models.Model):
     scope = models.CharField(max_length=10, choices=CATEGORY_SCOPES, default='all')
     is_active = models.BooleanField(default=True)
 
+    # Set by the proxies; None on the base model
+    proxy_category_type = None
+
     def __str__(self):
         return f"{self.name} ({self.get_scope_display()})"
 
-class ExpenditureCategory(models.Model):
-    CATEGORY_SCOPES = (
-        ('main', 'Main Branch Only'),
-        ('sub', 'Sub Branches Only'),
-        ('all', 'All Branches'),
-    )
+    def save(self, *args, **kwargs):
+        if self.proxy_category_type:
+            self.category_type = self.proxy_category_type
+        super().save(*args, **kwargs)
 
-    name = models.CharField(max_length=100)
-    description = models.TextField(blank=True)
-    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    scope = models.CharField(max_length=10, choices=CATEGORY_SCOPES, default='all')
-    is_active = models.BooleanField(default=True)
+    class Meta:
+        verbose_name_plural = 'categories'
+        indexes = [
+            models.Index(fields=['category_type', 'is_active', 'name'], name='category_type_active_idx'),
+        ]
 
-    def __str__(self):
-        return f"{self.name} ({self.get_scope_display()})"
+
+class CategoryTypeManager(models.Manager):
+    def __init__(self, category_type):
+        super().__init__()
+        self.category_type = category_type
+
+    def get_queryset(self):
+        return super().get_queryset().filter(category_type=self.category_type)
+
+
+class IncomeCategory(Category):
+    proxy_category_type = 'income'
+    objects = CategoryTypeManager('income')
+
+    class Meta:
+        proxy = True
+        verbose_name_plural = 'income categories'
+
+
+class ExpenditureCategory(Category):
+    proxy_category_type = 'expenditure'
+    objects = CategoryTypeManager('expenditure')
+
+    class Meta:
+        proxy = True
+        verbose_name_plural = 'expenditure categories'
 
 class FundAllocation(models.Model):
     """
@@ -107,7 +223,7 @@ class FundAllocation(models.Model):
     """
     from_branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='fund_allocations_made')
     to_branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='fund_allocations_received')
-    amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0.01)])
+    amount = MoneyField(validators=[MinValueValidator(0.01)])
     description = models.TextField()
     allocated_by = models.ForeignKey(User, on_delete=models.CASCADE)
     allocated_date = models.DateTimeField(auto_now_add=True)
@@ -129,6 +245,91 @@ class FundAllocation(models.Model):
 
     class Meta:
         ordering = ['-allocated_date']
+        indexes = [
+            models.Index(fields=['to_branch'], condition=Q(is_active=True), name='alloc_active_to_branch_idx'),
+            models.Index(fields=['-allocated_date'], name='alloc_allocated_date_idx'),
+        ]
+
+class FiscalPeriod(models.Model):
+    """
+    An accounting period. Periods are closed in date order; closing one
+    snapshots its totals (see periods.py) and freezes every posting dated
+    on or before its end date.
+    """
+    name = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    is_closed = models.BooleanField(default=False)
+    closed_date = models.DateTimeField(null=True, blank=True)
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='closed_periods')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_periods')
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} - {self.end_date})"
+
+    @classmethod
+    def closed_through(cls):
+        """End date of the latest closed period, or None while nothing is closed"""
+        return cls.objects.filter(is_closed=True).aggregate(Max('end_date'))['end_date__max']
+
+    @classmethod
+    def check_open(cls, *dates):
+        """Raise ValidationError if any of ``dates`` falls in a closed period"""
+        dates = [models.DateField().to_python(date) for date in dates if date]
+        if not dates:
+            return
+        closed_through = cls.closed_through()
+        if closed_through is not None and min(dates) <= closed_through:
+            raise ValidationError(
+                f"The books are closed through {closed_through:%B %d, %Y}. "
+                f"Transactions dated on or before that day cannot be added, edited or deleted."
+            )
+
+    def clean(self):
+        if self.start_date and self.end_date:
+            if self.end_date < self.start_date:
+                raise ValidationError("End date cannot be before the start date.")
+            overlapping = FiscalPeriod.objects.filter(
+                start_date__lte=self.end_date, end_date__gte=self.start_date
+            ).exclude(pk=self.pk).first()
+            if overlapping:
+                raise ValidationError(f"This period overlaps {overlapping.name}.")
+
+    class Meta:
+        ordering = ['-start_date']
+        constraints = [
+            models.CheckConstraint(condition=Q(end_date__gte=F('start_date')), name='fiscal_period_dates_ordered'),
+        ]
+
+
+class TransactionQuerySet(models.QuerySet):
+    @staticmethod
+    def ledger_aggregates():
+        """
+        Conditional aggregates for income/expenditure sums and counts.
+        Rendered as FILTER (WHERE ...) on PostgreSQL and CASE WHEN elsewhere,
+        so both types are summed in one pass over the rows.
+        """
+        income = Q(transaction_type='income')
+        expenditure = Q(transaction_type='expenditure')
+        return {
+            'income': Sum('amount', filter=income),
+            'expenditure': Sum('amount', filter=expenditure),
+            'income_count': Count('id', filter=income),
+            'expenditure_count': Count('id', filter=expenditure),
+        }
+
+    def active(self):
+        """Transactions of active branches, without joining Branch"""
+        return self.filter(branch_active=True)
+
+    def totals(self):
+        totals = self.aggregate(**self.ledger_aggregates())
+        totals['income'] = totals['income'] or Decimal('0')
+        totals['expenditure'] = totals['expenditure'] or Decimal('0')
+        return totals
+
 
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
@@ -138,18 +339,63 @@ class Transaction(models.Model):
 
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='transactions')
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
-    amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(0.01)])
+    amount = MoneyField(validators=[MinValueValidator(0.01)])
     description = models.TextField()
     date = models.DateField()
-    income_category = models.ForeignKey(IncomeCategory, on_delete=models.CASCADE, null=True, blank=True)
-    expenditure_category = models.ForeignKey(ExpenditureCategory, on_delete=models.CASCADE, null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='transactions')
     fund_allocation = models.ForeignKey(FundAllocation, on_delete=models.CASCADE, null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_date = models.DateTimeField(auto_now_add=True)
+    # Copy of branch.is_active, kept in step by Branch.save(), so ledger
+    # scans over active branches stay on this table (see ``active()``).
+    branch_active = models.BooleanField(default=True)
+
+    objects = TransactionQuerySet.as_manager()
+
+    # Fields whose previous values the ledger needs to reverse an edit
+    LEDGER_FIELDS = ('branch_id', 'date', 'transaction_type', 'amount', 'category_id')
+
+    # Income/expenditure views of ``category`` for forms and templates
+    # written against the two separate category fields.
+    @property
+    def income_category(self):
+        return self.category if self.transaction_type == 'income' else None
+
+    @income_category.setter
+    def income_category(self, category):
+        self._set_typed_category('income', category)
+
+    @property
+    def expenditure_category(self):
+        return self.category if self.transaction_type == 'expenditure' else None
+
+    @expenditure_category.setter
+    def expenditure_category(self, category):
+        self._set_typed_category('expenditure', category)
+
+    def _set_typed_category(self, category_type, category):
+        if category is not None:
+            self.category = category
+        elif self.category_id is not None and self.category.category_type == category_type:
+            # Clearing one kind never drops a category of the other kind.
+            self.category = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_ledger_state()
+        return instance
+
+    def _remember_ledger_state(self):
+        self._ledger_state = {
+            field: getattr(self, field) for field in self.LEDGER_FIELDS
+            if field not in self.get_deferred_fields()
+        }
 
     def clean(self):
-        from django.core.exceptions import ValidationError
-        
+        # Postings in a closed fiscal period are frozen, including moving one out of it
+        FiscalPeriod.check_open(self.date, getattr(self, '_ledger_state', {}).get('date'))
+
         # Strict balance validation - no expenditures allowed on negative balance
         if self.transaction_type == 'expenditure' and self.branch_id:
             current_balance = self.branch.get_balance()
@@ -169,10 +415,315 @@ class Transaction(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        # Maintained ledger tables are updated by post_save in the same transaction
+        with db_transaction.atomic():
+            # Read under the branch lock so a concurrent (de)activation cannot be missed.
+            branch = Branch.lock_for_posting([self.branch_id]).get(self.branch_id)
+            if branch is None:
+                raise Branch.DoesNotExist('Branch matching query does not exist.')
+            _, self.branch_active = branch
+            super().save(*args, **kwargs)
+        self._remember_ledger_state()
 
     def __str__(self):
         return f"{self.branch.name} - {self.transaction_type} - ₦{self.amount}"
 
     class Meta:
         ordering = ['-date', '-created_date']
+        indexes = [
+            models.Index(fields=['branch', 'transaction_type', 'date'], name='txn_branch_type_date_idx'),
+            models.Index(fields=['date', 'transaction_type'], name='txn_date_type_idx'),
+            models.Index(fields=['-created_date'], name='txn_created_date_idx'),
+            models.Index(fields=['category', 'date'], name='txn_category_date_idx'),
+            # Active-ledger scans (TransactionQuerySet.active)
+            models.Index(fields=['date', 'transaction_type'], condition=Q(branch_active=True), name='txn_active_date_type_idx'),
+            models.Index(fields=['-created_date'], condition=Q(branch_active=True), name='txn_active_created_idx'),
+            # Statement order: keyset pages and running balances (reporting.statement_page)
+            models.Index(fields=['branch', 'date', 'created_date', 'id'], name='txn_statement_idx'),
+            # Partial covering indexes (PostgreSQL only, skipped on SQLite):
+            # per-type balance sums become index-only scans.
+            models.Index(
+                fields=['branch', 'date'], include=['amount'],
+                condition=Q(transaction_type='income'), name='txn_income_cover_idx',
+            ),
+            models.Index(
+                fields=['branch', 'date'], include=['amount'],
+                condition=Q(transaction_type='expenditure'), name='txn_expenditure_cover_idx',
+            ),
+        ]
+
+
+class BranchDailyBalance(models.Model):
+    """
+    Per-branch daily totals and closing balance, maintained incrementally
+    on posting (see ledger.py). Rows are kept per balance shard: a posting
+    updates the rows of the shard it changed, so concurrent postings to
+    one branch on one day update different rows. The balance as of any
+    date is, summed over the shards, the closing balance of each shard's
+    latest row on or before it (``balance_as_of``).
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='daily_balances')
+    shard = models.PositiveSmallIntegerField(default=0)
+    date = models.DateField()
+    income = MoneyField(default=0)
+    expenditure = MoneyField(default=0)
+    closing_balance = MoneyField(default=0)
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.date} - ₦{self.closing_balance}"
+
+    @classmethod
+    def balance_as_of(cls, branch, date):
+        """
+        Expression for the balance of ``branch`` (a pk or OuterRef) at the
+        end of ``date``: one indexed lookup per shard. Every shard with
+        daily rows has a balance shard row, which the ledger updates before
+        writing them (rebuilds write shard 0), so those enumerate the shards.
+        """
+        latest = cls.objects.filter(
+            branch=OuterRef('branch'), shard=OuterRef('shard'), date__lte=date
+        ).order_by('-date').values('closing_balance')[:1]
+        return Subquery(
+            BranchBalanceShard.objects.filter(branch=branch).annotate(closing_balance=Subquery(latest))
+            .order_by().values('branch').annotate(total=Sum('closing_balance')).values('total'),
+            output_field=MoneyField(),
+        )
+
+    class Meta:
+        ordering = ['branch', 'date', 'shard']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'shard', 'date'], name='unique_branch_daily_balance'),
+        ]
+
+
+class LedgerCube(models.Model):
+    """
+    Monthly totals per branch, transaction type and category, maintained
+    incrementally on posting (see ledger.py). ``month`` is the first day
+    of the month. Like the daily balances, cells are kept per balance
+    shard; a cell's totals are the sum over its shards.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='cube_rows')
+    shard = models.PositiveSmallIntegerField(default=0)
+    month = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    total = MoneyField(default=0)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.month:%b %Y} - {self.transaction_type} - ₦{self.total}"
+
+    class Meta:
+        ordering = ['branch', 'month']
+        indexes = [
+            models.Index(fields=['month', 'transaction_type'], name='cube_month_type_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['branch', 'shard', 'month', 'transaction_type', 'category'],
+                name='unique_ledger_cube_cell',
+            ),
+            # NULLs are distinct in a unique index, so uncategorized cells
+            # need their own (partial) constraint.
+            models.UniqueConstraint(
+                fields=['branch', 'shard', 'month', 'transaction_type'],
+                condition=Q(category__isnull=True),
+                name='unique_ledger_cube_uncategorized',
+            ),
+        ]
+
+
+class BranchBalanceShard(models.Model):
+    """
+    One slice of a branch's current balance, maintained on posting (see
+    balances.py). The balance is the sum of the branch's shards; a posting
+    changes a single shard, so concurrent postings update different rows.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='balance_shards')
+    shard = models.PositiveSmallIntegerField()
+    balance = MoneyField(default=0)
+
+    def __str__(self):
+        return f"{self.branch.name} - shard {self.shard} - ₦{self.balance}"
+
+    class Meta:
+        ordering = ['branch', 'shard']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'shard'], name='unique_branch_balance_shard'),
+        ]
+
+
+class LedgerVersion(models.Model):
+    """
+    A single counter bumped after every committed ledger change (and every
+    change to branches, categories or fiscal periods). Report cache entries
+    and rendered statements are tagged with it (see report_cache.py); being
+    in the database, it is the same for every worker process.
+    """
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Ledger version {self.version}"
+
+
+class PeriodBranchBalance(models.Model):
+    """
+    A branch's totals for a closed fiscal period and its cumulative closing
+    balance at the period's end. Written once when the period is closed.
+    """
+    period = models.ForeignKey(FiscalPeriod, on_delete=models.CASCADE, related_name='branch_balances')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='period_balances')
+    income = MoneyField(default=0)
+    expenditure = MoneyField(default=0)
+    closing_balance = MoneyField(default=0)
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.period.name} - ₦{self.closing_balance}"
+
+    class Meta:
+        ordering = ['period', 'branch']
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'branch'], name='unique_period_branch_balance'),
+        ]
+
+
+class PeriodCategoryTotal(models.Model):
+    """Per-branch, per-category totals of a closed fiscal period"""
+    period = models.ForeignKey(FiscalPeriod, on_delete=models.CASCADE, related_name='category_totals')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='period_category_totals')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    total = MoneyField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.period.name} - {self.transaction_type} - ₦{self.total}"
+
+    class Meta:
+        ordering = ['period', 'branch', 'transaction_type']
+
+
+class SavedReport(models.Model):
+    """
+    A saved ``reports`` configuration. The date range is stored as a range
+    type and resolved against the day the report is computed.
+    """
+    RANGE_TYPES = (
+        ('month_to_date', 'Month to Date'),
+        ('last_month', 'Last Month'),
+        ('quarter_to_date', 'Quarter to Date'),
+        ('last_quarter', 'Last Quarter'),
+        ('year_to_date', 'Year to Date'),
+        ('last_30_days', 'Last 30 Days'),
+        ('custom', 'Custom Range'),
+    )
+    REPORT_TYPES = (
+        ('overview', 'Overview'),
+        ('detailed', 'Detailed Analysis'),
+        ('trends', 'Trends & Patterns'),
+    )
+
+    name = models.CharField(max_length=100)
+    range_type = models.CharField(max_length=20, choices=RANGE_TYPES, default='month_to_date')
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True, related_name='saved_reports')
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES, default='overview')
+    is_scheduled = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_reports')
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_range_type_display()})"
+
+    def resolve_range(self, today):
+        """(start_date, end_date) of the range as seen on ``today``"""
+        month_start = today.replace(day=1)
+        quarter_start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+        if self.range_type == 'month_to_date':
+            return month_start, today
+        if self.range_type == 'last_month':
+            last_month_end = month_start - timedelta(days=1)
+            return last_month_end.replace(day=1), last_month_end
+        if self.range_type == 'quarter_to_date':
+            return quarter_start, today
+        if self.range_type == 'last_quarter':
+            last_quarter_end = quarter_start - timedelta(days=1)
+            return last_quarter_end.replace(month=last_quarter_end.month - 2, day=1), last_quarter_end
+        if self.range_type == 'year_to_date':
+            return today.replace(month=1, day=1), today
+        if self.range_type == 'last_30_days':
+            return today - timedelta(days=29), today
+        return self.start_date, self.end_date
+
+    def clean(self):
+        if self.range_type == 'custom':
+            if not self.start_date or not self.end_date:
+                raise ValidationError("A custom range needs both a start and an end date.")
+            if self.end_date < self.start_date:
+                raise ValidationError("End date cannot be before the start date.")
+
+    class Meta:
+        ordering = ['name']
+
+
+class SavedReportResult(models.Model):
+    """
+    The materialized output of a saved report: the report page's context,
+    computed off-peak by ``materialize_reports`` or on demand.
+    """
+    saved_report = models.OneToOneField(SavedReport, on_delete=models.CASCADE, related_name='result')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    payload = models.JSONField(encoder=ReportJSONEncoder, decoder=ReportJSONDecoder)
+    computed_at = models.DateTimeField()
+    duration_ms = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.saved_report.name} - {self.computed_at:%Y-%m-%d %H:%M}"
+
+
+class Job(models.Model):
+    """
+    A background job run by ``manage.py runjobs`` (see jobs.py). Heavy jobs
+    (long-range reports, exports, imports) are capped separately so they
+    cannot take every worker slot.
+    """
+    STATUSES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, encoder=ReportJSONEncoder, decoder=ReportJSONDecoder)
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    is_heavy = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    timeout_seconds = models.PositiveIntegerField(default=600)
+    run_after = models.DateTimeField()
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=ReportJSONEncoder, decoder=ReportJSONDecoder)
+    result_file = models.FileField(upload_to='jobs/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
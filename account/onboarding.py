@@ -0,0 +1,165 @@
+"""
+Bulk onboarding of branch admins from CSV.
+
+The file has a header row with ``username``, ``email``, ``first_name``,
+``last_name`` and ``password`` columns, and optionally ``phone`` and
+``branch`` (active branch names or ids, separated by ``;``). The whole
+file is validated before anything is written, with one query for clashing
+usernames/emails and one for the branches; an import is all or nothing.
+
+Password hashing is what makes creating a user slow: the configured hasher
+(PBKDF2 by default) is CPU-bound by design, so the import hashes across
+cores (see hashing.py) and then inserts the users and their branch links
+with ``bulk_create``.
+"""
+
+import csv
+import io
+
+from django.contrib.auth.models import BaseUserManager
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction as db_transaction
+from django.db.models import Q
+
+from .hashing import hash_passwords
+from .models import Branch, User
+
+REQUIRED_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'password')
+OPTIONAL_COLUMNS = ('phone', 'branch')
+MAX_ROWS = 5000
+
+
+def _field_limits():
+    return {name: User._meta.get_field(name).max_length for name in ('username', 'first_name', 'last_name', 'phone')}
+
+
+def parse(content):
+    """
+    Validate a CSV upload (bytes or text). Returns ``(rows, errors)``: the
+    cleaned rows, each with its ``branch_ids``, and a list of messages
+    naming the offending lines. Only an error-free file should be imported.
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return [], ['The file must be UTF-8 encoded CSV.']
+
+    reader = csv.DictReader(io.StringIO(content))
+    columns = [column.strip().lower() for column in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        return [], [f"Missing column(s): {', '.join(missing)}."]
+    reader.fieldnames = columns
+
+    limits = _field_limits()
+    rows, problems = [], {}
+    seen_usernames, seen_emails = {}, {}
+    for line, record in enumerate(reader, start=2):
+        if len(rows) >= MAX_ROWS:
+            return [], [f'More than {MAX_ROWS} rows; split the file.']
+        row = {column: (record.get(column) or '').strip() for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+        if not any(row.values()):
+            continue
+        row['line'] = line
+        row['username'] = User.normalize_username(row['username'])
+        row['email'] = BaseUserManager.normalize_email(row['email'])
+
+        found = [f'{column} is required' for column in REQUIRED_COLUMNS if not row[column]]
+        found += [
+            f'{column} is longer than {limit} characters'
+            for column, limit in limits.items() if len(row[column]) > limit
+        ]
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                found.append('email is not valid')
+        if row['password'] and len(row['password']) < 4:
+            found.append('password must be at least 4 characters long')
+        if row['username'] in seen_usernames:
+            found.append(f"username repeats line {seen_usernames[row['username']]}")
+        if row['email'] in seen_emails:
+            found.append(f"email repeats line {seen_emails[row['email']]}")
+        seen_usernames.setdefault(row['username'], line)
+        seen_emails.setdefault(row['email'], line)
+
+        row['branches'] = [name.strip() for name in row.pop('branch').split(';') if name.strip()]
+        problems[line] = found
+        rows.append(row)
+
+    if not rows:
+        return [], ['The file has no rows.']
+
+    # Usernames and emails already taken, in one query
+    taken = list(User.objects.filter(
+        Q(username__in=[row['username'] for row in rows]) | Q(email__in=[row['email'] for row in rows])
+    ).values_list('username', 'email'))
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+
+    # Branches by id or (unambiguous) name, in one query
+    references = {reference for row in rows for reference in row['branches']}
+    by_id, by_name = {}, {}
+    if references:
+        names = {reference.lower() for reference in references}
+        ids = [int(reference) for reference in references if reference.isdigit()]
+        name_filter = Q()
+        for name in names:
+            name_filter |= Q(name__iexact=name)
+        for branch_id, name in Branch.objects.filter(
+            name_filter | Q(id__in=ids), is_active=True
+        ).values_list('id', 'name'):
+            by_id[str(branch_id)] = branch_id
+            by_name.setdefault(name.lower(), []).append(branch_id)
+
+    for row in rows:
+        found = problems[row['line']]
+        if row['username'] in taken_usernames:
+            found.append(f"username {row['username']} is already taken")
+        if row['email'] in taken_emails:
+            found.append(f"email {row['email']} is already registered")
+        row['branch_ids'] = []
+        for reference in row.pop('branches'):
+            matches = [by_id[reference]] if reference in by_id else by_name.get(reference.lower(), [])
+            if len(matches) == 1:
+                row['branch_ids'].append(matches[0])
+            elif matches:
+                found.append(f'branch "{reference}" matches several branches; use its id')
+            else:
+                found.append(f'no active branch "{reference}"')
+
+    errors = [f"Line {line}: {'; '.join(found)}." for line, found in problems.items() if found]
+    return rows, errors
+
+
+def import_admins(rows):
+    """Create branch admins for validated ``rows`` and link their branches; returns (users, links)"""
+    hashes = hash_passwords(row['password'] for row in rows)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            phone=row['phone'],
+            user_type='branch_admin',
+            password=password_hash,
+        )
+        for row, password_hash in zip(rows, hashes)
+    ]
+    Membership = Branch.admins.through
+    with db_transaction.atomic():
+        User.objects.bulk_create(users, batch_size=500)
+        if not all(user.pk for user in users):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        links = [
+            Membership(user_id=user.pk, branch_id=branch_id)
+            for user, row in zip(users, rows) for branch_id in dict.fromkeys(row['branch_ids'])
+        ]
+        Membership.objects.bulk_create(links, batch_size=1000)
+    return len(users), len(links)
@@ -0,0 +1,50 @@
+"""
+PDF rendering with WeasyPrint.
+
+Layout is CPU-bound and holds the GIL, so documents are rendered in a
+small, bounded process pool (``PDF_RENDER_WORKERS``) instead of the web or
+job worker threads. Children are spawned, need only WeasyPrint (not
+Django), and are replaced after ``PDF_RENDER_MAX_TASKS`` documents to keep
+their memory in check.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _render(html, base_url):
+    from weasyprint import HTML
+    return HTML(string=html, base_url=base_url).write_pdf()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=settings.PDF_RENDER_MAX_TASKS,
+            )
+        return _pool
+
+
+def render(html, base_url=None):
+    """Render an HTML document to PDF bytes in the render pool."""
+    global _pool
+    pool = get_pool()
+    try:
+        return pool.submit(_render, html, base_url).result(timeout=settings.PDF_RENDER_TIMEOUT)
+    except BrokenProcessPool:
+        # A child died (e.g. out of memory); start a fresh pool for the next document.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
@@ -0,0 +1,113 @@
+"""
+Fiscal period close.
+
+Closing a period snapshots each branch's totals and closing balance and
+its per-category totals. Postings dated on or before the end of the last
+closed period are frozen (``Transaction.clean`` and ``ledger.apply_entries``
+refuse them), so the snapshots never change: balances start from the last
+snapshot and reports take whole closed periods from cache, without expiry,
+aggregating only the open remainder of their range from raw transactions.
+"""
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import (
+    Branch, Category, FiscalPeriod, PeriodBranchBalance, PeriodCategoryTotal, Transaction,
+)
+
+CATEGORY_TOTALS_KEY = 'fiscal_period:{}:category_totals:v3'  # v3: category ids, names joined on read
+
+
+def close_period(period, user):
+    with db_transaction.atomic():
+        period = FiscalPeriod.objects.select_for_update().get(pk=period.pk)
+        if period.is_closed:
+            raise ValidationError(f"{period.name} is already closed.")
+        if period.end_date >= timezone.localdate():
+            raise ValidationError(f"{period.name} has not ended yet.")
+        earlier = FiscalPeriod.objects.filter(
+            is_closed=False, start_date__lt=period.start_date
+        ).order_by('start_date').first()
+        if earlier:
+            raise ValidationError(f"Close {earlier.name} first; periods are closed in order.")
+
+        # Postings share-lock the branch rows (Branch.lock_for_posting), so no
+        # posting can land in the period while it is being snapshotted.
+        branch_ids = list(Branch.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        aggregates = Transaction.objects.ledger_aggregates()
+        in_period = Transaction.objects.filter(date__range=[period.start_date, period.end_date])
+        period_totals = {
+            row['branch']: row for row in in_period.values('branch').annotate(**aggregates).order_by()
+        }
+        cumulative = {
+            row['branch']: row
+            for row in Transaction.objects.filter(date__lte=period.end_date)
+            .values('branch').annotate(**aggregates).order_by()
+        }
+
+        balances = []
+        for branch_id in branch_ids:
+            row = period_totals.get(branch_id, {})
+            to_date = cumulative.get(branch_id, {})
+            balances.append(PeriodBranchBalance(
+                period=period,
+                branch_id=branch_id,
+                income=row.get('income') or Decimal('0'),
+                expenditure=row.get('expenditure') or Decimal('0'),
+                closing_balance=(to_date.get('income') or Decimal('0')) - (to_date.get('expenditure') or Decimal('0')),
+            ))
+        PeriodBranchBalance.objects.bulk_create(balances)
+
+        PeriodCategoryTotal.objects.bulk_create([
+            PeriodCategoryTotal(
+                period=period,
+                branch_id=row['branch'],
+                transaction_type=row['transaction_type'],
+                category_id=row['category'],
+                total=row['total'],
+                count=row['count'],
+            )
+            for row in in_period.values(
+                'branch', 'transaction_type', 'category'
+            ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+        ])
+
+        period.is_closed = True
+        period.closed_date = timezone.now()
+        period.closed_by = user
+        period.save()
+    return period
+
+
+def category_totals(period_id):
+    """
+    Category totals of a closed period. Closed periods never change, so the
+    rows are cached without a timeout; category names can, so they are
+    looked up on each read.
+    """
+    key = CATEGORY_TOTALS_KEY.format(period_id)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(PeriodCategoryTotal.objects.filter(period_id=period_id).values(
+            'branch_id', 'transaction_type', 'total', 'count', 'category_id',
+        ))
+        cache.set(key, rows, timeout=None)
+    names = dict(Category.objects.filter(
+        pk__in={row['category_id'] for row in rows if row['category_id'] is not None}
+    ).values_list('pk', 'name'))
+    return [{**row, 'category__name': names.get(row['category_id'])} for row in rows]
+
+
+def closed_periods_within(start_date, end_date):
+    """Closed periods lying entirely inside the range"""
+    return list(FiscalPeriod.objects.filter(
+        is_closed=True, start_date__gte=start_date, end_date__lte=end_date
+    ).order_by('start_date'))
+
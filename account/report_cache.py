@@ -0,0 +1,174 @@
+"""
+Report result cache with single-flight recomputation.
+
+Entries are stored under a key built from the report's scope, branch
+filter, date range and type, and tagged with the ledger version that was
+current when they were computed. Every committed posting (and every change
+to branches, categories or fiscal periods) bumps the version, which is
+kept in the database (``LedgerVersion``) so every worker sees the bump
+whatever cache it uses, so:
+
+* same version: the entry is served as is (hit);
+* older version: the stale entry is served immediately while a single
+  background refresh recomputes it (stale-while-revalidate);
+* no entry: one request computes it and identical concurrent requests wait
+  for that result instead of running the same aggregates (single flight).
+  Waiters in the same process share a future; other processes poll the
+  cache while the computing process holds the entry's lock.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
+from django.db.models import F
+
+from .models import LedgerVersion
+
+STATS_KEY = 'report_cache:stats:{}'
+STATS = ('hits', 'misses', 'stale', 'coalesced')
+
+logger = logging.getLogger(__name__)
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_refresh_executor = None
+
+
+def make_key(*parts):
+    return 'report:' + ':'.join(str(part) for part in parts)
+
+
+def ledger_version():
+    # Always the primary: a lagging replica would hand out an old version.
+    versions = LedgerVersion.objects.using(DEFAULT_DB_ALIAS)
+    version = versions.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        version = versions.get_or_create(pk=1)[0].version
+    return version
+
+
+def bump_ledger_version():
+    # Runs on commit, outside the posting's transaction, so the counter row
+    # is only locked for this one statement.
+    if not LedgerVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        LedgerVersion.objects.get_or_create(pk=1)
+        LedgerVersion.objects.filter(pk=1).update(version=F('version') + 1)
+
+
+def _count(stat):
+    key = STATS_KEY.format(stat)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+def stats():
+    counts = {stat: cache.get(STATS_KEY.format(stat), 0) for stat in STATS}
+    served = counts['hits'] + counts['stale'] + counts['coalesced']
+    requests = served + counts['misses']
+    counts['hit_rate'] = round(served / requests, 4) if requests else None
+    return counts
+
+
+def reset_stats():
+    cache.delete_many([STATS_KEY.format(stat) for stat in STATS])
+
+
+def fetch(key, compute):
+    """Return the cached results for ``key``, computing them with ``compute()`` if needed."""
+    if not settings.REPORT_CACHE:
+        return compute()
+
+    version = ledger_version()
+    entry = cache.get(key)
+    if entry is not None and entry['version'] == version:
+        _count('hits')
+        return entry['results']
+    if entry is not None:
+        _count('stale')
+        _schedule_refresh(key, version, compute)
+        return entry['results']
+    return _single_flight(key, version, compute)
+
+
+def _store(key, version, results):
+    cache.set(key, {'version': version, 'results': results}, settings.REPORT_CACHE_TIMEOUT)
+
+
+def _single_flight(key, version, compute):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        _count('coalesced')
+        try:
+            return future.result(timeout=settings.REPORT_CACHE_LOCK_TIMEOUT)
+        except TimeoutError:
+            return compute()
+
+    _count('misses')
+    try:
+        results = _compute_locked(key, version, compute)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(results)
+        return results
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _compute_locked(key, version, compute):
+    lock_key = f'{key}:lock'
+    timeout = settings.REPORT_CACHE_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+    while not cache.add(lock_key, 1, timeout):
+        # Another process is computing this report; wait for its result.
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] >= version:
+            return entry['results']
+
+    try:
+        results = compute()
+        _store(key, version, results)
+        return results
+    finally:
+        cache.delete(lock_key)
+
+
+def _schedule_refresh(key, version, compute):
+    global _refresh_executor
+    with _inflight_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report-refresh')
+    # Carry the request's context (replica routing) into the refresh thread.
+    _refresh_executor.submit(contextvars.copy_context().run, _refresh, key, version, compute)
+
+
+def _refresh(key, version, compute):
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, settings.REPORT_CACHE_LOCK_TIMEOUT):
+        return  # Someone is already recomputing it.
+    try:
+        _store(key, version, compute())
+    except Exception:
+        logger.exception('Background refresh of %s failed', key)
+    finally:
+        cache.delete(lock_key)
+        close_old_connections()
@@ -0,0 +1,875 @@
+"""
+Aggregate queries behind the dashboard and reports pages.
+
+Each ``*_queries`` builder returns a dict of independent zero-argument
+callables, one database round trip each. The sync views run them one after
+another with ``run_queries``; the async views run them concurrently on a
+bounded thread pool with ``arun_queries``, so page latency follows the
+slowest query instead of the sum of all of them.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.db.models import (
+    Case, Count, F, OuterRef, Q, RowRange, Sum, When, Window,
+)
+
+from . import periods, report_cache, search
+from .fields import MoneyField
+from .models import Branch, BranchDailyBalance, FundAllocation, LedgerCube, Transaction, User
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.AGGREGATE_QUERY_WORKERS,
+            thread_name_prefix='aggregates',
+        )
+    return _executor
+
+
+def run_queries(queries):
+    return {name: query() for name, query in queries.items()}
+
+
+def _run_in_pool(query):
+    try:
+        return query()
+    finally:
+        # Pool threads keep their own connections; honour CONN_MAX_AGE.
+        close_old_connections()
+
+
+async def arun_queries(queries):
+    executor = get_executor()
+    names = list(queries)
+    results = await asyncio.gather(*(
+        SyncToAsync(_run_in_pool, thread_sensitive=False, executor=executor)(queries[name])
+        for name in names
+    ))
+    return dict(zip(names, results))
+
+
+# Dashboard
+
+def get_main_branch(user):
+    # Get main branch (Enugu) or create one if it doesn't exist
+    main_branch, created = Branch.objects.get_or_create(
+        branch_type='main',
+        defaults={
+            'name': 'Main Branch',
+            'location': 'Enugu',
+            'state': 'Enugu State',
+            'address': 'Main Office Address',
+            'created_by': user
+        }
+    )
+    return main_branch
+
+
+def super_admin_dashboard_queries(main_branch):
+    sub_branches = Branch.objects.filter(branch_type='sub', is_active=True).order_by('-created_date')
+    return {
+        'main_totals': main_branch.get_totals,
+        # All branches combined
+        'totals': lambda: Transaction.objects.active().totals(),
+        # Total allocated funds
+        'total_allocated': lambda: Branch.objects.filter(
+            is_active=True
+        ).aggregate(Sum('allocated_funds'))['allocated_funds__sum'] or Decimal('0'),
+        'recent_transactions': lambda: list(Transaction.objects.active().select_related(
+            'branch', 'created_by'
+        ).order_by('-created_date')[:10]),
+        # Branch statistics
+        'active_admins': lambda: User.objects.filter(
+            user_type='branch_admin',
+            is_active=True
+        ).count(),
+        'sub_branches': lambda: list(sub_branches),
+        'all_branches': lambda: list(Branch.objects.filter(is_active=True)),
+    }
+
+
+def super_admin_dashboard_context(main_branch, results):
+    main_income = results['main_totals']['income']
+    main_expenditure = results['main_totals']['expenditure']
+    main_balance = main_income - main_expenditure
+    total_income = results['totals']['income']
+    total_expenditure = results['totals']['expenditure']
+    return {
+        'main_branch': main_branch,
+        'sub_branches': results['sub_branches'],
+        'all_branches': results['all_branches'],
+        'main_income': main_income,
+        'main_expenditure': main_expenditure,
+        'main_balance': main_balance,
+        # Available funds for allocation (main branch balance)
+        'available_for_allocation': main_balance,
+        'total_income': total_income,
+        'total_expenditure': total_expenditure,
+        'total_balance': total_income - total_expenditure,
+        'total_allocated': results['total_allocated'],
+        'recent_transactions': results['recent_transactions'],
+        'branches_count': len(results['sub_branches']),
+        'active_admins': results['active_admins'],
+    }
+
+
+def branch_dashboard_queries(branch):
+    return {
+        'branch_totals': branch.get_totals,
+        'recent_transactions': lambda: list(branch.transactions.select_related(
+            'category', 'created_by'
+        ).order_by('-created_date')[:10]),
+    }
+
+
+def branch_dashboard_context(branch, results):
+    branch_income = results['branch_totals']['income']
+    branch_expenditure = results['branch_totals']['expenditure']
+    return {
+        'branch': branch,
+        'branch_income': branch_income,
+        'branch_expenditure': branch_expenditure,
+        'branch_balance': branch_income - branch_expenditure,
+        'recent_transactions': results['recent_transactions'],
+    }
+
+
+# Transactions
+
+def category_filter(query_params):
+    """
+    Q filtering a category-keyed queryset (transactions, cube cells) by the
+    ``category`` parameter, or the older per-kind ``income_category`` /
+    ``expenditure_category`` ones; None without a category. A per-kind
+    parameter only matches a category of that kind: expenditure categories
+    were renumbered when the two kinds were merged (migration 0016), so an
+    old link's id may now belong to an income category.
+    """
+    value = query_params.get('category')
+    if value and str(value).isdigit():
+        return Q(category_id=value)
+    for category_type in ('income', 'expenditure'):
+        value = query_params.get(f'{category_type}_category')
+        if value and str(value).isdigit():
+            return Q(category_id=value, category__category_type=category_type)
+    return None
+
+
+# The query parameters transaction_list filters on
+TRANSACTION_FILTERS = (
+    'branch', 'type', 'category', 'income_category', 'expenditure_category', 'start_date', 'end_date', 'q',
+)
+
+
+def transaction_list(user, query_params):
+    """
+    The transactions page's queryset for ``user`` with its filters applied,
+    newest first. None when a branch admin has no branch.
+    """
+    if user.user_type == 'super_admin':
+        transactions_list = Transaction.objects.active().select_related(
+            'branch', 'created_by', 'category'
+        )
+    else:
+        branch = user.managed_branch
+        if not branch:
+            return None
+        transactions_list = branch.transactions.select_related(
+            'created_by', 'category'
+        )
+
+    # Filter by branch if requested
+    branch_filter = query_params.get('branch')
+    if branch_filter and user.user_type == 'super_admin':
+        transactions_list = transactions_list.filter(branch_id=branch_filter)
+
+    # Filter by type
+    type_filter = query_params.get('type')
+    if type_filter:
+        transactions_list = transactions_list.filter(transaction_type=type_filter)
+
+    # Filter by category (the income/expenditure selects, or either kind)
+    category = category_filter(query_params)
+    if category is not None:
+        transactions_list = transactions_list.filter(category)
+
+    # Date range filter
+    start_date = query_params.get('start_date')
+    end_date = query_params.get('end_date')
+    if start_date:
+        transactions_list = transactions_list.filter(date__gte=start_date)
+    if end_date:
+        transactions_list = transactions_list.filter(date__lte=end_date)
+
+    # Full-text search on the description
+    q = query_params.get('q', '').strip()
+    if q:
+        transactions_list = transactions_list.filter(search.matches(q))
+
+    return transactions_list.order_by('-date', '-created_date')
+
+
+# Fund allocations
+
+def _parse_decimal(value):
+    try:
+        return Decimal(value) if value else None
+    except (ArithmeticError, ValueError):
+        return None
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def allocation_list(query_params):
+    """Fund allocations with the history page's filters applied, newest first"""
+    allocations = FundAllocation.objects.select_related('from_branch', 'to_branch', 'allocated_by')
+
+    branch_filter = query_params.get('branch')
+    if branch_filter and branch_filter.isdigit():
+        allocations = allocations.filter(Q(from_branch_id=branch_filter) | Q(to_branch_id=branch_filter))
+
+    status_filter = query_params.get('status')
+    if status_filter == 'active':
+        allocations = allocations.filter(is_active=True)
+    elif status_filter == 'reversed':
+        allocations = allocations.filter(is_active=False)
+
+    start_date = _parse_date(query_params.get('start_date'))
+    end_date = _parse_date(query_params.get('end_date'))
+    if start_date:
+        allocations = allocations.filter(allocated_date__date__gte=start_date)
+    if end_date:
+        allocations = allocations.filter(allocated_date__date__lte=end_date)
+
+    min_amount = _parse_decimal(query_params.get('min_amount'))
+    max_amount = _parse_decimal(query_params.get('max_amount'))
+    if min_amount is not None:
+        allocations = allocations.filter(amount__gte=min_amount)
+    if max_amount is not None:
+        allocations = allocations.filter(amount__lte=max_amount)
+
+    return allocations.order_by('-allocated_date', '-id')
+
+
+def allocation_totals(allocations):
+    """
+    Count and total/active/reversed amounts of the filtered allocations, in
+    one aggregate. The amounts only cover allocations to sub-branches: a
+    reversal row (sub to main) returns money already counted as reversed.
+    """
+    allocated = Q(to_branch__branch_type='sub')
+    totals = allocations.order_by().aggregate(
+        count=Count('id'),
+        total=Sum('amount', filter=allocated),
+        active=Sum('amount', filter=allocated & Q(is_active=True)),
+        reversed=Sum('amount', filter=allocated & Q(is_active=False)),
+    )
+    for key in ('total', 'active', 'reversed'):
+        totals[key] = totals[key] or Decimal('0')
+    return totals
+
+
+def allocation_branch_summary(allocations):
+    """
+    Allocated, reversed and net amounts per receiving sub-branch. Reversed
+    allocations are the originals marked inactive; the reversal rows (sub
+    to main) are not counted again.
+    """
+    rows = allocations.filter(to_branch__branch_type='sub').order_by().values(
+        'to_branch_id', 'to_branch__name', 'to_branch__location'
+    ).annotate(
+        allocated=Sum('amount'),
+        reversed=Sum('amount', filter=Q(is_active=False)),
+        allocation_count=Count('id'),
+    ).order_by('to_branch__name')
+    summary = []
+    for row in rows:
+        reversed_amount = row['reversed'] or Decimal('0')
+        summary.append({
+            'branch_id': row['to_branch_id'],
+            'name': row['to_branch__name'],
+            'location': row['to_branch__location'],
+            'allocated': row['allocated'],
+            'reversed': reversed_amount,
+            'net': row['allocated'] - reversed_amount,
+            'count': row['allocation_count'],
+        })
+    return summary
+
+
+# Statements
+
+STATEMENT_PAGE_SIZE = 50
+STATEMENT_ORDER = ('date', 'created_date', 'id')
+
+
+def _statement_salt(branch, start_date):
+    return f'statement:{branch.id}:{start_date.isoformat()}'
+
+
+def statement_page(branch, start_date, end_date, after=None, page_size=STATEMENT_PAGE_SIZE):
+    """
+    One page of a bank-style statement: the branch's postings in
+    ``(date, created_date, id)`` order, each with the balance after it.
+
+    The page's opening balance is computed once (the daily balance before
+    ``start_date`` on the first page, carried in the signed ``after``
+    cursor on later pages) and the running balance is a window sum over
+    the page, so each page is a single keyset query however deep it is.
+    """
+    transactions_qs = branch.transactions.filter(date__range=[start_date, end_date])
+
+    cursor = None
+    if after:
+        try:
+            cursor = signing.loads(after, salt=_statement_salt(branch, start_date))
+        except signing.BadSignature:
+            cursor = None
+    if cursor is None:
+        opening_balance = branch.get_balance_as_of(start_date - timedelta(days=1))
+    else:
+        opening_balance = Decimal(cursor['balance'])
+        last_date = datetime.strptime(cursor['date'], '%Y-%m-%d').date()
+        last_created = datetime.fromisoformat(cursor['created_date'])
+        transactions_qs = transactions_qs.filter(
+            Q(date__gt=last_date)
+            | Q(date=last_date, created_date__gt=last_created)
+            | Q(date=last_date, created_date=last_created, id__gt=cursor['id'])
+        )
+
+    signed_amount = Case(
+        When(transaction_type='income', then=F('amount')),
+        default=-F('amount'),
+        output_field=MoneyField(),
+    )
+    rows = list(transactions_qs.select_related(
+        'category', 'created_by'
+    ).annotate(
+        running_total=Window(
+            Sum(signed_amount),
+            order_by=[F(field).asc() for field in STATEMENT_ORDER],
+            frame=RowRange(start=None, end=0),
+        )
+    ).order_by(*STATEMENT_ORDER)[:page_size + 1])
+
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    for transaction in rows:
+        transaction.balance = opening_balance + transaction.running_total
+
+    next_after = None
+    if has_next:
+        last = rows[-1]
+        next_after = signing.dumps({
+            'date': last.date.isoformat(),
+            'created_date': last.created_date.isoformat(),
+            'id': last.id,
+            'balance': str(last.balance),
+        }, salt=_statement_salt(branch, start_date))
+
+    return {
+        'transactions': rows,
+        'opening_balance': opening_balance,
+        'closing_balance': rows[-1].balance if rows else opening_balance,
+        'is_first_page': cursor is None,
+        'next_after': next_after,
+    }
+
+
+# Reports
+
+def parse_report_params(query_params):
+    start_date = query_params.get('start_date')
+    end_date = query_params.get('end_date')
+
+    # Default to current month if no dates provided
+    if not start_date:
+        start_date = datetime.now().replace(day=1).strftime('%Y-%m-%d')
+    if not end_date:
+        end_date = datetime.now().strftime('%Y-%m-%d')
+
+    # Optional point-in-time balance date
+    as_of = query_params.get('as_of') or None
+
+    # A branch id; anything else (a stale or hand-edited link) shows all branches
+    branch_filter = query_params.get('branch')
+    if branch_filter and not str(branch_filter).isdigit():
+        branch_filter = None
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        # Convert to date objects for filtering
+        'start_date_obj': datetime.strptime(start_date, '%Y-%m-%d').date(),
+        'end_date_obj': datetime.strptime(end_date, '%Y-%m-%d').date(),
+        'report_type': query_params.get('report_type', 'overview'),
+        'branch_filter': branch_filter,
+        'as_of': as_of,
+        'as_of_obj': datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None,
+    }
+
+
+def _next_month(date):
+    return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_range(start_date, end_date, closed_periods):
+    """
+    Split a date range around its closed fiscal periods into the whole
+    calendar months answered from the ledger cube and the leftover day
+    ranges that have to be read from raw transactions.
+    """
+    gaps, cursor = [], start_date
+    for period in closed_periods:
+        if period.start_date > cursor:
+            gaps.append((cursor, period.start_date - timedelta(days=1)))
+        cursor = period.end_date + timedelta(days=1)
+    if cursor <= end_date:
+        gaps.append((cursor, end_date))
+
+    months, raw_ranges = [], []
+    for gap_start, gap_end in gaps:
+        first = month = gap_start if gap_start.day == 1 else _next_month(gap_start)
+        while _next_month(month) - timedelta(days=1) <= gap_end:
+            months.append(month)
+            month = _next_month(month)
+        if month == first:
+            raw_ranges.append((gap_start, gap_end))
+            continue
+        if first > gap_start:
+            raw_ranges.append((gap_start, first - timedelta(days=1)))
+        if month <= gap_end:
+            raw_ranges.append((month, gap_end))
+    return months, raw_ranges
+
+
+def report_scope(user, params):
+    """
+    The report's transactions, split by where each part of the range is
+    answered from: closed fiscal periods from their snapshots, whole months
+    from the ledger cube and only the remaining days (``open_transactions``)
+    from raw transactions.
+    """
+    transactions_qs = Transaction.objects.active().filter(
+        date__range=[params['start_date_obj'], params['end_date_obj']],
+    )
+    branch_id = None
+    empty = False
+
+    # Filter by user type and branch
+    if user.user_type == 'super_admin':
+        # Super admin can see all branches or filter by specific branch
+        if params['branch_filter']:
+            branch_id = int(params['branch_filter'])
+            transactions_qs = transactions_qs.filter(branch_id=branch_id)
+    else:
+        # Branch admin can only see their own branch
+        branch = user.managed_branch
+        if branch:
+            branch_id = branch.id
+            transactions_qs = transactions_qs.filter(branch=branch)
+        else:
+            transactions_qs = Transaction.objects.none()
+            empty = True
+
+    closed_periods, cube_months = [], []
+    open_transactions = transactions_qs
+    if not empty:
+        closed_periods = periods.closed_periods_within(params['start_date_obj'], params['end_date_obj'])
+        cube_months, raw_ranges = split_range(params['start_date_obj'], params['end_date_obj'], closed_periods)
+        raw_dates = Q()
+        for range_start, range_end in raw_ranges:
+            raw_dates |= Q(date__range=[range_start, range_end])
+        open_transactions = transactions_qs.filter(raw_dates) if raw_ranges else Transaction.objects.none()
+    return {
+        'transactions': transactions_qs,
+        'open_transactions': open_transactions,
+        'branch_id': branch_id,
+        'closed_periods': closed_periods,
+        'cube_months': cube_months,
+    }
+
+
+def closed_period_rows(scope):
+    """Cached category totals of the scope's closed periods, limited to its active branches"""
+    if not scope['closed_periods']:
+        return []
+    active = set(Branch.objects.filter(is_active=True).values_list('id', flat=True))
+    if scope['branch_id'] is not None:
+        active &= {scope['branch_id']}
+    return [
+        row
+        for period in scope['closed_periods']
+        for row in periods.category_totals(period.id)
+        if row['branch_id'] in active
+    ]
+
+
+def cube_rows(scope):
+    """Category totals of the scope's whole months from the ledger cube, in one grouped query"""
+    if not scope['cube_months']:
+        return []
+    cells = LedgerCube.objects.filter(month__in=scope['cube_months'], branch__is_active=True)
+    if scope['branch_id'] is not None:
+        cells = cells.filter(branch_id=scope['branch_id'])
+    return [
+        {
+            'branch_id': row['branch_id'],
+            'transaction_type': row['transaction_type'],
+            'category__name': row['category__name'],
+            'total': row['cell_total'],
+            'count': row['cell_count'],
+        }
+        # Emptied cells are dropped after summing: a cell's shards can hold negative counts.
+        for row in cells.values(
+            'branch_id', 'transaction_type', 'category__name'
+        ).annotate(cell_total=Sum('total'), cell_count=Sum('count')).filter(cell_count__gt=0).order_by()
+    ]
+
+
+# Ledger cube drill-down: dimension name -> cube columns it groups by
+CUBE_DIMENSIONS = {
+    'branch': ('branch_id', 'branch__name'),
+    'type': ('transaction_type',),
+    'category': ('category_id', 'category__name'),
+    'month': ('month',),
+}
+
+
+def _parse_month(value):
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def cube_drilldown(user, query_params):
+    """
+    Ledger cube totals filtered and grouped by any subset of the branch,
+    type, category and month dimensions. Raises ValueError on bad input.
+    """
+    group_by = [name for name in query_params.get('group_by', '').split(',') if name]
+    unknown = set(group_by) - set(CUBE_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}. "
+                         f"Choose from {', '.join(CUBE_DIMENSIONS)}.")
+
+    cells = LedgerCube.objects.filter(branch__is_active=True)
+    if user.user_type == 'super_admin':
+        if query_params.get('branch'):
+            cells = cells.filter(branch_id=int(query_params['branch']))
+    else:
+        branch = user.managed_branch
+        cells = cells.filter(branch_id=branch.id) if branch else cells.none()
+
+    if query_params.get('type'):
+        cells = cells.filter(transaction_type=query_params['type'])
+    category = category_filter(query_params)
+    if category is not None:
+        cells = cells.filter(category)
+    if query_params.get('start_month'):
+        cells = cells.filter(month__gte=_parse_month(query_params['start_month']))
+    if query_params.get('end_month'):
+        cells = cells.filter(month__lte=_parse_month(query_params['end_month']))
+
+    columns = [column for name in group_by for column in CUBE_DIMENSIONS[name]]
+    if columns:
+        rows = cells.values(*columns).annotate(
+            cell_total=Sum('total'), cell_count=Sum('count')
+        ).filter(cell_count__gt=0).order_by(*columns)
+    else:
+        rows = [cells.aggregate(cell_total=Sum('total'), cell_count=Sum('count'))]
+
+    results = []
+    for row in rows:
+        result = {}
+        if 'branch' in group_by:
+            result['branch_id'] = row['branch_id']
+            result['branch'] = row['branch__name']
+        if 'type' in group_by:
+            result['transaction_type'] = row['transaction_type']
+        if 'category' in group_by:
+            result['category_id'] = row['category_id']
+            result['category'] = row['category__name']
+        if 'month' in group_by:
+            result['month'] = row['month'].strftime('%Y-%m')
+        result['total'] = row['cell_total'] or Decimal('0')
+        result['count'] = row['cell_count'] or 0
+        results.append(result)
+    return {'group_by': group_by, 'rows': results}
+
+
+def as_of_balances(user, params):
+    """Each in-scope branch's closing balance on ``as_of``: one indexed lookup per branch shard."""
+    branches = Branch.objects.filter(is_active=True)
+    if user.user_type == 'super_admin':
+        if params['branch_filter']:
+            branches = branches.filter(id=params['branch_filter'])
+    else:
+        branch = user.managed_branch
+        branches = branches.filter(id=branch.id if branch else None)
+
+    closing_balance = BranchDailyBalance.balance_as_of(OuterRef('pk'), params['as_of_obj'])
+    return [
+        {'branch': branch, 'balance': branch.as_of_balance or Decimal('0')}
+        for branch in branches.annotate(as_of_balance=closing_balance).order_by('name')
+    ]
+
+
+def report_cache_key(user, params, scope):
+    """Report cache key; entries are also tagged with the ledger version (see report_cache)."""
+    user_scope = 'all' if user.user_type == 'super_admin' else f"branch-{scope['branch_id']}"
+    return report_cache.make_key(
+        user_scope,
+        scope['branch_id'] or 'all',
+        params['start_date_obj'].isoformat(),
+        params['end_date_obj'].isoformat(),
+        params['report_type'],
+        params['as_of_obj'].isoformat() if params['as_of_obj'] else '-',
+        # Daily trends and the monthly comparison are relative to today
+        datetime.now().date().isoformat(),
+    )
+
+
+def report_queries(user, params, scope):
+    transactions_qs = scope['transactions']
+    # Totals, categories and branch figures: closed periods come from their
+    # snapshots (closed_rows), whole months from the ledger cube (cube_rows)
+    # and only the remaining days from the open transactions.
+    open_qs = scope['open_transactions']
+    today = datetime.now().date()
+
+    # Monthly comparison (current vs previous month)
+    current_month_start = today.replace(day=1)
+    previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+    previous_month_end = current_month_start - timedelta(days=1)
+
+    queries = {
+        'closed_rows': lambda: closed_period_rows(scope),
+        'cube_rows': lambda: cube_rows(scope),
+        # Financial metrics (sums and counts in one query)
+        'totals': open_qs.totals,
+        # Daily transaction trends (last 30 days), grouped in one query
+        'daily_totals': lambda: {
+            row['date']: row
+            for row in transactions_qs.filter(date__gt=today - timedelta(days=30))
+            .values('date').annotate(**Transaction.objects.ledger_aggregates()).order_by()
+        },
+        # Category totals; the top five are picked after merging closed periods
+        'income_categories': lambda: list(open_qs.filter(transaction_type='income').values(
+            'category__name'
+        ).annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        ).order_by()),
+        'expenditure_categories': lambda: list(open_qs.filter(transaction_type='expenditure').values(
+            'category__name'
+        ).annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        ).order_by()),
+        # Recent transactions
+        'recent_transactions': lambda: list(transactions_qs.select_related(
+            'branch', 'created_by', 'category'
+        ).order_by('-created_date')[:10]),
+        'current_month_income': lambda: transactions_qs.filter(
+            transaction_type='income',
+            date__gte=current_month_start
+        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0'),
+        'previous_month_income': lambda: Transaction.objects.active().filter(
+            transaction_type='income',
+            date__range=[previous_month_start, previous_month_end],
+        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0'),
+    }
+
+    if params['as_of_obj']:
+        queries['as_of_balances'] = lambda: as_of_balances(user, params)
+
+    # Branch performance (super admin only)
+    if user.user_type == 'super_admin':
+        queries['branches'] = lambda: list(Branch.objects.filter(is_active=True).order_by('name'))
+        queries['branch_totals'] = lambda: {
+            row['branch']: row
+            for row in open_qs.values('branch')
+            .annotate(**Transaction.objects.ledger_aggregates()).order_by()
+        }
+    return queries
+
+
+def _merge_summary_rows(results):
+    """Fold the closed-period and ledger cube rows into the open-range aggregates."""
+    totals = dict(results['totals'])
+    # Rows carry ``category__name``; the context keeps the per-type keys
+    # (``income_category__name``) that templates and saved snapshots use.
+    categories = {'income': {}, 'expenditure': {}}
+    for transaction_type in categories:
+        name_key = f'{transaction_type}_category__name'
+        for row in results[f'{transaction_type}_categories']:
+            categories[transaction_type][row['category__name']] = {
+                name_key: row['category__name'], 'total': row['total'], 'count': row['count'],
+            }
+
+    branch_totals = {branch_id: dict(row) for branch_id, row in (results.get('branch_totals') or {}).items()}
+    for row in results['closed_rows'] + results['cube_rows']:
+        transaction_type = row['transaction_type']
+        totals[transaction_type] += row['total']
+        totals[f'{transaction_type}_count'] += row['count']
+
+        name_key = f'{transaction_type}_category__name'
+        name = row['category__name']
+        category = categories[transaction_type].setdefault(name, {name_key: name, 'total': Decimal('0'), 'count': 0})
+        category['total'] += row['total']
+        category['count'] += row['count']
+
+        if 'branch_totals' in results:
+            branch = branch_totals.setdefault(row['branch_id'], {})
+            branch[transaction_type] = (branch.get(transaction_type) or Decimal('0')) + row['total']
+            branch[f'{transaction_type}_count'] = branch.get(f'{transaction_type}_count', 0) + row['count']
+
+    top = {
+        transaction_type: sorted(rows.values(), key=lambda row: row['total'], reverse=True)[:5]
+        for transaction_type, rows in categories.items()
+    }
+    return totals, top['income'], top['expenditure'], branch_totals
+
+
+def report_context(user, params, results):
+    totals, income_categories, expenditure_categories, branch_totals = _merge_summary_rows(results)
+    total_income = totals['income']
+    total_expenditure = totals['expenditure']
+
+    # Transaction counts
+    income_count = totals['income_count']
+    expenditure_count = totals['expenditure_count']
+    total_transactions = income_count + expenditure_count
+
+    # Calculate average transaction value
+    average_transaction_value = Decimal('0')
+    if total_transactions > 0:
+        total_amount = total_income + total_expenditure
+        average_transaction_value = total_amount / total_transactions
+
+    today = datetime.now().date()
+    daily_trends = []
+    for i in range(30):
+        date = today - timedelta(days=i)
+        day = results['daily_totals'].get(date, {})
+        day_income = day.get('income') or Decimal('0')
+        day_expenditure = day.get('expenditure') or Decimal('0')
+        daily_trends.append({
+            'date': date,
+            'income': day_income,
+            'expenditure': day_expenditure,
+            'net': day_income - day_expenditure
+        })
+
+    branches = results.get('branches')
+    branch_performance = []
+    for branch in branches or []:
+        row = branch_totals.get(branch.id, {})
+        branch_income = row.get('income') or Decimal('0')
+        branch_expenditure = row.get('expenditure') or Decimal('0')
+        branch_performance.append({
+            'branch': branch,
+            'income': branch_income,
+            'expenditure': branch_expenditure,
+            'net': branch_income - branch_expenditure,
+            'transaction_count': row.get('income_count', 0) + row.get('expenditure_count', 0)
+        })
+
+    current_month_income = results['current_month_income']
+    previous_month_income = results['previous_month_income']
+    income_growth = 0
+    if previous_month_income > 0:
+        income_growth = ((current_month_income - previous_month_income) / previous_month_income) * 100
+
+    return {
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'report_type': params['report_type'],
+        'branches': branches,
+        'selected_branch': params['branch_filter'],
+        'total_income': total_income,
+        'total_expenditure': total_expenditure,
+        'net_balance': total_income - total_expenditure,
+        'income_count': income_count,
+        'expenditure_count': expenditure_count,
+        'total_transactions': total_transactions,
+        'average_transaction_value': average_transaction_value,
+        'daily_trends': daily_trends,
+        'income_categories': income_categories,
+        'expenditure_categories': expenditure_categories,
+        'branch_performance': branch_performance,
+        'recent_transactions': results['recent_transactions'],
+        'current_month_income': current_month_income,
+        'previous_month_income': previous_month_income,
+        'income_growth': income_growth,
+        'as_of': params['as_of'],
+        'as_of_balances': results.get('as_of_balances'),
+    }
+
+
+# Workbook export
+
+def report_sheets(user, params):
+    """
+    The reports page's data as (title, header, rows) sheets for the Excel
+    export. Rows come from grouped queries read with ``iterator()``, so a
+    sheet is never held in memory whatever the date range.
+    """
+    transactions_qs = report_scope(user, params)['transactions']
+    aggregates = Transaction.objects.ledger_aggregates()
+
+    def summary():
+        totals = transactions_qs.totals()
+        yield ['Period', f"{params['start_date']} to {params['end_date']}"]
+        yield ['Total Income', totals['income']]
+        yield ['Total Expenditure', totals['expenditure']]
+        yield ['Net Balance', totals['income'] - totals['expenditure']]
+        yield ['Income Transactions', totals['income_count']]
+        yield ['Expenditure Transactions', totals['expenditure_count']]
+
+    def daily():
+        rows = transactions_qs.values('date').annotate(**aggregates).order_by('date')
+        for row in rows.iterator(chunk_size=2000):
+            income = row['income'] or Decimal('0')
+            expenditure = row['expenditure'] or Decimal('0')
+            yield [row['date'], income, expenditure, income - expenditure,
+                   row['income_count'] + row['expenditure_count']]
+
+    def categories(transaction_type):
+        rows = transactions_qs.filter(transaction_type=transaction_type).values('category__name').annotate(
+            total=Sum('amount'), count=Count('id')
+        ).order_by('-total')
+        for row in rows.iterator(chunk_size=2000):
+            yield [row['category__name'] or 'Uncategorized', row['count'], row['total']]
+
+    def branches():
+        rows = transactions_qs.values('branch__name', 'branch__location').annotate(**aggregates).order_by('branch__name')
+        for row in rows.iterator(chunk_size=2000):
+            income = row['income'] or Decimal('0')
+            expenditure = row['expenditure'] or Decimal('0')
+            yield [row['branch__name'], row['branch__location'], income, expenditure, income - expenditure,
+                   row['income_count'] + row['expenditure_count']]
+
+    return [
+        ('Summary', ['Item', 'Value'], summary()),
+        ('Daily Trends', ['Date', 'Income', 'Expenditure', 'Net', 'Transactions'], daily()),
+        ('Income Categories', ['Category', 'Transactions', 'Total'], categories('income')),
+        ('Expenditure Categories', ['Category', 'Transactions', 'Total'], categories('expenditure')),
+        ('Branch Performance', ['Branch', 'Location', 'Income', 'Expenditure', 'Net', 'Transactions'], branches()),
+    ]
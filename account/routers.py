@@ -0,0 +1,67 @@
+"""
+Database routing for the optional read replica.
+
+Views decorated with ``read_replica`` send their reads to
+``settings.REPLICA_DATABASE`` when it is configured. Writes always go to the
+primary, and a user who has just posted is pinned to the primary for
+``REPLICA_PIN_SECONDS`` (see ``ReplicaPinMiddleware``) so they always see
+their own postings.
+"""
+
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+read_intent = contextvars.ContextVar('read_intent', default=False)
+pinned_to_primary = contextvars.ContextVar('pinned_to_primary', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_enabled():
+    return settings.REPLICA_DATABASE in settings.DATABASES
+
+
+def read_replica(view_func):
+    """Mark a view's safe (GET/HEAD) requests as read-only reporting traffic."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            token = read_intent.set(request.method in SAFE_METHODS)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                read_intent.reset(token)
+    else:
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            token = read_intent.set(request.method in SAFE_METHODS)
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                read_intent.reset(token)
+    return _wrapped_view
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if read_intent.get() and not pinned_to_primary.get() and replica_enabled():
+            return settings.REPLICA_DATABASE
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Objects read from the replica still save to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is populated by replication, never migrated directly.
+        return db != settings.REPLICA_DATABASE
@@ -0,0 +1,85 @@
+"""
+Full-text search over transaction descriptions.
+
+The index is created by migration 0012 for the database in use (and its
+SQLite triggers restored by the later migrations that rebuild the table):
+
+* SQLite: an FTS5 table (``account_transaction_fts``) over
+  ``account_transaction.description``, kept in sync by triggers;
+* PostgreSQL: a stored ``search_vector`` tsvector column with a GIN index.
+
+Other backends fall back to ``description__icontains``. Matches are ranked
+(bm25 / ts_rank) and highlighted by the database; snippets are escaped here
+before the match markers are turned into ``<mark>`` tags.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'account_transaction_fts'
+SEARCH_CONFIG = 'english'
+
+# Private-use characters mark matches in snippets; they cannot come from escape().
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+
+def _fts5_query(q):
+    """Each word as a quoted prefix term, so user input is never FTS5 syntax"""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', q))
+
+
+def matches(q):
+    """Filter for transactions whose description matches ``q``"""
+    if connection.vendor == 'sqlite':
+        return Q(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_fts5_query(q) or '""']
+        ))
+    if connection.vendor == 'postgresql':
+        return Q(id__in=RawSQL(
+            'SELECT id FROM account_transaction '
+            f"WHERE search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s)", [q]
+        ))
+    return Q(description__icontains=q)
+
+
+def ranked(queryset, q):
+    """
+    ``queryset`` (already filtered with ``matches``) best match first, with
+    ``search_rank`` and a ``search_snippet`` to pass to ``highlight``.
+    """
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(q) or '""'
+        lookup = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = account_transaction.id'
+        queryset = queryset.annotate(
+            search_rank=RawSQL(f'(SELECT -bm25({FTS_TABLE}) {lookup})', [match], output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"(SELECT snippet({FTS_TABLE}, 0, %s, %s, '…', 16) {lookup})",
+                [MARK_START, MARK_END, match], output_field=TextField(),
+            ),
+        )
+    elif connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        queryset = queryset.annotate(
+            search_rank=RawSQL(f'ts_rank(account_transaction.search_vector, {tsquery})', [q], output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"ts_headline('{SEARCH_CONFIG}', account_transaction.description, {tsquery}, %s)",
+                [q, f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8'],
+                output_field=TextField(),
+            ),
+        )
+    else:
+        return queryset
+    return queryset.order_by('-search_rank', '-date', '-created_date')
+
+
+def highlight(snippet):
+    """Escaped snippet with its matches wrapped in <mark>"""
+    if not snippet:
+        return ''
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
@@ -0,0 +1,68 @@
+from django.db import transaction as db_transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import ledger, report_cache
+from .events import allocation_event, broadcaster, transaction_events
+from .models import (
+    Branch, Category, ExpenditureCategory, FiscalPeriod, FundAllocation, IncomeCategory, Transaction,
+)
+
+
+@receiver(post_save, sender=Transaction, dispatch_uid='account.ledger_save')
+def maintain_ledger_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        ledger.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Transaction, dispatch_uid='account.ledger_delete')
+def maintain_ledger_on_delete(sender, instance, origin=None, **kwargs):
+    # A branch deletion removes the branch's derived rows with it.
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not Branch:
+        ledger.record_delete(instance)
+
+
+@receiver(post_save, sender=Transaction, dispatch_uid='account.publish_transaction')
+def publish_transaction(sender, instance, created, raw=False, **kwargs):
+    if raw or not broadcaster.subscriber_count:
+        return
+    if created:
+        _publish(transaction_events(instance, 'created'))
+        return
+    # _ledger_state still holds the values from before this save (see Transaction.save).
+    old_state = getattr(instance, '_ledger_state', None)
+    if old_state is not None and set(old_state) != set(Transaction.LEDGER_FIELDS):
+        old_state = None
+    _publish(transaction_events(instance, 'updated', old_state))
+
+
+@receiver(post_delete, sender=Transaction, dispatch_uid='account.publish_transaction_delete')
+def publish_transaction_delete(sender, instance, origin=None, **kwargs):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if broadcaster.subscriber_count and origin_model is not Branch:
+        state = {field: getattr(instance, field) for field in Transaction.LEDGER_FIELDS}
+        _publish(transaction_events(instance, 'deleted', state))
+
+
+def _publish(events):
+    for event in events:
+        db_transaction.on_commit(lambda event=event: broadcaster.publish(event))
+
+
+@receiver(post_save, sender=FundAllocation, dispatch_uid='account.publish_allocation')
+def publish_allocation(sender, instance, created, **kwargs):
+    if created and broadcaster.subscriber_count:
+        event = allocation_event(instance)
+        db_transaction.on_commit(lambda: broadcaster.publish(event))
+
+
+def invalidate_reports(sender, **kwargs):
+    # Reports depend on branch status, category names and period snapshots too.
+    db_transaction.on_commit(report_cache.bump_ledger_version)
+
+
+for model in (Branch, Category, IncomeCategory, ExpenditureCategory, FiscalPeriod):
+    post_save.connect(invalidate_reports, sender=model, dispatch_uid=f'account.invalidate_reports_save.{model.__name__}')
+    post_delete.connect(invalidate_reports, sender=model, dispatch_uid=f'account.invalidate_reports_delete.{model.__name__}')
@@ -0,0 +1,153 @@
+"""
+PDF branch statements and report exports.
+
+Documents are rendered by the job runner (see tasks.py) through
+``pdf.render`` and kept in ``default_storage`` (MEDIA_ROOT, or the
+configured django-storages backend) under a name built from the branch,
+the date range and the ledger version. The version changes with every
+committed posting (see report_cache), so a request for a document that is
+already stored is served the file and nothing is re-rendered until the
+ledger moves. Storing a new version deletes the older versions of the same
+document, so each document keeps at most one file.
+"""
+
+import posixpath
+import re
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import pdf, report_cache, reporting
+from .models import SavedReport, Transaction
+
+
+def _branch_key(user, branch_filter):
+    """'all' or 'branch-<id>' for the branches ``user`` can see; None without a branch"""
+    if user.user_type == 'super_admin':
+        if not branch_filter:
+            return 'all'
+        return f'branch-{branch_filter}' if str(branch_filter).isdigit() else None
+    branch = user.managed_branch
+    return f'branch-{branch.id}' if branch else None
+
+
+def statement_params(user, query_params):
+    """Job params for a branch statement, including its storage path; None if out of scope"""
+    params = reporting.parse_report_params(query_params)
+    branch_key = _branch_key(user, params['branch_filter'])
+    if branch_key is None:
+        return None
+    return {
+        'branch': '' if branch_key == 'all' else branch_key.split('-')[1],
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'path': (
+            f"statements/statement_{branch_key}_{params['start_date']}_{params['end_date']}"
+            f"_v{report_cache.ledger_version()}.pdf"
+        ),
+    }
+
+
+def report_params(user, query_params):
+    """Job params for a report export, including its storage path; None if out of scope"""
+    params = reporting.parse_report_params(query_params)
+    branch_key = _branch_key(user, params['branch_filter'])
+    if branch_key is None or params['report_type'] not in dict(SavedReport.REPORT_TYPES):
+        return None
+    user_scope = 'all' if user.user_type == 'super_admin' else 'own'
+    return {
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        'report_type': params['report_type'],
+        'branch': params['branch_filter'] or '',
+        'as_of': params['as_of'] or '',
+        'path': (
+            f"reports/report_{user_scope}_{branch_key}_{params['report_type']}"
+            f"_{params['start_date']}_{params['end_date']}_{params['as_of'] or 'none'}"
+            f"_v{report_cache.ledger_version()}.pdf"
+        ),
+    }
+
+
+def statement_context(user, params):
+    """Opening balance, the range's postings in date order, totals and closing balance"""
+    report_params = reporting.parse_report_params(params)
+    start_date = report_params['start_date_obj']
+    end_date = report_params['end_date_obj']
+
+    # Opening balance: each branch's closing balance the day before the range.
+    opening_balances = reporting.as_of_balances(
+        user, {**report_params, 'as_of_obj': start_date - timedelta(days=1)}
+    )
+    branches = [row['branch'] for row in opening_balances]
+    opening_balance = sum((row['balance'] for row in opening_balances), Decimal('0'))
+
+    transactions = Transaction.objects.filter(
+        branch__in=branches, date__range=[start_date, end_date]
+    ).select_related(
+        'branch', 'category'
+    ).order_by('date', 'created_date')
+    totals = transactions.totals()
+
+    return {
+        'branches': branches,
+        'branch': branches[0] if params['branch'] and branches else None,
+        'start_date': start_date,
+        'end_date': end_date,
+        'opening_balance': opening_balance,
+        'transactions': transactions,
+        'total_income': totals['income'],
+        'total_expenditure': totals['expenditure'],
+        'closing_balance': opening_balance + totals['income'] - totals['expenditure'],
+        'generated_at': timezone.now(),
+    }
+
+
+def report_context(user, params):
+    report_params = reporting.parse_report_params(params)
+    scope = reporting.report_scope(user, report_params)
+    # Shares the reports page's cache entry when one is current.
+    results = report_cache.fetch(
+        reporting.report_cache_key(user, report_params, scope),
+        lambda: reporting.run_queries(reporting.report_queries(user, report_params, scope)),
+    )
+    context = reporting.report_context(user, report_params, results)
+    context['generated_at'] = timezone.now()
+    return context
+
+
+def store(path, template_name, get_context):
+    """Render ``template_name`` to PDF at ``path`` unless it is already stored; returns the name."""
+    if default_storage.exists(path):
+        return path
+    html = render_to_string(template_name, get_context())
+    document = pdf.render(html, base_url=settings.STATIC_ROOT)
+    name = default_storage.save(path, ContentFile(document))
+    delete_superseded(path)
+    return name
+
+
+_VERSION_SUFFIX = re.compile(r'_v(\d+)(?:_[^/]*)?\.pdf$')
+
+
+def delete_superseded(path):
+    """Delete stored versions of ``path``'s document older than its own version"""
+    directory, name = posixpath.split(path)
+    prefix, version = name[:name.rindex('_v')], _version(name)
+    _, files = default_storage.listdir(directory)
+    for other in files:
+        other_version = _version(other)
+        # A newer version stored by a concurrent job is left alone.
+        if other_version is not None and other_version < version and other[:other.rindex('_v')] == prefix:
+            default_storage.delete(posixpath.join(directory, other))
+
+
+def _version(name):
+    match = _VERSION_SUFFIX.search(name)
+    return int(match.group(1)) if match else None
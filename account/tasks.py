@@ -0,0 +1,143 @@
+"""Background job handlers; see jobs.py for the queue itself."""
+
+import csv
+import io
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from . import deletion, onboarding, reporting, saved_reports, statements
+from .jobs import check_timeout, job_handler
+from .models import Job
+from .routers import read_intent
+
+
+@job_handler('report', heavy=True)
+def generate_report(job):
+    """The reports page for ``job.params`` (the page's query string), as a stored payload"""
+    user = job.created_by
+    params = reporting.parse_report_params(job.params)
+    scope = reporting.report_scope(user, params)
+    results = reporting.run_queries(reporting.report_queries(user, params, scope))
+    return saved_reports.snapshot_context(reporting.report_context(user, params, results))
+
+
+@job_handler('transactions_csv', heavy=True)
+def export_transactions_csv(job):
+    """CSV of the transactions page's filtered rows, streamed to a temp file"""
+    transactions = reporting.transaction_list(job.created_by, job.params)
+    if transactions is None:
+        raise ValueError('No branch assigned to this account.')
+
+    rows = 0
+    with tempfile.TemporaryFile() as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(['Date', 'Branch', 'Type', 'Category', 'Description', 'Amount', 'Created By'])
+        for transaction in transactions.iterator(chunk_size=2000):
+            category = transaction.category
+            writer.writerow([
+                transaction.date.isoformat(),
+                transaction.branch.name,
+                transaction.get_transaction_type_display(),
+                category.name if category else '',
+                transaction.description,
+                transaction.amount,
+                transaction.created_by.get_full_name() or transaction.created_by.username,
+            ])
+            rows += 1
+        text.flush()
+        raw.seek(0)
+        job.result_file.save(f'transactions_{job.id}.csv', File(raw), save=False)
+        text.detach()
+    return {'rows': rows, 'filename': os.path.basename(job.result_file.name)}
+
+
+@job_handler('report_xlsx', heavy=True)
+def export_report_xlsx(job):
+    """The reports page's data as a multi-sheet workbook, written in openpyxl's write-only mode"""
+    from openpyxl import Workbook
+
+    params = reporting.parse_report_params(job.params)
+    workbook = Workbook(write_only=True)
+    rows = 0
+    # Read like the reports page does: from the replica when one is configured.
+    token = read_intent.set(True)
+    try:
+        for title, header, sheet_rows in reporting.report_sheets(job.created_by, params):
+            sheet = workbook.create_sheet(title)
+            sheet.append(header)
+            for row in sheet_rows:
+                sheet.append(row)
+                rows += 1
+    finally:
+        read_intent.reset(token)
+
+    with tempfile.NamedTemporaryFile(suffix='.xlsx') as raw:
+        workbook.save(raw.name)
+        job.result_file.save(f"report_{params['start_date']}_{params['end_date']}.xlsx", File(raw), save=False)
+    return {'rows': rows, 'filename': os.path.basename(job.result_file.name)}
+
+
+@job_handler('statement_pdf', heavy=True)
+def render_statement_pdf(job):
+    """Branch statement PDF, stored once per branch, range and ledger version"""
+    job.result_file.name = statements.store(
+        job.params['path'], 'pdf/statement.html',
+        lambda: statements.statement_context(job.created_by, job.params),
+    )
+    return {'filename': os.path.basename(job.result_file.name)}
+
+
+@job_handler('report_pdf', heavy=True)
+def render_report_pdf(job):
+    """Reports page PDF, stored once per scope, range, type and ledger version"""
+    job.result_file.name = statements.store(
+        job.params['path'], 'pdf/report.html',
+        lambda: statements.report_context(job.created_by, job.params),
+    )
+    return {'filename': os.path.basename(job.result_file.name)}
+
+
+@job_handler('import_branch_admins', heavy=True)
+def import_branch_admins(job):
+    """Branch admins from an uploaded CSV (see onboarding.py); the upload is deleted once used"""
+    path = job.params['path']
+    done = False
+    try:
+        with default_storage.open(path, 'rb') as upload:
+            rows, errors = onboarding.parse(upload.read())
+        if errors:
+            # The data changed since the upload was checked; import nothing.
+            created, assigned = 0, 0
+        else:
+            created, assigned = onboarding.import_admins(rows)
+        done = True
+        return {'created': created, 'assigned': assigned, 'errors': errors[:50]}
+    finally:
+        # It holds plain-text passwords: keep it only for a retry.
+        if done or job.attempts >= job.max_attempts:
+            default_storage.delete(path)
+
+
+def _deletion_progress(job):
+    def report(deleted):
+        # Shown on the jobs page while the job runs; replaced by the final result.
+        Job.objects.filter(pk=job.pk, status='running').update(result={'transactions': deleted, 'running': True})
+        # Between chunks: a retry resumes from here.
+        check_timeout(job)
+    return report
+
+
+@job_handler('delete_branch', heavy=True)
+def delete_branch(job):
+    """A branch marked pending deletion, removed in chunks (see deletion.py)"""
+    return deletion.delete_branch(job.params['id'], _deletion_progress(job))
+
+
+@job_handler('delete_user', heavy=True)
+def delete_user(job):
+    """A user marked pending deletion, removed in chunks with ledger deltas (see deletion.py)"""
+    return deletion.delete_user(job.params['id'], _deletion_progress(job))
@@ -1,3 +1,1440 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, OperationalError, connection, transaction as db_transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q, QuerySet, Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import assignments, balances, deletion, hashing, jobs, ledger, onboarding, periods, report_cache, search
+from .events import Broadcaster, broadcaster
+from .fields import to_kobo, to_naira
+from .middleware import ReplicaPinMiddleware
+from .models import (
+    Branch, BranchBalanceShard, BranchDailyBalance, Category, ExpenditureCategory, FiscalPeriod, FundAllocation,
+    IncomeCategory, Job, LedgerCube, LedgerVersion, Transaction, User,
+)
+from .reporting import category_filter, split_range, statement_page
+from .routers import ReadReplicaRouter, pinned_to_primary, read_intent, read_replica
+
+
+class BranchTestMixin:
+    """A super admin, a main and a sub branch, a category each way, and a helper to post"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw', user_type='super_admin')
+        self.main = Branch.objects.create(
+            name='Main', location='Enugu', state='Enugu', address='a', branch_type='main', created_by=self.user,
+        )
+        self.sub = Branch.objects.create(
+            name='Sub', location='Aba', state='Abia', address='a', branch_type='sub', created_by=self.user,
+        )
+        self.rent = IncomeCategory.objects.create(name='Rent', created_by=self.user)
+        self.fuel = ExpenditureCategory.objects.create(name='Fuel', created_by=self.user)
+        self.today = timezone.localdate()
+
+    def post(self, branch, transaction_type, amount, days_ago=0, user=None, description='test'):
+        return Transaction.objects.create(
+            branch=branch, transaction_type=transaction_type, amount=Decimal(amount), description=description,
+            category=self.rent if transaction_type == 'income' else self.fuel,
+            date=self.today - timedelta(days=days_ago), created_by=user or self.user,
+        )
+
+
+class LedgerTestMixin(BranchTestMixin):
+    """Compares the incrementally maintained ledger tables with a rebuild from the raw ledger"""
+
+    def maintained(self):
+        # Rows are summed over their shards (a rebuild puts everything in
+        # shard 0). Rows emptied by edits and deletions are kept; a rebuild
+        # leaves them out.
+        days = BranchDailyBalance.objects.values('branch_id', 'date').annotate(
+            day_income=Sum('income'), day_expenditure=Sum('expenditure'),
+        ).exclude(day_income=0, day_expenditure=0).order_by()
+        return (
+            sorted(
+                (day['branch_id'], day['date'], day['day_income'], day['day_expenditure'],
+                 Branch.all_objects.get(pk=day['branch_id']).get_balance_as_of(day['date']))
+                for day in days
+            ),
+            sorted(LedgerCube.objects.values('branch_id', 'month', 'transaction_type', 'category_id').annotate(
+                cell_total=Sum('total'), cell_count=Sum('count'),
+            ).exclude(cell_count=0).order_by().values_list(
+                'branch_id', 'month', 'transaction_type', 'category_id', 'cell_total', 'cell_count')),
+            sorted(BranchBalanceShard.objects.values('branch_id').annotate(
+                balance=Sum('balance')).exclude(balance=0).order_by().values_list('branch_id', 'balance')),
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = self.maintained()
+        ledger.rebuild_daily_balances()
+        ledger.rebuild_cube()
+        balances.rebuild()
+        self.assertEqual(maintained, self.maintained())
+
+
+@mock.patch('account.routers.replica_enabled', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        """The database a read in a ``read_replica`` view serving ``request`` goes to"""
+        @read_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Transaction))
+        return ReplicaPinMiddleware(view)(request).content.decode()
+
+    def test_reads_outside_reporting_views_use_the_primary(self, replica_enabled):
+        self.assertEqual(self.router.db_for_read(Transaction), 'default')
+
+    def test_reporting_reads_use_the_replica(self, replica_enabled):
+        self.assertEqual(self.route(self.factory.get('/reports/')), 'replica')
+
+    def test_writes_use_the_primary(self, replica_enabled):
+        self.assertEqual(self.route(self.factory.post('/reports/')), 'default')
+        token = read_intent.set(True)
+        try:
+            self.assertEqual(self.router.db_for_write(Transaction), 'default')
+        finally:
+            read_intent.reset(token)
+
+    def test_without_replica(self, replica_enabled):
+        replica_enabled.return_value = False
+        self.assertEqual(self.route(self.factory.get('/reports/')), 'default')
+
+    def test_write_pins_the_user_to_the_primary(self, replica_enabled):
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(self.factory.post('/add-income/'))
+        cookie = response.cookies[ReplicaPinMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        request = self.factory.get('/reports/')
+        request.COOKIES[ReplicaPinMiddleware.cookie_name] = cookie.value
+        self.assertEqual(self.route(request), 'default')
+        self.assertFalse(pinned_to_primary.get())
+
+    def test_reads_and_failed_writes_do_not_pin(self, replica_enabled):
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(self.factory.get('/reports/'))
+        self.assertNotIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+        response = ReplicaPinMiddleware(lambda request: HttpResponse(status=500))(self.factory.post('/add-income/'))
+        self.assertNotIn(ReplicaPinMiddleware.cookie_name, response.cookies)
+
+
+class LiveDashboardTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, branch_id=None, to=broadcaster):
+        async def subscribe():
+            return to.subscribe(branch_id)
+        subscription = self.loop.run_until_complete(subscribe())
+        self.addCleanup(to.unsubscribe, subscription)
+        return subscription
+
+    def received(self, subscription):
+        # Let the loop run the puts scheduled by publish().
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_posting_fans_out_to_matching_streams(self):
+        everything, main, sub = self.subscribe(), self.subscribe(self.main.pk), self.subscribe(self.sub.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(self.main, 'income', '100')
+
+        [event] = self.received(everything)
+        self.assertEqual(
+            (event['type'], event['branch_id'], event['transaction_type'], event['amount']),
+            ('transaction', self.main.pk, 'income', Decimal('100')),
+        )
+        self.assertEqual(self.received(main), [event])
+        self.assertEqual(self.received(sub), [])
+
+    def test_published_on_commit(self):
+        everything = self.subscribe()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post(self.main, 'income', '100')
+        self.assertEqual(self.received(everything), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.received(everything)), 1)
+
+    def test_inactive_branch_is_not_published(self):
+        everything = self.subscribe()
+        self.sub.is_active = False
+        self.sub.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(self.sub, 'income', '100')
+        self.assertEqual(self.received(everything), [])
+
+    def summary(self, events):
+        return [(event['action'], event['branch_id'], event['amount']) for event in events]
+
+    def test_edit_and_delete_publish_signed_deltas(self):
+        transaction = self.post(self.main, 'income', '100')
+        everything = self.subscribe()
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.amount = Decimal('130')
+            transaction.save()
+        self.assertEqual(
+            self.summary(self.received(everything)),
+            [('updated', self.main.pk, Decimal('-100')), ('updated', self.main.pk, Decimal('130'))],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.delete()
+        self.assertEqual(self.summary(self.received(everything)), [('deleted', self.main.pk, Decimal('-130'))])
+
+    def test_move_to_another_branch(self):
+        transaction = self.post(self.main, 'income', '100')
+        main, sub = self.subscribe(self.main.pk), self.subscribe(self.sub.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.branch = self.sub
+            transaction.save()
+        self.assertEqual(self.summary(self.received(main)), [('deleted', self.main.pk, Decimal('-100'))])
+        self.assertEqual(self.summary(self.received(sub)), [('created', self.sub.pk, Decimal('100'))])
+
+    def test_publish_from_another_thread(self):
+        local = Broadcaster()
+        everything = self.subscribe(to=local)
+        thread = threading.Thread(target=local.publish, args=({'type': 'transaction', 'branch_id': 1},))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.received(everything), [{'type': 'transaction', 'branch_id': 1}])
+
+    def test_slow_stream_drops_events(self):
+        local = Broadcaster()
+        everything = self.subscribe(to=local)
+        for index in range(everything.queue.maxsize + 5):
+            local.publish({'type': 'transaction', 'index': index})
+        self.assertEqual(len(self.received(everything)), everything.queue.maxsize)
+
+
+class DashboardEventsTests(BranchTestMixin, TestCase):
+    @mock.patch('account.views.broadcaster', new_callable=Broadcaster)
+    async def test_stream(self, local):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/dashboard/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        local.publish({'type': 'allocation', 'branch_id': self.sub.pk, 'allocated_delta': Decimal('5')})
+        chunk = (await anext(stream)).decode()
+        event_line, data_line = chunk.strip().split('\n')
+        self.assertEqual(event_line, 'event: allocation')
+        self.assertEqual(json.loads(data_line[len('data: '):])['allocated_delta'], '5')
+
+
+class LedgerMaintenanceTests(LedgerTestMixin, TestCase):
+    def test_post(self):
+        self.post(self.main, 'income', '1000', days_ago=3)
+        self.post(self.main, 'expenditure', '100.50')
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=4)), Decimal('0'))
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=1)), Decimal('1000.00'))
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('899.50'))
+        self.assertMatchesRebuild()
+
+    def test_back_dated_post_ripples_forward(self):
+        self.post(self.main, 'income', '100', days_ago=1)
+        self.post(self.main, 'income', '50', days_ago=5)
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=3)), Decimal('50.00'))
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=1)), Decimal('150.00'))
+        self.assertMatchesRebuild()
+
+    def test_edit(self):
+        transaction = self.post(self.main, 'income', '1000', days_ago=3)
+        transaction.amount = Decimal('800')
+        transaction.date = self.today - timedelta(days=40)
+        transaction.save()
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=40)), Decimal('800.00'))
+        self.assertMatchesRebuild()
+
+        transaction.branch = self.sub
+        transaction.save()
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('0'))
+        self.assertEqual(self.sub.get_balance_as_of(self.today), Decimal('800.00'))
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        self.post(self.main, 'income', '1000', days_ago=3)
+        self.post(self.main, 'expenditure', '100').delete()
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('1000.00'))
+        self.assertMatchesRebuild()
+
+
+class FiscalPeriodTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.period_end = self.today.replace(day=1) - timedelta(days=1)
+        self.period = FiscalPeriod.objects.create(
+            name='Last month', start_date=self.period_end.replace(day=1), end_date=self.period_end,
+            created_by=self.user,
+        )
+        self.in_period = (self.today - self.period_end).days
+
+    def test_close_snapshots_the_period(self):
+        self.post(self.main, 'income', '300', days_ago=self.in_period + 40)
+        self.post(self.main, 'income', '200', days_ago=self.in_period)
+        self.post(self.main, 'expenditure', '50', days_ago=self.in_period)
+        self.post(self.main, 'income', '40')
+        periods.close_period(self.period, self.user)
+
+        snapshot = self.period.branch_balances.get(branch=self.main)
+        self.assertEqual(
+            (snapshot.income, snapshot.expenditure, snapshot.closing_balance),
+            (Decimal('200.00'), Decimal('50.00'), Decimal('450.00')),
+        )
+        self.assertEqual(
+            sorted(self.period.category_totals.values_list('transaction_type', 'total', 'count')),
+            [('expenditure', Decimal('50.00'), 1), ('income', Decimal('200.00'), 1)],
+        )
+        # Snapshot plus the open-period delta
+        self.assertEqual(self.main.get_balance(), Decimal('490.00'))
+
+    def test_closed_period_is_frozen(self):
+        transaction = self.post(self.main, 'income', '300', days_ago=self.in_period)
+        later = self.post(self.main, 'income', '40')
+        periods.close_period(self.period, self.user)
+
+        with self.assertRaises(ValidationError):
+            self.post(self.main, 'income', '1', days_ago=self.in_period)
+        transaction.amount = Decimal('1')
+        with self.assertRaises(ValidationError):
+            transaction.save()
+        later.date = self.period_end
+        with self.assertRaises(ValidationError):
+            later.save()
+        self.assertEqual(self.main.get_balance(), Decimal('340.00'))
+
+    def test_close_rules(self):
+        periods.close_period(self.period, self.user)
+        with self.assertRaisesMessage(ValidationError, 'already closed'):
+            periods.close_period(self.period, self.user)
+
+        current = FiscalPeriod.objects.create(
+            name='This month', start_date=self.today.replace(day=1), end_date=self.today, created_by=self.user,
+        )
+        with self.assertRaisesMessage(ValidationError, 'has not ended yet'):
+            periods.close_period(current, self.user)
+
+    def test_closed_in_order(self):
+        earlier_end = self.period.start_date - timedelta(days=1)
+        earlier = FiscalPeriod.objects.create(
+            name='Earlier', start_date=earlier_end.replace(day=1), end_date=earlier_end, created_by=self.user,
+        )
+        with self.assertRaisesMessage(ValidationError, 'Close Earlier first'):
+            periods.close_period(self.period, self.user)
+        periods.close_period(earlier, self.user)
+        periods.close_period(self.period, self.user)
+
+
+    def test_category_totals_follow_renames(self):
+        cache.clear()
+        self.post(self.main, 'income', '200', days_ago=self.in_period)
+        periods.close_period(self.period, self.user)
+        self.assertEqual([row['category__name'] for row in periods.category_totals(self.period.pk)], ['Rent'])
+
+        self.rent.name = 'Lease'
+        self.rent.save()
+        self.assertEqual([row['category__name'] for row in periods.category_totals(self.period.pk)], ['Lease'])
+
+    def test_overlapping_period_is_a_form_error(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/fiscal-periods/', {
+            'name': 'Overlap', 'start_date': self.period_end.isoformat(), 'end_date': self.today.isoformat(),
+        })
+        self.assertEqual(response.context['form'].non_field_errors(), ['This period overlaps Last month.'])
+        self.assertFalse(FiscalPeriod.objects.filter(name='Overlap').exists())
+
+
+class ReportsViewTests(BranchTestMixin, TestCase):
+    def test_bad_branch_filter_shows_all_branches(self):
+        self.post(self.main, 'income', '100')
+        self.post(self.sub, 'income', '40')
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/', {'branch': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['selected_branch'])
+        self.assertEqual(response.context['total_income'], Decimal('140'))
+
+        response = self.client.get('/reports/', {'branch': self.sub.pk})
+        self.assertEqual(response.context['total_income'], Decimal('40'))
+
+class SplitRangeTests(SimpleTestCase):
+    def test_without_closed_periods(self):
+        months, raw_ranges = split_range(date(2024, 1, 15), date(2024, 4, 10), [])
+        self.assertEqual(months, [date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertEqual(raw_ranges, [(date(2024, 1, 15), date(2024, 1, 31)), (date(2024, 4, 1), date(2024, 4, 10))])
+
+    def test_around_closed_period(self):
+        closed = [FiscalPeriod(start_date=date(2024, 2, 1), end_date=date(2024, 2, 29))]
+        months, raw_ranges = split_range(date(2024, 1, 1), date(2024, 3, 31), closed)
+        self.assertEqual(months, [date(2024, 1, 1), date(2024, 3, 1)])
+        self.assertEqual(raw_ranges, [])
+
+    def test_within_one_month(self):
+        months, raw_ranges = split_range(date(2024, 5, 3), date(2024, 5, 20), [])
+        self.assertEqual(months, [])
+        self.assertEqual(raw_ranges, [(date(2024, 5, 3), date(2024, 5, 20))])
+
+    def test_range_inside_closed_period(self):
+        closed = [FiscalPeriod(start_date=date(2024, 1, 1), end_date=date(2024, 3, 31))]
+        self.assertEqual(split_range(date(2024, 2, 1), date(2024, 2, 10), closed), ([], []))
+
+
+class LedgerCubeTests(LedgerTestMixin, TestCase):
+    def test_drilldown(self):
+        self.post(self.main, 'income', '1000', days_ago=40)
+        self.post(self.main, 'income', '500')
+        self.post(self.main, 'expenditure', '100')
+        self.post(self.sub, 'income', '70')
+        self.assertMatchesRebuild()
+        self.client.force_login(self.user)
+
+        response = self.client.get('/reports/cube/', {'group_by': 'branch,type', 'branch': self.main.pk})
+        self.assertEqual(
+            [(row['branch'], row['transaction_type'], Decimal(row['total']), row['count'])
+             for row in response.json()['rows']],
+            [('Main', 'expenditure', Decimal('100'), 1), ('Main', 'income', Decimal('1500'), 2)],
+        )
+        month = self.today.strftime('%Y-%m')
+        response = self.client.get('/reports/cube/', {'group_by': 'category', 'start_month': month, 'type': 'income'})
+        self.assertEqual(
+            [(row['category'], Decimal(row['total']), row['count']) for row in response.json()['rows']],
+            [('Rent', Decimal('570'), 2)],
+        )
+
+    def test_uncategorized_cells_are_unique(self):
+        # The sub branch has one balance shard, so both postings land in one cell.
+        for _ in range(2):
+            Transaction.objects.create(
+                branch=self.sub, transaction_type='income', amount=Decimal('10'), description='test',
+                date=self.today, created_by=self.user,
+            )
+        cell = LedgerCube.objects.get(category=None)
+        self.assertEqual((cell.total, cell.count), (Decimal('20'), 2))
+        with self.assertRaises(IntegrityError):
+            LedgerCube.objects.create(
+                branch=self.sub, shard=cell.shard, month=cell.month, transaction_type='income',
+                total=Decimal('1'), count=1,
+            )
+
+    def test_unknown_dimension(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/cube/', {'group_by': 'colour'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(REPORT_CACHE=True)
+class ReportCacheTests(BranchTestMixin, TestCase):
+    key = report_cache.make_key('test', 'report')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.version = 1
+        patcher = mock.patch('account.report_cache.ledger_version', side_effect=lambda: self.version)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.computed = []
+
+    def compute(self, result='fresh', delay=0):
+        def compute():
+            time.sleep(delay)
+            self.computed.append(result)
+            return result
+        return compute
+
+    def wait_for_version(self, version):
+        deadline = time.monotonic() + 5
+        while (cache.get(self.key) or {}).get('version') != version:
+            self.assertLess(time.monotonic(), deadline, 'the background refresh did not run')
+            time.sleep(0.01)
+
+    def test_hit_until_the_ledger_changes(self):
+        self.assertEqual(report_cache.fetch(self.key, self.compute('first')), 'first')
+        self.assertEqual(report_cache.fetch(self.key, self.compute('second')), 'first')
+        self.assertEqual(self.computed, ['first'])
+        stats = report_cache.stats()
+        self.assertEqual((stats['misses'], stats['hits']), (1, 1))
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        report_cache.fetch(self.key, self.compute('old'))
+        self.version = 2
+        self.assertEqual(report_cache.fetch(self.key, self.compute('new')), 'old')
+        self.wait_for_version(2)
+        self.assertEqual(report_cache.fetch(self.key, self.compute('newer')), 'new')
+        self.assertEqual(self.computed, ['old', 'new'])
+        self.assertEqual(report_cache.stats()['stale'], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(report_cache.fetch(self.key, self.compute(delay=0.2))))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['fresh'] * 5)
+        self.assertEqual(self.computed, ['fresh'])
+        self.assertEqual(report_cache.stats()['coalesced'], 4)
+
+    def test_waits_for_another_process(self):
+        # Another process holds the entry's lock and stores the result.
+        cache.add(f'{self.key}:lock', 1)
+        timer = threading.Timer(0.2, lambda: cache.set(self.key, {'version': 1, 'results': 'theirs'}))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(report_cache.fetch(self.key, self.compute()), 'theirs')
+        self.assertEqual(self.computed, [])
+
+    @override_settings(REPORT_CACHE=False)
+    def test_disabled(self):
+        report_cache.fetch(self.key, self.compute())
+        report_cache.fetch(self.key, self.compute())
+        self.assertEqual(len(self.computed), 2)
+
+
+class LedgerVersionTests(BranchTestMixin, TestCase):
+    def test_committed_posting_bumps_the_version(self):
+        version = report_cache.ledger_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(self.main, 'income', '100')
+        self.assertGreater(report_cache.ledger_version(), version)
+
+    def test_version_is_shared_through_the_database(self):
+        version = report_cache.ledger_version()
+        # Another worker's bump reaches this one whatever its cache holds.
+        LedgerVersion.objects.filter(pk=1).update(version=version + 5)
+        cache.clear()
+        self.assertEqual(report_cache.ledger_version(), version + 5)
+        report_cache.bump_ledger_version()
+        self.assertEqual(LedgerVersion.objects.get(pk=1).version, version + 6)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw', user_type='super_admin')
+        self.calls = []
+        handlers = mock.patch.dict(jobs._handlers, {
+            'test_ok': (lambda job: self.calls.append(job.pk) or {'echo': job.params}, False),
+            'test_heavy': (lambda job: self.calls.append(job.pk), True),
+            'test_broken': (lambda job: 1 / 0, False),
+        })
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def test_claim_and_run(self):
+        job = jobs.enqueue('test_ok', self.user, {'n': 1})
+        claimed = jobs.claim('worker-1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts, claimed.worker), (job.pk, 'running', 1, 'worker-1'))
+        # Claimed once: another worker finds nothing.
+        self.assertIsNone(jobs.claim('worker-2'))
+
+        jobs.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'echo': {'n': 1}}))
+        self.assertEqual(self.calls, [job.pk])
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('no_such_kind', self.user)
+
+    @override_settings(JOB_RETRY_DELAY_SECONDS=30)
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue('test_broken', self.user, max_attempts=2)
+        with self.assertLogs('account.jobs', 'ERROR'):
+            jobs.run(jobs.claim('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('ZeroDivisionError', job.error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        # Not runnable again until its backoff has passed.
+        self.assertIsNone(jobs.claim('worker-1'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('account.jobs', 'ERROR'):
+            jobs.run(jobs.claim('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(JOB_MAX_HEAVY=1)
+    def test_heavy_jobs_are_capped(self):
+        first = jobs.enqueue('test_heavy', self.user)
+        second = jobs.enqueue('test_heavy', self.user)
+        light = jobs.enqueue('test_ok', self.user)
+        self.assertEqual(jobs.claim('worker-1').pk, first.pk)
+        # The second heavy job waits; the light one does not.
+        self.assertEqual(jobs.claim('worker-2').pk, light.pk)
+        self.assertIsNone(jobs.claim('worker-3'))
+        jobs.run(Job.objects.get(pk=first.pk))
+        self.assertEqual(jobs.claim('worker-3').pk, second.pk)
+
+
+    @override_settings(JOB_LEASE_SECONDS=60)
+    def test_only_lapsed_leases_are_reaped(self):
+        alive = jobs.enqueue('test_ok', self.user)
+        dead = jobs.enqueue('test_ok', self.user)
+        jobs.claim('worker-1')
+        jobs.claim('worker-2')
+        long_ago = timezone.now() - timedelta(minutes=5)
+        Job.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+        # worker-1 is still polling; worker-2 died.
+        jobs.heartbeat('worker-1', [alive.pk, dead.pk])
+
+        with self.assertLogs('account.jobs', 'WARNING'):
+            self.assertEqual(jobs.reap_expired(), 1)
+        alive.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual(alive.status, 'running')
+        self.assertEqual((dead.status, dead.worker, dead.heartbeat_at), ('queued', '', None))
+        self.assertIn('worker-2 stopped responding', dead.error)
+
+    def test_late_result_of_a_reaped_attempt_is_discarded(self):
+        job = jobs.enqueue('test_ok', self.user, {'n': 1})
+        first_attempt = jobs.claim('worker-1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('account.jobs', 'WARNING'):
+            jobs.reap_expired()
+            jobs.run(first_attempt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('queued', None))
+
+    def test_handler_enforces_its_timeout(self):
+        def slow(job):
+            job.started_at -= timedelta(seconds=job.timeout_seconds + 1)
+            jobs.check_timeout(job)
+
+        with mock.patch.dict(jobs._handlers, {'test_slow': (slow, False)}):
+            job = jobs.enqueue('test_slow', self.user, max_attempts=1)
+            with self.assertLogs('account.jobs', 'WARNING'):
+                jobs.run(jobs.claim('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Timed out', job.error)
+
+    def test_export_keeps_only_the_filters(self):
+        self.client.force_login(self.user)
+        self.client.post('/jobs/export/transactions/', {'type': 'income', 'q': 'rent', 'csrfmiddlewaretoken': 'x'})
+        self.assertEqual(Job.objects.get(kind='transactions_csv').params, {'type': 'income', 'q': 'rent'})
+
+class StatementTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.post(self.main, 'income', '1000', days_ago=10)
+        for days_ago in (5, 5, 4, 3, 3, 1):
+            self.post(self.main, 'expenditure', '10', days_ago=days_ago)
+        self.start = self.today - timedelta(days=6)
+
+    def test_pages_carry_the_running_balance(self):
+        seen, after = [], None
+        while True:
+            page = statement_page(self.main, self.start, self.today, after=after, page_size=4)
+            self.assertEqual(page['is_first_page'], after is None)
+            seen += [(transaction.pk, transaction.balance) for transaction in page['transactions']]
+            after = page['next_after']
+            if not after:
+                break
+
+        expected = Transaction.objects.filter(date__gte=self.start).order_by('date', 'created_date', 'id')
+        self.assertEqual([pk for pk, _ in seen], list(expected.values_list('pk', flat=True)))
+        self.assertEqual([balance for _, balance in seen], [Decimal(990 - 10 * i) for i in range(6)])
+        self.assertEqual(page['closing_balance'], Decimal('940'))
+
+    def test_first_page_opens_with_the_balance_before_the_range(self):
+        page = statement_page(self.main, self.start, self.today, page_size=4)
+        self.assertEqual(page['opening_balance'], Decimal('1000'))
+        self.assertEqual(len(page['transactions']), 4)
+
+    def test_tampered_cursor_restarts(self):
+        page = statement_page(self.main, self.start, self.today, after='forged')
+        self.assertTrue(page['is_first_page'])
+        self.assertEqual(page['opening_balance'], Decimal('1000'))
+
+    def test_cursor_is_bound_to_the_statement(self):
+        after = statement_page(self.main, self.start, self.today, page_size=4)['next_after']
+        page = statement_page(self.sub, self.start, self.today, after=after, page_size=4)
+        self.assertTrue(page['is_first_page'])
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/statement/', {
+            'branch': self.main.pk, 'start_date': self.start.isoformat(), 'end_date': self.today.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['closing_balance'], Decimal('940'))
+
+
+class SearchTests(BranchTestMixin, TestCase):
+    def found(self, q):
+        return set(Transaction.objects.filter(search.matches(q)).values_list('pk', flat=True))
+
+    def test_index_follows_the_ledger(self):
+        transaction = self.post(self.main, 'income', '100', description='Generator repairs')
+        self.post(self.main, 'income', '100', description='Office rent')
+        self.assertEqual(self.found('repair'), {transaction.pk})
+
+        transaction.description = 'Diesel top-up'
+        transaction.save()
+        self.assertEqual(self.found('repair'), set())
+        self.assertEqual(self.found('diesel'), {transaction.pk})
+
+        transaction.delete()
+        self.assertEqual(self.found('diesel'), set())
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.post(self.main, 'income', '100', description='Paid "NEAR" OR rent*')
+        self.assertEqual(len(self.found('"near" OR (rent')), 1)
+        self.assertEqual(self.found('***'), set())
+
+    def test_transactions_page_highlights_escaped_matches(self):
+        self.post(self.main, 'income', '100', description='<b>Generator</b> repairs')
+        self.post(self.main, 'income', '100', description='Office rent')
+        self.client.force_login(self.user)
+        response = self.client.get('/transactions/', {'q': 'generator'})
+        self.assertEqual(len(response.context['transactions']), 1)
+        self.assertContains(response, '&lt;b&gt;<mark>Generator</mark>&lt;/b&gt;')
+
+
+class FundAllocationHistoryTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = Branch.objects.create(
+            name='Other', location='Owerri', state='Imo', address='a', branch_type='sub', created_by=self.user,
+        )
+        self.to_sub = self.allocate(self.sub, '100', days_ago=10)
+        self.reversed = self.allocate(self.sub, '250', days_ago=5, is_active=False)
+        self.to_other = self.allocate(self.other, '400', days_ago=1)
+        self.client.force_login(self.user)
+
+    def allocate(self, to_branch, amount, days_ago=0, is_active=True):
+        allocation = FundAllocation.objects.create(
+            from_branch=self.main, to_branch=to_branch, amount=Decimal(amount), description='allocation',
+            allocated_by=self.user, is_active=is_active,
+        )
+        FundAllocation.objects.filter(pk=allocation.pk).update(
+            allocated_date=timezone.now() - timedelta(days=days_ago),
+        )
+        return allocation
+
+    def listed(self, **params):
+        response = self.client.get('/fund-allocations/', params)
+        self.assertEqual(response.status_code, 200)
+        return [allocation.pk for allocation in response.context['allocations']]
+
+    def test_filters(self):
+        self.assertEqual(self.listed(), [self.to_other.pk, self.reversed.pk, self.to_sub.pk])
+        self.assertEqual(self.listed(branch=self.sub.pk), [self.reversed.pk, self.to_sub.pk])
+        self.assertEqual(self.listed(status='reversed'), [self.reversed.pk])
+        self.assertEqual(self.listed(status='active'), [self.to_other.pk, self.to_sub.pk])
+        self.assertEqual(self.listed(min_amount='200', max_amount='300'), [self.reversed.pk])
+        start = (self.today - timedelta(days=6)).isoformat()
+        end = (self.today - timedelta(days=2)).isoformat()
+        self.assertEqual(self.listed(start_date=start, end_date=end), [self.reversed.pk])
+
+    def test_bad_amounts_and_branch_are_ignored(self):
+        self.assertEqual(len(self.listed(branch='abc', min_amount='lots', max_amount='1e')), 3)
+
+    def test_bad_dates_are_ignored(self):
+        self.assertEqual(len(self.listed(start_date='bad', end_date='2024-02-30')), 3)
+        start = (self.today - timedelta(days=6)).isoformat()
+        self.assertEqual(self.listed(start_date=start, end_date='bad'), [self.to_other.pk, self.reversed.pk])
+
+    def test_totals_and_branch_summary_follow_the_filters(self):
+        response = self.client.get('/fund-allocations/', {'branch': self.sub.pk})
+        totals = response.context['totals']
+        self.assertEqual(
+            (totals['count'], totals['total'], totals['active'], totals['reversed']),
+            (2, Decimal('350'), Decimal('100'), Decimal('250')),
+        )
+        summary = response.context['branch_summary']
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(
+            (summary[0]['allocated'], summary[0]['reversed'], summary[0]['net'], summary[0]['count']),
+            (Decimal('350'), Decimal('250'), Decimal('100'), 2),
+        )
+
+    def test_reversal_rows_are_not_counted_twice(self):
+        FundAllocation.objects.create(
+            from_branch=self.sub, to_branch=self.main, amount=Decimal('250'), description='reversal',
+            allocated_by=self.user,
+        )
+        totals = self.client.get('/fund-allocations/').context['totals']
+        self.assertEqual(
+            (totals['count'], totals['total'], totals['active'], totals['reversed']),
+            (4, Decimal('750'), Decimal('500'), Decimal('250')),
+        )
+
+    def test_pagination_keeps_the_filters(self):
+        for _ in range(50):
+            self.allocate(self.other, '1')
+        response = self.client.get('/fund-allocations/', {'branch': self.other.pk, 'page': 2})
+        self.assertEqual(response.context['page'].paginator.count, 51)
+        self.assertEqual([allocation.pk for allocation in response.context['allocations']], [self.to_other.pk])
+        self.assertEqual(response.context['query_string'], f'branch={self.other.pk}')
+
+
+class ManageUsersAndBranchesTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ada = User.objects.create_user(
+            'ada', 'ada@example.com', 'pw', user_type='branch_admin', first_name='Ada', phone='0803',
+        )
+        self.ben = User.objects.create_user('ben', 'ben@example.com', 'pw', user_type='branch_admin', is_active=False)
+        self.cy = User.objects.create_user('cy', 'cy@example.com', 'pw', user_type='branch_admin')
+        self.main.admins.add(self.ada)
+        self.sub.admins.add(self.ben)
+        self.client.force_login(self.user)
+
+    def users(self, **params):
+        response = self.client.get('/manage-users/', params)
+        self.assertEqual(response.status_code, 200)
+        return [user.username for user in response.context['users']]
+
+    def branches(self, **params):
+        response = self.client.get('/manage-branches/', params)
+        self.assertEqual(response.status_code, 200)
+        return [branch.name for branch in response.context['branches']]
+
+    def test_user_search_and_filters(self):
+        self.assertEqual(self.users(q='0803'), ['ada'])
+        self.assertEqual(self.users(q='abia'), ['ben'])  # the managed branch's state
+        self.assertEqual(self.users(branch=self.main.pk), ['ada'])
+        self.assertEqual(self.users(branch='unassigned'), ['cy'])
+        self.assertEqual(self.users(status='inactive'), ['ben'])
+        self.assertEqual(self.users(sort='username'), ['ada', 'ben', 'cy'])
+
+    def test_user_statistics_ignore_the_filters(self):
+        response = self.client.get('/manage-users/', {'q': 'ada'})
+        self.assertEqual(
+            [response.context[key] for key in (
+                'total_admins', 'active_admins', 'inactive_admins', 'unassigned_admins', 'total_assigned_branches',
+            )],
+            [3, 2, 1, 1, 2],
+        )
+
+    def test_user_pagination_keeps_the_filters(self):
+        User.objects.bulk_create([
+            User(username=f'admin{i:02}', email=f'admin{i}@example.com', user_type='branch_admin') for i in range(30)
+        ])
+        response = self.client.get('/manage-users/', {'branch': 'unassigned', 'sort': 'username', 'page': 2})
+        self.assertEqual(response.context['page'].paginator.count, 31)
+        self.assertEqual(
+            [user.username for user in response.context['users']], [f'admin{i}' for i in range(25, 30)] + ['cy'],
+        )
+        self.assertEqual(response.context['query_string'], 'branch=unassigned&sort=username')
+
+    def test_branch_search_filters_and_balance(self):
+        Branch.objects.filter(pk=self.sub.pk).update(is_active=False)
+        self.post(self.main, 'income', '300')
+        self.post(self.main, 'expenditure', '100')
+        self.assertEqual(self.branches(q='enugu'), ['Main'])
+        self.assertEqual(self.branches(type='sub'), ['Sub'])
+        self.assertEqual(self.branches(status='active'), ['Main'])
+
+        response = self.client.get('/manage-branches/', {'sort': 'balance'})
+        self.assertEqual(
+            [(branch.name, branch.current_balance) for branch in response.context['branches']],
+            [('Main', Decimal('200')), ('Sub', Decimal('0'))],
+        )
+        self.assertEqual(
+            [response.context[key] for key in ('total_branches', 'active_branches', 'main_branches', 'sub_branches')],
+            [2, 1, 1, 1],
+        )
+
+
+class AssignmentMatrixTests(BranchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ada = User.objects.create_user('ada', 'ada@example.com', 'pw', user_type='branch_admin')
+        self.ben = User.objects.create_user('ben', 'ben@example.com', 'pw', user_type='branch_admin')
+        self.other = Branch.objects.create(
+            name='Other', location='Owerri', state='Imo', address='a', branch_type='sub', created_by=self.user,
+        )
+
+    def links(self):
+        return set(Branch.admins.through.objects.values_list('user_id', 'branch_id'))
+
+    def test_assign_applies_the_diff_inside_the_block(self):
+        self.main.admins.add(self.ada)
+        self.sub.admins.add(self.ada)
+        self.other.admins.add(self.ben)  # outside the block
+
+        added, removed = assignments.assign(
+            [self.ada.pk, self.ben.pk], [self.main.pk, self.sub.pk],
+            [(self.ada.pk, self.main.pk), (self.ben.pk, self.sub.pk), (self.ben.pk, self.other.pk)],
+        )
+        self.assertEqual((added, removed), (1, 1))
+        self.assertEqual(self.links(), {
+            (self.ada.pk, self.main.pk), (self.ben.pk, self.sub.pk), (self.ben.pk, self.other.pk),
+        })
+        self.assertEqual(assignments.assign([self.ada.pk], [self.main.pk], [(self.ada.pk, self.main.pk)]), (0, 0))
+
+    def post_json(self, data):
+        return self.client.post('/assign-branch-admin/matrix/', json.dumps(data), content_type='application/json')
+
+    def test_json_api(self):
+        Branch.objects.filter(pk=self.other.pk).update(is_active=False)
+        self.client.force_login(self.user)
+        response = self.post_json({
+            'admins': [self.ada.pk, self.ben.pk, self.user.pk],
+            'branches': [self.main.pk, self.sub.pk, self.other.pk],
+            'assignments': [
+                [self.ada.pk, self.main.pk], [self.ben.pk, self.main.pk], [self.ben.pk, self.sub.pk],
+                [self.user.pk, self.main.pk], [self.ada.pk, self.other.pk],
+            ],
+        })
+        self.assertEqual(response.json(), {'success': True, 'added': 3, 'removed': 0})
+        # Super admins and inactive branches are never assigned
+        self.assertEqual(self.links(), {
+            (self.ada.pk, self.main.pk), (self.ben.pk, self.main.pk), (self.ben.pk, self.sub.pk),
+        })
+
+        response = self.post_json({'admins': ['x'], 'branches': [], 'assignments': []})
+        self.assertEqual(response.status_code, 400)
+
+    def test_json_api_needs_a_super_admin(self):
+        self.client.force_login(self.ada)
+        response = self.post_json({'admins': [self.ada.pk], 'branches': [self.main.pk], 'assignments': []})
+        self.assertEqual(response.status_code, 403)
+
+    def test_grid_form(self):
+        self.sub.admins.add(self.ada)
+        self.client.force_login(self.user)
+        response = self.client.get('/assign-branch-admin/matrix/', {'state': 'abia'})
+        self.assertEqual(
+            [(row['admin'].username, [ticked for _, ticked in row['cells']]) for row in response.context['rows']],
+            [('ada', [True]), ('ben', [False])],
+        )
+
+        self.client.post('/assign-branch-admin/matrix/', {
+            'admins': [self.ada.pk, self.ben.pk], 'branches': [self.sub.pk], 'cells': [f'{self.ben.pk}:{self.sub.pk}'],
+        })
+        self.assertEqual(self.links(), {(self.ben.pk, self.sub.pk)})
+
+
+class OnboardingCsvTests(TestCase):
+    header = 'username,email,first_name,last_name,password,branch\n'
+
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw', user_type='super_admin')
+        self.branch = Branch.objects.create(
+            name='Aba', location='', state='', address='', branch_type='sub', created_by=self.user,
+        )
+
+    def test_valid_file_imports(self):
+        rows, errors = onboarding.parse((self.header + 'ada,ada@example.com,Ada,Obi,secret,aba\n').encode())
+        self.assertEqual(errors, [])
+        self.assertEqual(rows[0]['branch_ids'], [self.branch.pk])
+        self.assertEqual(onboarding.import_admins(rows), (1, 1))
+        self.assertTrue(User.objects.get(username='ada').check_password('secret'))
+
+    def test_errors_name_their_lines(self):
+        rows, errors = onboarding.parse(
+            self.header
+            + 'admin,new@example.com,A,B,secret,\n'
+            + 'bola,not-an-email,Bola,C,pw,Nowhere\n'
+        )
+        self.assertEqual(len(errors), 2)
+        self.assertIn('Line 2: username admin is already taken', errors[0])
+        self.assertIn('email is not valid', errors[1])
+        self.assertIn('password must be at least 4 characters long', errors[1])
+        self.assertIn('no active branch "Nowhere"', errors[1])
+
+    def test_missing_columns(self):
+        self.assertEqual(
+            onboarding.parse('username,email\n'), ([], ['Missing column(s): first_name, last_name, password.']),
+        )
+
+    def test_upload_is_imported_by_a_job_then_deleted(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        content = self.header + f'ada,ada@example.com,Ada,Obi,secret,{self.branch.pk}\n'
+        upload = SimpleUploadedFile('admins.csv', content.encode())
+        self.client.force_login(self.user)
+        with override_settings(MEDIA_ROOT=media_root.name):
+            response = self.client.post('/create-branch-admin/import/', {'file': upload})
+            self.assertRedirects(response, '/jobs/', fetch_redirect_response=False)
+            self.assertFalse(User.objects.filter(username='ada').exists())
+
+            job = Job.objects.get(kind='import_branch_admins')
+            jobs.run(jobs.claim('worker-1'))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.result), ('succeeded', {'created': 1, 'assigned': 1, 'errors': []}))
+            self.assertEqual(list(self.branch.admins.values_list('username', flat=True)), ['ada'])
+            self.assertFalse(os.path.exists(os.path.join(media_root.name, job.params['path'])))
+
+    def test_invalid_upload_is_not_queued(self):
+        upload = SimpleUploadedFile('admins.csv', (self.header + 'admin,x@example.com,A,B,secret,\n').encode())
+        self.client.force_login(self.user)
+        response = self.client.post('/create-branch-admin/import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['errors']), 1)
+        self.assertFalse(Job.objects.exists())
+
+
+class PasswordHashingTests(SimpleTestCase):
+    @override_settings(PASSWORD_HASH_WORKERS=2)
+    def test_pool_hashes_in_order(self):
+        passwords = [f'password-{i}' for i in range(hashing.POOL_MIN_PASSWORDS)]
+        hashes = hashing.hash_passwords(passwords)
+        self.assertEqual(len(hashes), len(passwords))
+        for password, password_hash in zip(passwords, hashes):
+            self.assertTrue(check_password(password, password_hash))
+
+
+class DeletionTests(LedgerTestMixin, TestCase):
+    def test_delete_user_applies_deltas_once(self):
+        self.post(self.main, 'income', '1000', days_ago=2)
+        clerk = User.objects.create_user('clerk', 'clerk@example.com', 'pw', user_type='branch_admin')
+        for days_ago in range(5):
+            self.post(self.main, 'expenditure', '10', days_ago=days_ago, user=clerk)
+
+        progress = []
+        with self.settings(DELETION_CHUNK_SIZE=2):
+            deletion.start(clerk, self.user)
+            self.assertFalse(User.objects.filter(pk=clerk.pk).exists())
+            result = deletion.delete_user(clerk.pk, progress.append)
+            # A retried attempt finds nothing left to apply.
+            self.assertEqual(deletion.delete_transactions(deletion.user_transactions(clerk.pk), progress.append), 0)
+
+        self.assertEqual(result['transactions'], 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertFalse(User.all_objects.filter(pk=clerk.pk).exists())
+        self.assertEqual(self.main.get_balance(), Decimal('1000'))
+        self.assertMatchesRebuild()
+
+    def test_chunks_are_locked_and_skipped_by_other_attempts(self):
+        self.post(self.main, 'income', '100')
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(
+            QuerySet, 'select_for_update', autospec=True, side_effect=select_for_update,
+        ) as locked:
+            deletion.delete_transactions(Transaction.objects.all(), lambda deleted: None)
+        chunk_reads = [call.kwargs for call in locked.call_args_list if call.args[0].model is Transaction]
+        self.assertEqual(chunk_reads, [{'skip_locked': True, 'of': ('self',)}] * 2)  # the chunk, then none left
+
+    def test_delete_user_releases_their_allocations(self):
+        clerk = User.objects.create_user('clerk', 'clerk@example.com', 'pw', user_type='branch_admin')
+        FundAllocation.objects.create(
+            from_branch=self.main, to_branch=self.sub, amount=Decimal('300'), description='a', allocated_by=clerk,
+        )
+        Branch.objects.filter(pk=self.sub.pk).update(allocated_funds=Decimal('300'))
+        deletion.start(clerk, self.user)
+        self.assertEqual(deletion.delete_user(clerk.pk, lambda deleted: None)['allocations'], 1)
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.allocated_funds, Decimal('0'))
+
+    def test_delete_branch(self):
+        self.post(self.sub, 'income', '500')
+        self.post(self.main, 'income', '100')
+        job = deletion.start(self.sub, self.user)
+        self.assertFalse(Branch.objects.filter(pk=self.sub.pk).exists())
+
+        jobs.run(jobs.claim('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'transactions': 1}))
+        self.assertFalse(Branch.all_objects.filter(pk=self.sub.pk).exists())
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertMatchesRebuild()
+
+    def test_delete_branch_removes_other_branches_postings_in_its_categories(self):
+        sub_rent = IncomeCategory.objects.create(name='Sub rent', branch=self.sub, scope='sub', created_by=self.user)
+        self.post(self.main, 'income', '1000', days_ago=3)
+        Transaction.objects.create(
+            branch=self.main, transaction_type='income', amount=Decimal('300'), description='filed under Sub rent',
+            date=self.today - timedelta(days=2), created_by=self.user, category=sub_rent,
+        )
+        self.post(self.main, 'expenditure', '100')
+        self.post(self.sub, 'income', '500')
+
+        deletion.start(self.sub, self.user)
+        progress = []
+        with self.settings(DELETION_CHUNK_SIZE=1):
+            result = deletion.delete_branch(self.sub.pk, progress.append)
+
+        self.assertEqual(result, {'transactions': 2})
+        self.assertEqual(progress, [1, 2])
+        self.assertFalse(Category.objects.filter(pk=sub_rent.pk).exists())
+        self.assertEqual(self.main.get_balance(), Decimal('900'))
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=1)), Decimal('1000'))
+        balance = self.main.get_balance()
+        balances.rebuild([self.main.pk])
+        self.assertEqual(self.main.get_balance(), balance)
+        self.assertMatchesRebuild()
+
+    def test_delete_branch_is_cancelled_by_a_closed_period(self):
+        sub_rent = IncomeCategory.objects.create(name='Sub rent', branch=self.sub, scope='sub', created_by=self.user)
+        last_month_end = self.today.replace(day=1) - timedelta(days=1)
+        Transaction.objects.create(
+            branch=self.main, transaction_type='income', amount=Decimal('300'), description='filed under Sub rent',
+            date=last_month_end, created_by=self.user, category=sub_rent,
+        )
+        period = FiscalPeriod.objects.create(
+            name='Last month', start_date=last_month_end.replace(day=1), end_date=last_month_end,
+            created_by=self.user,
+        )
+        periods.close_period(period, self.user)
+
+        self.client.force_login(self.user)
+        response = self.client.post(f'/delete-branch/{self.sub.pk}/')
+        self.assertRedirects(response, '/manage-branches/', fetch_redirect_response=False)
+        self.assertFalse(Job.objects.exists())
+
+        # Closed after the deletion was queued: the job keeps the branch.
+        deletion.start(self.sub, self.user)
+        self.assertIn('cancelled', deletion.delete_branch(self.sub.pk, lambda deleted: None))
+        self.assertTrue(Branch.all_objects.filter(pk=self.sub.pk, pending_deletion=False, is_active=False).exists())
+        self.assertEqual(self.main.get_balance(), Decimal('300'))
+
+
+class CategoryTests(BranchTestMixin, TestCase):
+    def test_proxies_hold_one_kind(self):
+        self.assertEqual(list(IncomeCategory.objects.all()), [self.rent])
+        self.assertEqual(list(ExpenditureCategory.objects.all()), [self.fuel])
+        self.assertEqual(
+            set(Category.objects.values_list('name', 'category_type')), {('Rent', 'income'), ('Fuel', 'expenditure')},
+        )
+
+    def test_typed_properties(self):
+        income = self.post(self.main, 'income', '100')
+        self.assertEqual((income.income_category, income.expenditure_category), (self.rent, None))
+        # The form clears the select of the other kind; that never drops the category.
+        income.expenditure_category = None
+        self.assertEqual(income.category, self.rent)
+        income.income_category = None
+        self.assertIsNone(income.category)
+
+    def test_category_parameters(self):
+        self.assertEqual(category_filter({'category': str(self.rent.pk)}), Q(category_id=str(self.rent.pk)))
+        self.assertIsNone(category_filter({'category': 'rent'}))
+
+    def test_per_kind_parameter_only_matches_that_kind(self):
+        income = self.post(self.main, 'income', '100')
+        self.post(self.main, 'expenditure', '40')
+        # An old expenditure link whose id now belongs to an income category
+        found = Transaction.objects.filter(category_filter({'expenditure_category': str(self.rent.pk)}))
+        self.assertFalse(found.exists())
+        found = Transaction.objects.filter(category_filter({'income_category': str(self.rent.pk)}))
+        self.assertEqual(list(found), [income])
+
+    def test_transactions_and_cube_filter_by_category(self):
+        income = self.post(self.main, 'income', '100')
+        self.post(self.main, 'expenditure', '40')
+        self.client.force_login(self.user)
+
+        for key in ('category', 'income_category'):
+            response = self.client.get('/transactions/', {key: self.rent.pk})
+            self.assertEqual([transaction.pk for transaction in response.context['transactions']], [income.pk])
+
+        response = self.client.get('/reports/cube/', {'group_by': 'type', 'expenditure_category': self.fuel.pk})
+        self.assertEqual(
+            [(row['transaction_type'], Decimal(row['total'])) for row in response.json()['rows']],
+            [('expenditure', Decimal('40'))],
+        )
+
+
+class MoneyFieldTests(BranchTestMixin, TestCase):
+    def test_kobo_rounds_half_up(self):
+        self.assertEqual(to_kobo(Decimal('10.05')), 1005)
+        self.assertEqual(to_kobo('0.005'), 1)
+        self.assertEqual(to_kobo('0.004'), 0)
+        self.assertEqual(to_kobo(10.05), 1005)
+        self.assertEqual(to_kobo(-1.005), -101)
+
+    def test_naira_has_two_places(self):
+        self.assertEqual(to_naira(1005), Decimal('10.05'))
+        self.assertEqual(str(to_naira(100)), '1.00')
+
+    def test_round_trip(self):
+        Branch.objects.filter(pk=self.main.pk).update(allocated_funds=Decimal('1234.565'))
+        self.main.refresh_from_db()
+        self.assertEqual(self.main.allocated_funds, Decimal('1234.57'))
+
+    def test_sums_and_lookups_are_in_naira(self):
+        for amount in ('0.10', '0.20', '0.30'):
+            self.post(self.main, 'income', amount)
+        self.assertEqual(Transaction.objects.aggregate(total=Sum('amount'))['total'], Decimal('0.60'))
+        self.assertEqual(Transaction.objects.filter(amount__gte=Decimal('0.2')).count(), 2)
+        self.assertEqual(self.main.get_balance(), Decimal('0.60'))
+
+
+class KoboMigrationTests(TransactionTestCase):
+    before = [('account', '0018_money_kobo_columns')]
+    after = [('account', '0019_copy_money_to_kobo')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_decimal_amounts_are_rounded_not_truncated(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        User = apps.get_model('account', 'User')
+        Branch = apps.get_model('account', 'Branch')
+        Transaction = apps.get_model('account', 'Transaction')
+        user = User.objects.create(username='admin', email='admin@example.com', user_type='super_admin')
+        branch = Branch.objects.create(
+            name='Main', location='', state='', address='', branch_type='main', created_by=user,
+            allocated_funds=Decimal('0.29'),
+        )
+        Transaction.objects.create(
+            branch=branch, transaction_type='income', amount=Decimal('10.05'), amount_kobo=0,
+            description='', date=date(2024, 1, 1), created_by=user,
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        self.assertEqual(
+            apps.get_model('account', 'Transaction').objects.values_list('amount_kobo', flat=True).get(),
+            Decimal('10.05'),
+        )
+        self.assertEqual(
+            apps.get_model('account', 'Branch').objects.values_list('allocated_funds_kobo', flat=True).get(),
+            Decimal('0.29'),
+        )
+
+
+class BranchActiveTests(BranchTestMixin, TestCase):
+    def flags(self):
+        return sorted(set(Transaction.objects.values_list('branch__name', 'branch_active')))
+
+    def test_deactivation_flips_the_branch_transactions(self):
+        self.post(self.main, 'income', '100')
+        self.post(self.sub, 'income', '40')
+        self.sub.is_active = False
+        self.sub.save()
+        self.assertEqual(self.flags(), [('Main', True), ('Sub', False)])
+        self.assertEqual(Transaction.objects.active().totals()['income'], Decimal('100'))
+
+        # A posting on an inactive branch is stored inactive.
+        self.post(self.sub, 'income', '2')
+        self.assertEqual(self.flags(), [('Main', True), ('Sub', False)])
+
+        self.sub.is_active = True
+        self.sub.save()
+        self.assertEqual(self.flags(), [('Main', True), ('Sub', True)])
+        self.assertEqual(Transaction.objects.active().totals()['income'], Decimal('142'))
+
+    def test_branch_deletion_hides_postings_in_the_job(self):
+        self.post(self.sub, 'income', '40')
+        self.post(self.sub, 'income', '2')
+        with self.assertNumQueries(4):  # savepoint, branch update, job insert, release: no flag flip
+            deletion.start(self.sub, self.user)
+        self.assertEqual(self.flags(), [('Sub', True)])
+
+        with self.settings(DELETION_CHUNK_SIZE=1):
+            deletion.hide_transactions(self.sub.pk)
+        self.assertEqual(self.flags(), [('Sub', False)])
+
+    def test_saves_that_leave_is_active_alone_do_not_flip(self):
+        self.post(self.sub, 'income', '40')
+        self.sub.is_active = False
+        self.sub.save(update_fields=['name'])
+        self.assertEqual(self.flags(), [('Sub', True)])
+        main = Branch.objects.get(pk=self.main.pk)
+        with self.assertNumQueries(3):  # savepoint, branch update, release: no transaction update
+            main.save()
+
+
+@override_settings(MAIN_BRANCH_BALANCE_SHARDS=4)
+class BalanceShardTests(LedgerTestMixin, TestCase):
+    def shards(self, branch):
+        return list(BranchBalanceShard.objects.filter(branch=branch).order_by('shard').values_list('balance', flat=True))
+
+    def test_main_branch_is_sharded(self):
+        for _ in range(8):
+            self.post(self.main, 'income', '100')
+        self.post(self.sub, 'income', '5')
+        self.assertEqual(len(self.shards(self.main)), 4)
+        self.assertEqual(self.shards(self.sub), [Decimal('5')])
+        self.assertEqual(self.main.get_balance(), Decimal('800'))
+        self.assertMatchesRebuild()
+
+    def set_shards(self, *amounts):
+        BranchBalanceShard.objects.bulk_create([
+            BranchBalanceShard(branch=self.main, shard=shard, balance=Decimal(amount))
+            for shard, amount in enumerate(amounts)
+        ])
+
+    def test_debit_reserves_from_one_shard(self):
+        self.set_shards('10', '10', '500', '10')
+        with mock.patch('account.balances.random.randrange', return_value=0):
+            balances.debit(self.main.pk, Decimal('200'), 4)
+        self.assertEqual(self.shards(self.main), [Decimal('10'), Decimal('10'), Decimal('300'), Decimal('10')])
+
+    def test_debit_no_shard_covers_rebalances(self):
+        self.set_shards('100', '100', '100', '100')
+        balances.debit(self.main.pk, Decimal('250.02'), 4)
+        self.assertEqual(self.shards(self.main), [Decimal('37.50')] * 2 + [Decimal('37.49')] * 2)
+        with self.assertRaises(balances.InsufficientFunds):
+            balances.debit(self.main.pk, Decimal('150'), 4)
+
+    def test_overdraft_is_refused(self):
+        self.post(self.main, 'income', '100')
+        with self.assertRaises(ValidationError):
+            self.post(self.main, 'expenditure', '100.01')
+        self.assertEqual(self.main.get_balance(), Decimal('100'))
+        self.assertFalse(Transaction.objects.filter(transaction_type='expenditure').exists())
+
+    def test_counter_refuses_what_clean_missed(self):
+        self.post(self.main, 'income', '100')
+        transaction = Transaction(
+            branch=self.main, transaction_type='expenditure', amount=Decimal('150'), description='test',
+            date=self.today, created_by=self.user, category=self.fuel,
+        )
+        # As if the balance changed between clean() and the posting.
+        transaction.clean = lambda: None
+        with self.assertRaises(balances.InsufficientFunds):
+            transaction.save()
+        self.assertEqual(self.main.get_balance(), Decimal('100'))
+        self.assertFalse(Transaction.objects.filter(transaction_type='expenditure').exists())
+        self.assertMatchesRebuild()
+
+    def test_deleting_income_may_go_negative(self):
+        income = self.post(self.main, 'income', '100')
+        self.post(self.main, 'expenditure', '60')
+        income.delete()
+        self.assertEqual(self.main.get_balance(), Decimal('-60'))
+        self.assertMatchesRebuild()
+
+    def test_postings_write_their_shards_rows(self):
+        with mock.patch('account.balances.random.randrange', side_effect=[0, 1, 2, 1]):
+            self.post(self.main, 'income', '100')
+            self.post(self.main, 'income', '50')
+            self.post(self.main, 'income', '20', days_ago=3)
+            self.post(self.main, 'expenditure', '30')
+        self.assertEqual(self.shards(self.main), [Decimal('100'), Decimal('20'), Decimal('20'), Decimal('0')])
+        self.assertEqual(
+            sorted(BranchDailyBalance.objects.filter(branch=self.main).values_list(
+                'shard', 'date', 'income', 'expenditure', 'closing_balance')),
+            [
+                (0, self.today, Decimal('100'), Decimal('0'), Decimal('100')),
+                (1, self.today, Decimal('50'), Decimal('30'), Decimal('20')),
+                (2, self.today - timedelta(days=3), Decimal('20'), Decimal('0'), Decimal('20')),
+            ],
+        )
+        self.assertEqual(
+            sorted(LedgerCube.objects.filter(branch=self.main).values_list('shard', 'transaction_type', 'count')),
+            [(0, 'income', 1), (1, 'expenditure', 1), (1, 'income', 1), (2, 'income', 1)],
+        )
+        self.assertEqual(self.main.get_balance_as_of(self.today - timedelta(days=1)), Decimal('20'))
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('140'))
+        self.assertMatchesRebuild()
+
+    def test_removal_in_another_shard(self):
+        with mock.patch('account.balances.random.randrange', side_effect=[0, 1, 1]):
+            rent = self.post(self.main, 'income', '100')
+            Transaction.objects.create(
+                branch=self.main, transaction_type='income', amount=Decimal('100'), description='test',
+                date=self.today, created_by=self.user,
+            )
+            # Taken from shard 1, which holds the uncategorized income.
+            rent.delete()
+        self.assertEqual(
+            sorted(LedgerCube.objects.filter(category=self.rent).values_list('shard', 'total', 'count')),
+            [(0, Decimal('100'), 1), (1, Decimal('-100'), -1)],
+        )
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/cube/', {'group_by': 'category'})
+        self.assertEqual([row['category'] for row in response.json()['rows']], [None])
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('100'))
+        self.assertMatchesRebuild()
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Row-level locks need PostgreSQL.')
+class ConcurrentPostingTests(BranchTestMixin, TransactionTestCase):
+    """
+    A posting holds its balance shard until it commits; another posting to
+    the same branch goes through meanwhile unless it needs that shard.
+    """
+
+    def post_while_another_is_open(self, shards):
+        # Committed first: the very first posting to a branch creates its shards,
+        # and a second one would wait for that insert to commit.
+        self.post(self.main, 'income', '10')
+        posted, release = threading.Event(), threading.Event()
+
+        def first():
+            try:
+                with db_transaction.atomic():
+                    self.post(self.main, 'income', '100')
+                    posted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        with mock.patch('account.balances.random.randrange', side_effect=shards):
+            thread = threading.Thread(target=first)
+            thread.start()
+            try:
+                posted.wait(10)
+                with db_transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL lock_timeout = '1s'")
+                    self.post(self.main, 'income', '50')
+            finally:
+                release.set()
+                thread.join()
+
+    @override_settings(MAIN_BRANCH_BALANCE_SHARDS=4)
+    def test_postings_to_one_branch_do_not_wait_for_each_other(self):
+        start = time.perf_counter()
+        self.post_while_another_is_open(shards=[0, 1])
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(self.main.get_balance(), Decimal('160'))
+        self.assertEqual(self.main.get_balance_as_of(self.today), Decimal('160'))
+
+    @override_settings(MAIN_BRANCH_BALANCE_SHARDS=4)
+    def test_postings_to_one_shard_wait(self):
+        with self.assertRaises(OperationalError):
+            self.post_while_another_is_open(shards=[2, 2])
+        self.assertEqual(self.main.get_balance(), Decimal('110'))
+
+    def test_deactivation_waits_for_an_open_posting(self):
+        posted = threading.Event()
+
+        def deactivate():
+            try:
+                posted.wait(10)
+                branch = Branch.objects.get(pk=self.sub.pk)
+                branch.is_active = False
+                branch.save()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=deactivate)
+        thread.start()
+        with db_transaction.atomic():
+            self.post(self.sub, 'income', '100')
+            posted.set()
+            time.sleep(0.5)
+            self.assertTrue(Branch.objects.get(pk=self.sub.pk).is_active)
+        thread.join()
+        self.assertFalse(Transaction.objects.get().branch_active)
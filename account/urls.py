@@ -1,12 +1,18 @@
 # urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Async views run the dashboard/report aggregates concurrently (best under ASGI)
+dashboard_view = views.dashboard_async if settings.ASYNC_REPORT_VIEWS else views.dashboard
+reports_view = views.reports_async if settings.ASYNC_REPORT_VIEWS else views.reports
+
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
-    path('', views.dashboard, name='dashboard'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('', dashboard_view, name='dashboard'),
+    path('dashboard/', dashboard_view, name='dashboard'),
+    path('dashboard/events/', views.dashboard_events, name='dashboard_events'),
 
     # Branch Management
     path('create-branch/', views.create_branch, name='create_branch'),
@@ -14,10 +20,12 @@ urlpatterns = [
     path('assign-branch-admin/', views.assign_branch_admin, name='assign_branch_admin'),
     path('assign-branch-admin/<int:branch_id>/', views.assign_branch_admin, name='assign_branch_admin_with_branch'),
     path('assign-branch-admin/user/<int:user_id>/', views.assign_branch_admin, name='assign_branch_admin_with_user'),
+    path('assign-branch-admin/matrix/', views.assign_admin_matrix, name='assign_admin_matrix'),
     path('delete-branch/<int:branch_id>/', views.delete_branch, name='delete_branch'),
 
     # User Management
     path('create-branch-admin/', views.create_branch_admin, name='create_branch_admin'),
+    path('create-branch-admin/import/', views.import_branch_admins, name='import_branch_admins'),
     path('manage-users/', views.manage_users, name='manage_users'),
     path('delete-user/<int:user_id>/', views.delete_user, name='delete_user'),
     path('toggle-user-status/<int:user_id>/', views.toggle_user_status, name='toggle_user_status'),
@@ -32,6 +40,7 @@ urlpatterns = [
 
     # Transactions
     path('transactions/', views.transactions, name='transactions'),
+    path('statement/', views.branch_statement, name='branch_statement'),
     path('add-transaction/', views.add_transaction, name='add_transaction'),
     path('add-income/', views.add_income, name='add_income'),
     path('add-expenditure/', views.add_expenditure, name='add_expenditure'),
@@ -48,5 +57,27 @@ urlpatterns = [
     path('delete-expenditure-category/<int:category_id>/', views.delete_expenditure_category, name='delete_expenditure_category'),
     
     # Reports
-    path('reports/', views.reports, name='reports'),
+    path('reports/', reports_view, name='reports'),
+    path('reports/cube/', views.reports_cube, name='reports_cube'),
+    path('reports/cache-stats/', views.report_cache_stats, name='report_cache_stats'),
+    path('reports/save/', views.save_report, name='save_report'),
+    path('reports/saved/', views.saved_reports_list, name='saved_reports'),
+    path('reports/saved/<int:report_id>/', views.saved_report, name='saved_report'),
+    path('reports/saved/<int:report_id>/refresh/', views.refresh_saved_report, name='refresh_saved_report'),
+    path('reports/saved/<int:report_id>/delete/', views.delete_saved_report, name='delete_saved_report'),
+
+    # Background jobs
+    path('jobs/', views.jobs_list, name='jobs'),
+    path('jobs/report/', views.run_report_job, name='run_report_job'),
+    path('jobs/export/transactions/', views.export_transactions, name='export_transactions'),
+    path('jobs/export/statement/', views.statement_pdf, name='statement_pdf'),
+    path('jobs/export/report/', views.report_pdf, name='report_pdf'),
+    path('jobs/export/report-xlsx/', views.export_report_xlsx, name='export_report_xlsx'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+    path('jobs/<int:job_id>/result/', views.job_result, name='job_result'),
+
+    # Fiscal periods
+    path('fiscal-periods/', views.fiscal_periods, name='fiscal_periods'),
+    path('fiscal-periods/<int:period_id>/close/', views.close_fiscal_period, name='close_fiscal_period'),
 ]
@@ -1,15 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Sum, Q
-from django.http import JsonResponse
+from django.db import transaction as db_transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import never_cache
+from django.urls import reverse
 from django.utils import timezone
+from asgiref.sync import async_to_sync, sync_to_async
 from decimal import Decimal
+import asyncio
+import json
+import os
+import uuid
 from .models import *
 from .forms import *
+from .fields import MoneyField
+from .routers import read_replica
+from .events import broadcaster
+from . import assignments, deletion, jobs, onboarding, periods, report_cache, reporting, saved_reports, search, statements
 
 
 def login_view(request):
@@ -67,96 +85,20 @@ def logout_view(request):
 
 
 @login_required
+@read_replica
 def dashboard(request):
     if request.user.user_type == 'super_admin':
-        # Get main branch (Enugu) or create one if it doesn't exist
-        main_branch, created = Branch.objects.get_or_create(
-            branch_type='main',
-            defaults={
-                'name': 'Main Branch',
-                'location': 'Enugu',
-                'state': 'Enugu State',
-                'address': 'Main Office Address',
-                'created_by': request.user
-            }
-        )
-
-        sub_branches = Branch.objects.filter(branch_type='sub', is_active=True).order_by('-created_date')
-        all_branches = Branch.objects.filter(is_active=True)
-
-        # Calculate totals
-        main_income = main_branch.get_total_income()
-        main_expenditure = main_branch.get_total_expenditure()
-        main_balance = main_branch.get_balance()
-        
-        # Calculate available funds for allocation (main branch balance)
-        available_for_allocation = main_balance
-
-        # All branches combined
-        total_income = Transaction.objects.filter(
-            transaction_type='income',
-            branch__is_active=True
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-
-        total_expenditure = Transaction.objects.filter(
-            transaction_type='expenditure',
-            branch__is_active=True
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-
-        total_balance = total_income - total_expenditure
-
-        # Total allocated funds
-        total_allocated = Branch.objects.filter(
-            is_active=True
-        ).aggregate(Sum('allocated_funds'))['allocated_funds__sum'] or Decimal('0')
-
-        recent_transactions = Transaction.objects.filter(
-            branch__is_active=True
-        ).select_related('branch', 'created_by').order_by('-created_date')[:10]
-
-        # Branch statistics
-        active_admins = User.objects.filter(
-            user_type='branch_admin',
-            is_active=True
-        ).count()
-
-        context = {
-            'main_branch': main_branch,
-            'sub_branches': sub_branches,
-            'all_branches': all_branches,
-            'main_income': main_income,
-            'main_expenditure': main_expenditure,
-            'main_balance': main_balance,
-            'available_for_allocation': available_for_allocation,
-            'total_income': total_income,
-            'total_expenditure': total_expenditure,
-            'total_balance': total_balance,
-            'total_allocated': total_allocated,
-            'recent_transactions': recent_transactions,
-            'branches_count': sub_branches.count(),
-            'active_admins': active_admins,
-        }
+        main_branch = reporting.get_main_branch(request.user)
+        results = reporting.run_queries(reporting.super_admin_dashboard_queries(main_branch))
+        context = reporting.super_admin_dashboard_context(main_branch, results)
 
     elif request.user.user_type == 'branch_admin':
         # Get the branch this admin manages
         branch = request.user.managed_branch
 
         if branch:
-            branch_income = branch.get_total_income()
-            branch_expenditure = branch.get_total_expenditure()
-            branch_balance = branch.get_balance()
-
-            recent_transactions = branch.transactions.select_related(
-                'income_category', 'expenditure_category', 'created_by'
-            ).order_by('-created_date')[:10]
-
-            context = {
-                'branch': branch,
-                'branch_income': branch_income,
-                'branch_expenditure': branch_expenditure,
-                'branch_balance': branch_balance,
-                'recent_transactions': recent_transactions,
-            }
+            results = reporting.run_queries(reporting.branch_dashboard_queries(branch))
+            context = reporting.branch_dashboard_context(branch, results)
         else:
             messages.error(request, 'No branch assigned to your account. Please contact the administrator.')
             context = {
@@ -171,9 +113,84 @@ def dashboard(request):
             'show_contact_info': True,
         }
 
+    context['live_updates'] = settings.LIVE_DASHBOARD
     return render(request, 'home.html', context)
 
 
+@login_required
+@read_replica
+async def dashboard_async(request):
+    """
+    Async dashboard: the independent aggregates run concurrently on the
+    aggregate thread pool and the page is rendered once.
+    """
+    user = await request.auser()
+    if user.user_type == 'super_admin':
+        main_branch = await sync_to_async(reporting.get_main_branch)(user)
+        results = await reporting.arun_queries(reporting.super_admin_dashboard_queries(main_branch))
+        context = reporting.super_admin_dashboard_context(main_branch, results)
+
+    elif user.user_type == 'branch_admin':
+        branch = await sync_to_async(lambda: user.managed_branch)()
+
+        if branch:
+            results = await reporting.arun_queries(reporting.branch_dashboard_queries(branch))
+            context = reporting.branch_dashboard_context(branch, results)
+        else:
+            messages.error(request, 'No branch assigned to your account. Please contact the administrator.')
+            context = {
+                'error_message': 'No branch assigned to your account. Please contact the administrator.',
+                'show_contact_info': True,
+            }
+    else:
+        messages.warning(request, 'Your account needs to be configured. Please contact the administrator.')
+        context = {
+            'info_message': 'Your account is being set up. Please contact the administrator.',
+            'show_contact_info': True,
+        }
+
+    context['live_updates'] = settings.LIVE_DASHBOARD
+    return await sync_to_async(render)(request, 'home.html', context)
+
+
+@login_required
+async def dashboard_events(request):
+    """
+    Server-Sent Events stream of balance and recent-transaction deltas for
+    the dashboard. Requires ASGI: each open stream waits on a queue fed by
+    the per-worker broadcaster instead of recomputing the dashboard.
+    """
+    user = await request.auser()
+    branch_id = None
+    if user.user_type != 'super_admin':
+        branch = await sync_to_async(lambda: user.managed_branch)()
+        if not branch:
+            return HttpResponse(status=204)
+        branch_id = branch.id
+
+    subscription = broadcaster.subscribe(branch_id)
+
+    async def event_stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def create_branch(request):
     if request.user.user_type != 'super_admin':
@@ -219,34 +236,171 @@ def create_branch_admin(request):
     return render(request, 'create_branch_admin.html', {'form': form})
 
 
+@login_required
+def import_branch_admins(request):
+    """Validate a CSV of branch admins now; create them in a background job"""
+    if request.user.user_type != 'super_admin':
+        messages.error(request, 'Only super admin can create branch admins.')
+        return redirect('dashboard')
+
+    errors = []
+    if request.method == 'POST':
+        form = BranchAdminImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            content = form.cleaned_data['file'].read()
+            rows, errors = onboarding.parse(content)
+            if not errors:
+                path = default_storage.save(f'imports/branch_admins_{uuid.uuid4().hex}.csv', ContentFile(content))
+                job = jobs.enqueue('import_branch_admins', request.user, {'path': path, 'rows': len(rows)})
+                messages.success(request, f'Import of {len(rows)} branch admins queued as job #{job.id}.')
+                return redirect('jobs')
+    else:
+        form = BranchAdminImportForm()
+
+    return render(request, 'import_branch_admins.html', {
+        'form': form,
+        'errors': errors,
+        'columns': onboarding.REQUIRED_COLUMNS + onboarding.OPTIONAL_COLUMNS,
+    })
+
+
+@login_required
+def assign_admin_matrix(request):
+    """
+    Admins x branches assignment grid. Saving applies the whole block in
+    one transaction; POST JSON ({"admins", "branches", "assignments"}) for
+    the same as an API.
+    """
+    if request.user.user_type != 'super_admin':
+        if request.content_type == 'application/json':
+            return JsonResponse({'success': False, 'message': 'Unauthorized access'}, status=403)
+        messages.error(request, 'Only super admin can assign branch admins.')
+        return redirect('dashboard')
+
+    admins = User.objects.filter(user_type='branch_admin')
+    branches = Branch.objects.filter(is_active=True)
+
+    if request.method == 'POST':
+        is_json = request.content_type == 'application/json'
+        try:
+            if is_json:
+                data = json.loads(request.body)
+                admin_ids = [int(admin_id) for admin_id in data['admins']]
+                branch_ids = [int(branch_id) for branch_id in data['branches']]
+                pairs = [(int(admin_id), int(branch_id)) for admin_id, branch_id in data['assignments']]
+            else:
+                admin_ids = [int(admin_id) for admin_id in request.POST.getlist('admins')]
+                branch_ids = [int(branch_id) for branch_id in request.POST.getlist('branches')]
+                pairs = [tuple(int(part) for part in cell.split(':')) for cell in request.POST.getlist('cells')]
+        except (ValueError, KeyError, TypeError):
+            if is_json:
+                return JsonResponse({'success': False, 'message': 'Invalid assignment data'}, status=400)
+            messages.error(request, 'Invalid assignment data.')
+            return redirect('assign_admin_matrix')
+
+        # Only branch admins and active branches can be assigned
+        admin_ids = list(admins.filter(id__in=admin_ids).values_list('id', flat=True))
+        branch_ids = list(branches.filter(id__in=branch_ids).values_list('id', flat=True))
+        added, removed = assignments.assign(admin_ids, branch_ids, pairs)
+
+        if is_json:
+            return JsonResponse({'success': True, 'added': added, 'removed': removed})
+        messages.success(request, f'Assignments updated: {added} added, {removed} removed.')
+        query_string = request.GET.urlencode()
+        return redirect(f"{reverse('assign_admin_matrix')}?{query_string}" if query_string else 'assign_admin_matrix')
+
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        admins = admins.filter(
+            Q(first_name__icontains=search_query) | Q(last_name__icontains=search_query)
+            | Q(username__icontains=search_query)
+        )
+    state_filter = request.GET.get('state', '').strip()
+    if state_filter:
+        branches = branches.filter(state__icontains=state_filter)
+
+    admins = list(admins.order_by('first_name', 'last_name', 'id')[:assignments.MAX_ADMINS + 1])
+    branches = list(branches.order_by('name', 'id')[:assignments.MAX_BRANCHES + 1])
+    truncated = len(admins) > assignments.MAX_ADMINS or len(branches) > assignments.MAX_BRANCHES
+    admins, branches = admins[:assignments.MAX_ADMINS], branches[:assignments.MAX_BRANCHES]
+
+    assigned = set(Branch.admins.through.objects.filter(
+        user_id__in=[admin.id for admin in admins], branch_id__in=[branch.id for branch in branches]
+    ).values_list('user_id', 'branch_id'))
+    rows = [
+        {'admin': admin, 'cells': [(branch, (admin.id, branch.id) in assigned) for branch in branches]}
+        for admin in admins
+    ]
+
+    context = {
+        'rows': rows,
+        'branches': branches,
+        'truncated': truncated,
+        'search_query': search_query,
+        'state_filter': state_filter,
+        'query_string': request.GET.urlencode(),
+    }
+    return render(request, 'assign_admin_matrix.html', context)
+
+
 @login_required
 def manage_users(request):
     if request.user.user_type != 'super_admin':
         messages.error(request, 'Only super admin can manage users.')
         return redirect('dashboard')
 
-    from django.db.models import Count
-
-    users = User.objects.filter(user_type='branch_admin') \
-        .prefetch_related('managed_branches') \
-        .annotate(branch_count=Count('managed_branches', distinct=True)) \
-        .order_by('-date_joined')
+    admins = User.objects.filter(user_type='branch_admin')
+    users = admins.prefetch_related('managed_branches').annotate(
+        branch_count=Count('managed_branches', distinct=True)
+    )
 
-    total_admins = users.count()
-    active_admins = users.filter(is_active=True).count()
-    inactive_admins = total_admins - active_admins
-    unassigned_admins = users.filter(managed_branches__isnull=True).distinct().count()
-    total_assigned_branches = Branch.objects.filter(admins__user_type='branch_admin').distinct().count()
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        users = users.filter(
+            Q(first_name__icontains=search_query) | Q(last_name__icontains=search_query)
+            | Q(username__icontains=search_query) | Q(email__icontains=search_query)
+            | Q(phone__icontains=search_query)
+            | Exists(Branch.objects.filter(admins=OuterRef('pk')).filter(
+                Q(name__icontains=search_query) | Q(state__icontains=search_query)
+            ))
+        )
+    branch_filter = request.GET.get('branch')
+    if branch_filter == 'unassigned':
+        users = users.filter(managed_branches__isnull=True)
+    elif branch_filter and branch_filter.isdigit():
+        users = users.filter(Exists(Branch.objects.filter(admins=OuterRef('pk'), id=branch_filter)))
+    status_filter = request.GET.get('status')
+    if status_filter in ('active', 'inactive'):
+        users = users.filter(is_active=status_filter == 'active')
+    ordering = {
+        'name': ('first_name', 'last_name'),
+        'username': ('username',),
+        'branches': ('-branch_count',),
+    }.get(request.GET.get('sort'), ('-date_joined',))
+    page = Paginator(users.order_by(*ordering, 'id'), 25).get_page(request.GET.get('page'))
+
+    # Headline statistics in one conditional aggregate
+    stats = admins.aggregate(
+        total_admins=Count('id', distinct=True),
+        active_admins=Count('id', distinct=True, filter=Q(is_active=True)),
+        unassigned_admins=Count('id', distinct=True, filter=Q(managed_branches__isnull=True)),
+        total_assigned_branches=Count('managed_branches', distinct=True),
+    )
 
     branches = Branch.objects.filter(is_active=True).order_by('name')
 
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
     context = {
-        'users': users,
-        'total_admins': total_admins,
-        'active_admins': active_admins,
-        'inactive_admins': inactive_admins,
-        'unassigned_admins': unassigned_admins,
-        'total_assigned_branches': total_assigned_branches,
+        'users': page,
+        'page': page,
+        'query_string': query_params.urlencode(),
+        'total_admins': stats['total_admins'],
+        'active_admins': stats['active_admins'],
+        'inactive_admins': stats['total_admins'] - stats['active_admins'],
+        'unassigned_admins': stats['unassigned_admins'],
+        'total_assigned_branches': stats['total_assigned_branches'],
         'branches': branches,
     }
 
@@ -259,39 +413,59 @@ def manage_branches(request):
         messages.error(request, 'Only super admin can manage branches.')
         return redirect('dashboard')
 
-    from django.db.models import Count, Sum
-    
-    branches = Branch.objects.all() \
-        .select_related('created_by') \
-        .prefetch_related('admins') \
-        .annotate(admin_count=Count('admins', distinct=True)) \
-        .order_by('-created_date')
-    
-    # Calculate statistics
-    total_branches = branches.count()
-    active_branches = branches.filter(is_active=True).count()
-    inactive_branches = total_branches - active_branches
-    main_branches = branches.filter(branch_type='main').count()
-    sub_branches = branches.filter(branch_type='sub').count()
-    
-    # Financial statistics
-    total_allocated = Branch.objects.filter(is_active=True).aggregate(
-        total=Sum('allocated_funds')
-    )['total'] or Decimal('0')
-    
+    branches = Branch.objects.select_related('created_by').prefetch_related('admins').annotate(
+        admin_count=Count('admins', distinct=True),
+        # Sum of the balance shards: one indexed lookup instead of get_balance() per row
+        current_balance=Coalesce(Subquery(
+            BranchBalanceShard.objects.filter(branch=OuterRef('pk')).order_by().values('branch').annotate(
+                total=Sum('balance')).values('total')
+        ), 0, output_field=MoneyField()),
+    )
+
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        branches = branches.filter(
+            Q(name__icontains=search_query) | Q(location__icontains=search_query) | Q(state__icontains=search_query)
+        )
+    type_filter = request.GET.get('type')
+    if type_filter in ('main', 'sub'):
+        branches = branches.filter(branch_type=type_filter)
+    status_filter = request.GET.get('status')
+    if status_filter in ('active', 'inactive'):
+        branches = branches.filter(is_active=status_filter == 'active')
+    ordering = {
+        'name': ('name',),
+        'balance': ('-current_balance', 'name'),
+        'allocated': ('-allocated_funds', 'name'),
+    }.get(request.GET.get('sort'), ('-created_date',))
+    page = Paginator(branches.order_by(*ordering, 'id'), 25).get_page(request.GET.get('page'))
+
+    # Headline statistics in one conditional aggregate
+    stats = Branch.objects.aggregate(
+        total_branches=Count('id'),
+        active_branches=Count('id', filter=Q(is_active=True)),
+        main_branches=Count('id', filter=Q(branch_type='main')),
+        sub_branches=Count('id', filter=Q(branch_type='sub')),
+        total_allocated=Sum('allocated_funds', filter=Q(is_active=True)),
+    )
+
     # Total balance across all branches
-    total_balance = Decimal('0')
-    for branch in branches.filter(is_active=True):
-        total_balance += branch.get_balance()
-    
+    totals = Transaction.objects.active().totals()
+    total_balance = totals['income'] - totals['expenditure']
+
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
     context = {
-        'branches': branches,
-        'total_branches': total_branches,
-        'active_branches': active_branches,
-        'inactive_branches': inactive_branches,
-        'main_branches': main_branches,
-        'sub_branches': sub_branches,
-        'total_allocated': total_allocated,
+        'branches': page,
+        'page': page,
+        'query_string': query_params.urlencode(),
+        'total_branches': stats['total_branches'],
+        'active_branches': stats['active_branches'],
+        'inactive_branches': stats['total_branches'] - stats['active_branches'],
+        'main_branches': stats['main_branches'],
+        'sub_branches': stats['sub_branches'],
+        'total_allocated': stats['total_allocated'] or Decimal('0'),
         'total_balance': total_balance,
     }
     
@@ -327,21 +501,23 @@ def assign_branch_admin(request, branch_id=None, user_id=None):
         if user_id:
             # User is pre-selected, get branches from POST
             selected_branches = request.POST.getlist('branches')
-            
-            # Clear all existing branch assignments for this user
-            pre_selected_user.managed_branches.clear()
-            
-            # Add new assignments
+
+            # Replace this user's assignments (a single row of the matrix)
             if selected_branches:
+                branches_assigned = list(Branch.objects.filter(
+                    id__in=[branch_id_str for branch_id_str in selected_branches if branch_id_str.isdigit()],
+                    is_active=True,
+                ).order_by('name').values_list('id', 'name'))
+            else:
                 branches_assigned = []
-                for branch_id_str in selected_branches:
-                    try:
-                        branch = Branch.objects.get(id=branch_id_str, is_active=True)
-                        branch.admins.add(pre_selected_user)
-                        branches_assigned.append(branch.name)
-                    except Branch.DoesNotExist:
-                        pass
-                
+            assignments.assign(
+                [pre_selected_user.id],
+                Branch.objects.values_list('id', flat=True),
+                [(pre_selected_user.id, branch_pk) for branch_pk, _ in branches_assigned],
+            )
+
+            if selected_branches:
+                branches_assigned = [name for _, name in branches_assigned]
                 if branches_assigned:
                     branch_names = ', '.join(branches_assigned)
                     messages.success(request, f'User "{pre_selected_user.get_full_name()}" assigned to branches: {branch_names}')
@@ -365,13 +541,15 @@ def assign_branch_admin(request, branch_id=None, user_id=None):
                 branch = form.cleaned_data['branch']
                 admins = form.cleaned_data['admins']
 
-                # Clear existing assignments for this branch
-                branch.admins.clear()
+                # Replace this branch's admins (a single column of the matrix)
+                admin_ids = [admin.id for admin in admins]
+                assignments.assign(
+                    set(branch.admins.values_list('id', flat=True)) | set(admin_ids),
+                    [branch.id],
+                    [(admin_id, branch.id) for admin_id in admin_ids],
+                )
 
-                # Add new assignments
                 if admins:
-                    for admin in admins:
-                        branch.admins.add(admin)
                     admin_names = ', '.join([admin.get_full_name() for admin in admins])
                     messages.success(request, f'Admins ({admin_names}) assigned to "{branch.name}" successfully!')
                 else:
@@ -458,55 +636,64 @@ def allocate_funds(request, branch_id=None):
             fund_allocation.from_branch = main_branch
             fund_allocation.allocated_by = request.user
 
-            # Update branch allocated funds
+            # All or nothing: the main branch's debit can still be refused
+            # (InsufficientFunds) if a concurrent allocation spent the funds.
             to_branch = fund_allocation.to_branch
-            to_branch.allocated_funds += fund_allocation.amount
-            to_branch.save()
-
-            fund_allocation.save()
-
-            # Get or create default categories for fund allocation
-            income_category, created = IncomeCategory.objects.get_or_create(
-                name='Fund Allocation',
-                defaults={
-                    'description': 'Funds allocated from main branch',
-                    'scope': 'all',
-                    'created_by': request.user
-                }
-            )
-
-            expenditure_category, created = ExpenditureCategory.objects.get_or_create(
-                name='Fund Allocation',
-                defaults={
-                    'description': 'Funds allocated to sub branches',
-                    'scope': 'all',
-                    'created_by': request.user
-                }
-            )
-
-            # Create income transaction for receiving branch
-            Transaction.objects.create(
-                branch=to_branch,
-                transaction_type='income',
-                amount=fund_allocation.amount,
-                description=f'Fund allocation received from {main_branch.name}: {fund_allocation.description}',
-                date=fund_allocation.allocated_date.date(),
-                income_category=income_category,
-                fund_allocation=fund_allocation,
-                created_by=request.user
-            )
-
-            # Create expenditure transaction for main branch (deduction)
-            Transaction.objects.create(
-                branch=main_branch,
-                transaction_type='expenditure',
-                amount=fund_allocation.amount,
-                description=f'Fund allocation to {to_branch.name}: {fund_allocation.description}',
-                date=fund_allocation.allocated_date.date(),
-                expenditure_category=expenditure_category,
-                fund_allocation=fund_allocation,
-                created_by=request.user
-            )
+            try:
+                with db_transaction.atomic():
+                    # Update branch allocated funds
+                    to_branch.allocated_funds += fund_allocation.amount
+                    to_branch.save()
+
+                    fund_allocation.save()
+
+                    # Get or create default categories for fund allocation
+                    income_category, created = IncomeCategory.objects.get_or_create(
+                        name='Fund Allocation',
+                        defaults={
+                            'description': 'Funds allocated from main branch',
+                            'scope': 'all',
+                            'created_by': request.user
+                        }
+                    )
+
+                    expenditure_category, created = ExpenditureCategory.objects.get_or_create(
+                        name='Fund Allocation',
+                        defaults={
+                            'description': 'Funds allocated to sub branches',
+                            'scope': 'all',
+                            'created_by': request.user
+                        }
+                    )
+
+                    # Create income transaction for receiving branch
+                    Transaction.objects.create(
+                        branch=to_branch,
+                        transaction_type='income',
+                        amount=fund_allocation.amount,
+                        description=f'Fund allocation received from {main_branch.name}: {fund_allocation.description}',
+                        date=fund_allocation.allocated_date.date(),
+                        income_category=income_category,
+                        fund_allocation=fund_allocation,
+                        created_by=request.user
+                    )
+
+                    # Create expenditure transaction for main branch (deduction)
+                    Transaction.objects.create(
+                        branch=main_branch,
+                        transaction_type='expenditure',
+                        amount=fund_allocation.amount,
+                        description=f'Fund allocation to {to_branch.name}: {fund_allocation.description}',
+                        date=fund_allocation.allocated_date.date(),
+                        expenditure_category=expenditure_category,
+                        fund_allocation=fund_allocation,
+                        created_by=request.user
+                    )
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                if branch_id:
+                    return redirect('allocate_funds_with_branch', branch_id=branch_id)
+                return redirect('allocate_funds')
 
             messages.success(request, f'₦{fund_allocation.amount:,.2f} allocated to "{to_branch.name}" successfully!')
             
@@ -542,15 +729,28 @@ def allocate_funds(request, branch_id=None):
 
 
 @login_required
+@read_replica
 def fund_allocations(request):
     if request.user.user_type != 'super_admin':
         messages.error(request, 'Only super admin can view fund allocations.')
         return redirect('dashboard')
 
-    allocations = FundAllocation.objects.select_related(
-        'from_branch', 'to_branch', 'allocated_by'
-    ).order_by('-allocated_date')
-    return render(request, 'fund_allocations.html', {'allocations': allocations})
+    allocations = reporting.allocation_list(request.GET)
+    page = Paginator(allocations, 50).get_page(request.GET.get('page'))
+
+    # Keep the filters on the pagination links
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
+    context = {
+        'allocations': page,
+        'page': page,
+        'totals': reporting.allocation_totals(allocations),
+        'branch_summary': reporting.allocation_branch_summary(allocations),
+        'branches': Branch.objects.filter(is_active=True).order_by('name'),
+        'query_string': query_params.urlencode(),
+    }
+    return render(request, 'fund_allocations.html', context)
 
 
 @login_required
@@ -598,66 +798,69 @@ def reverse_fund_allocation(request, allocation_id):
             )
             return redirect('fund_allocations')
         
-        # Create the reversal allocation record
-        reversal_allocation = FundAllocation.objects.create(
-            from_branch=sub_branch,  # Reversed: now from sub to main
-            to_branch=main_branch,   # Reversed: now to main
-            amount=amount,
-            description=f"REVERSAL of allocation #{original_allocation.id}: {original_allocation.description}",
-            allocated_by=request.user,
-            is_active=True
-        )
-        
-        # Get or create reversal categories
-        income_category, _ = IncomeCategory.objects.get_or_create(
-            name='Fund Allocation Reversal',
-            defaults={
-                'description': 'Reversal of fund allocations',
-                'scope': 'all',
-                'created_by': request.user
-            }
-        )
+        # All or nothing: the sub-branch debit can still be refused (InsufficientFunds)
+        with db_transaction.atomic():
+            # Create the reversal allocation record
+            reversal_allocation = FundAllocation.objects.create(
+                from_branch=sub_branch,  # Reversed: now from sub to main
+                to_branch=main_branch,   # Reversed: now to main
+                amount=amount,
+                description=f"REVERSAL of allocation #{original_allocation.id}: {original_allocation.description}",
+                allocated_by=request.user,
+                is_active=True
+            )
         
-        expenditure_category, _ = ExpenditureCategory.objects.get_or_create(
-            name='Fund Allocation Reversal',
-            defaults={
-                'description': 'Reversal of fund allocations',
-                'scope': 'all',
-                'created_by': request.user
-            }
-        )
+            # Get or create reversal categories
+            income_category, _ = IncomeCategory.objects.get_or_create(
+                name='Fund Allocation Reversal',
+                defaults={
+                    'description': 'Reversal of fund allocations',
+                    'scope': 'all',
+                    'created_by': request.user
+                }
+            )
         
-        # Create EXPENDITURE transaction for sub-branch (money leaving)
-        Transaction.objects.create(
-            branch=sub_branch,
-            transaction_type='expenditure',
-            amount=amount,
-            description=f"REVERSAL: Returning ₦{amount:,.2f} to {main_branch.name} (Original allocation #{original_allocation.id})",
-            date=timezone.now().date(),
-            expenditure_category=expenditure_category,
-            fund_allocation=reversal_allocation,
-            created_by=request.user
-        )
+            expenditure_category, _ = ExpenditureCategory.objects.get_or_create(
+                name='Fund Allocation Reversal',
+                defaults={
+                    'description': 'Reversal of fund allocations',
+                    'scope': 'all',
+                    'created_by': request.user
+                }
+            )
         
-        # Create INCOME transaction for main branch (money returning)
-        Transaction.objects.create(
-            branch=main_branch,
-            transaction_type='income',
-            amount=amount,
-            description=f"REVERSAL: Funds returned from {sub_branch.name} (Original allocation #{original_allocation.id})",
-            date=timezone.now().date(),
-            income_category=income_category,
-            fund_allocation=reversal_allocation,
-            created_by=request.user
-        )
+            # Update allocated funds on sub-branch before posting: the postings
+            # share-lock the branch row, which this update could not then take.
+            sub_branch.allocated_funds -= amount
+            sub_branch.save()
+
+            # Create EXPENDITURE transaction for sub-branch (money leaving)
+            Transaction.objects.create(
+                branch=sub_branch,
+                transaction_type='expenditure',
+                amount=amount,
+                description=f"REVERSAL: Returning ₦{amount:,.2f} to {main_branch.name} (Original allocation #{original_allocation.id})",
+                date=timezone.now().date(),
+                expenditure_category=expenditure_category,
+                fund_allocation=reversal_allocation,
+                created_by=request.user
+            )
         
-        # Update allocated funds on sub-branch
-        sub_branch.allocated_funds -= amount
-        sub_branch.save()
+            # Create INCOME transaction for main branch (money returning)
+            Transaction.objects.create(
+                branch=main_branch,
+                transaction_type='income',
+                amount=amount,
+                description=f"REVERSAL: Funds returned from {sub_branch.name} (Original allocation #{original_allocation.id})",
+                date=timezone.now().date(),
+                income_category=income_category,
+                fund_allocation=reversal_allocation,
+                created_by=request.user
+            )
         
-        # Mark original allocation as inactive (reversed)
-        original_allocation.is_active = False
-        original_allocation.save()
+            # Mark original allocation as inactive (reversed)
+            original_allocation.is_active = False
+            original_allocation.save()
         
         messages.success(request, 
             f"✅ Fund Allocation Reversed Successfully!\n\n"
@@ -667,6 +870,8 @@ def reverse_fund_allocation(request, allocation_id):
         
     except FundAllocation.DoesNotExist:
         messages.error(request, 'Allocation not found.')
+    except ValidationError as e:
+        messages.error(request, f'Error reversing allocation: {e.messages[0]}')
     except Exception as e:
         messages.error(request, f'Error reversing allocation: {str(e)}')
     
@@ -698,64 +903,47 @@ def delete_fund_allocation(request, allocation_id):
 
 
 @login_required
+@read_replica
 def transactions(request):
+    transactions_list = reporting.transaction_list(request.user, request.GET)
+    if transactions_list is None:
+        messages.error(request, 'No branch assigned to your account.')
+        return redirect('dashboard')
     if request.user.user_type == 'super_admin':
-        transactions_list = Transaction.objects.select_related(
-            'branch', 'created_by', 'income_category', 'expenditure_category'
-        ).filter(branch__is_active=True)
         branches = Branch.objects.filter(is_active=True).order_by('name')
     else:
-        branch = request.user.managed_branch
-        if not branch:
-            messages.error(request, 'No branch assigned to your account.')
-            return redirect('dashboard')
-        transactions_list = branch.transactions.select_related(
-            'created_by', 'income_category', 'expenditure_category'
-        )
         branches = None
 
-    # Filter by branch if requested
     branch_filter = request.GET.get('branch')
-    if branch_filter and request.user.user_type == 'super_admin':
-        transactions_list = transactions_list.filter(branch_id=branch_filter)
-
-    # Filter by type
     type_filter = request.GET.get('type')
-    if type_filter:
-        transactions_list = transactions_list.filter(transaction_type=type_filter)
-    
-    # Filter by category
     income_category_filter = request.GET.get('income_category')
     expenditure_category_filter = request.GET.get('expenditure_category')
-    if income_category_filter:
-        transactions_list = transactions_list.filter(income_category_id=income_category_filter)
-    if expenditure_category_filter:
-        transactions_list = transactions_list.filter(expenditure_category_id=expenditure_category_filter)
-
-    # Date range filter
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-    if start_date:
-        transactions_list = transactions_list.filter(date__gte=start_date)
-    if end_date:
-        transactions_list = transactions_list.filter(date__lte=end_date)
-
-    # Order by date
-    transactions_list = transactions_list.order_by('-date', '-created_date')
 
     # Calculate totals for the filtered transactions
-    total_income = transactions_list.filter(transaction_type='income').aggregate(
-        Sum('amount'))['amount__sum'] or Decimal('0')
-    total_expenditure = transactions_list.filter(transaction_type='expenditure').aggregate(
-        Sum('amount'))['amount__sum'] or Decimal('0')
+    totals = transactions_list.totals()
+    total_income = totals['income']
+    total_expenditure = totals['expenditure']
     net_balance = total_income - total_expenditure
 
     # Get categories for filter dropdowns
-    income_categories = IncomeCategory.objects.filter(is_active=True).order_by('name')
-    expenditure_categories = ExpenditureCategory.objects.filter(is_active=True).order_by('name')
-    
+    categories = list(Category.objects.filter(is_active=True).order_by('name'))
+    income_categories = [category for category in categories if category.category_type == 'income']
+    expenditure_categories = [category for category in categories if category.category_type == 'expenditure']
+
+    # Searches list the best matches first, with highlighted snippets
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        transactions_page = list(search.ranked(transactions_list, search_query)[:100])
+        for transaction in transactions_page:
+            transaction.search_highlight = search.highlight(getattr(transaction, 'search_snippet', ''))
+    else:
+        transactions_page = transactions_list[:100]  # Limit to 100 for performance
+
     context = {
-        'transactions': transactions_list[:100],  # Limit to 100 for performance
+        'transactions': transactions_page,
+        'search_query': search_query,
         'branches': branches,
         'total_income': total_income,
         'total_expenditure': total_expenditure,
@@ -772,6 +960,41 @@ def transactions(request):
     return render(request, 'transactions.html', context)
 
 
+@login_required
+@read_replica
+def branch_statement(request):
+    """Running-balance statement of one branch, a page at a time"""
+    if request.user.user_type == 'super_admin':
+        branches = Branch.objects.filter(is_active=True).order_by('name')
+        branch_filter = request.GET.get('branch')
+        branch = branches.filter(id=branch_filter).first() if branch_filter and branch_filter.isdigit() else None
+        branch = branch or branches.filter(branch_type='main').first() or branches.first()
+    else:
+        branches = None
+        branch = request.user.managed_branch
+    if not branch:
+        messages.error(request, 'No branch assigned to your account.')
+        return redirect('dashboard')
+
+    try:
+        params = reporting.parse_report_params(request.GET)
+    except ValueError:
+        messages.error(request, 'Invalid date range.')
+        return redirect('branch_statement')
+
+    page = reporting.statement_page(
+        branch, params['start_date_obj'], params['end_date_obj'], after=request.GET.get('after')
+    )
+    context = {
+        'branch': branch,
+        'branches': branches,
+        'start_date': params['start_date'],
+        'end_date': params['end_date'],
+        **page,
+    }
+    return render(request, 'statement.html', context)
+
+
 @login_required
 def add_transaction(request):
     # Check if branch admin is trying to add income (not allowed)
@@ -885,24 +1108,19 @@ def manage_categories(request):
         messages.error(request, 'Only super admin can manage categories.')
         return redirect('dashboard')
 
-    from django.db.models import Count
-    
-    # Annotate categories with transaction counts
-    income_categories = IncomeCategory.objects.select_related('branch', 'created_by')\
-        .filter(is_active=True)\
-        .annotate(transaction_count=Count('transaction'))\
-        .order_by('-transaction_count', 'name')
-    
-    expenditure_categories = ExpenditureCategory.objects.select_related('branch', 'created_by')\
+    # Both kinds share one table: one grouped query for every category's count
+    categories = Category.objects.select_related('branch', 'created_by')\
         .filter(is_active=True)\
-        .annotate(transaction_count=Count('transaction'))\
+        .annotate(transaction_count=Count('transactions'))\
         .order_by('-transaction_count', 'name')
-    
+    income_categories = [category for category in categories if category.category_type == 'income']
+    expenditure_categories = [category for category in categories if category.category_type == 'expenditure']
+
     branches = Branch.objects.filter(is_active=True).order_by('name')
     
     # Calculate statistics
-    total_income_categories = income_categories.count()
-    total_expenditure_categories = expenditure_categories.count()
+    total_income_categories = len(income_categories)
+    total_expenditure_categories = len(expenditure_categories)
     total_income_transactions = sum(cat.transaction_count for cat in income_categories)
     total_expenditure_transactions = sum(cat.transaction_count for cat in expenditure_categories)
 
@@ -1048,14 +1266,14 @@ def delete_income_category(request, category_id):
     if request.method == 'POST':
         category_name = category.name
         # Check if category is used in transactions (including fund allocation transactions)
-        transaction_count = Transaction.objects.filter(income_category=category).count()
-        
+        usage = category.transactions.aggregate(
+            total=Count('id'), allocations=Count('id', filter=Q(fund_allocation__isnull=False))
+        )
+        transaction_count = usage['total']
+
         if transaction_count > 0:
             # Check if any are fund allocation transactions
-            fund_allocation_count = Transaction.objects.filter(
-                income_category=category, 
-                fund_allocation__isnull=False
-            ).count()
+            fund_allocation_count = usage['allocations']
             regular_count = transaction_count - fund_allocation_count
             
             error_msg = f"❌ Cannot Delete Income Category!\n\n" \
@@ -1092,14 +1310,14 @@ def delete_expenditure_category(request, category_id):
     if request.method == 'POST':
         category_name = category.name
         # Check if category is used in transactions (including fund allocation transactions)
-        transaction_count = Transaction.objects.filter(expenditure_category=category).count()
-        
+        usage = category.transactions.aggregate(
+            total=Count('id'), allocations=Count('id', filter=Q(fund_allocation__isnull=False))
+        )
+        transaction_count = usage['total']
+
         if transaction_count > 0:
             # Check if any are fund allocation transactions
-            fund_allocation_count = Transaction.objects.filter(
-                expenditure_category=category, 
-                fund_allocation__isnull=False
-            ).count()
+            fund_allocation_count = usage['allocations']
             regular_count = transaction_count - fund_allocation_count
             
             error_msg = f"❌ Cannot Delete Expenditure Category!\n\n" \
@@ -1165,30 +1383,32 @@ def delete_branch(request, branch_id):
         return redirect('manage_branches')
 
     if request.method == 'POST':
-        branch_name = branch.name
-        transaction_count = branch.transactions.count()
-        
         try:
-            branch.delete()
-            messages.success(request, 
-                f'Branch "{branch_name}" deleted successfully!\n'
-                f'{transaction_count} transaction(s) were also deleted.'
-            )
-        except Exception as e:
-            messages.error(request, f'Error deleting branch: {str(e)}')
-        
+            deletion.check_branch(branch.id)
+        except ValidationError as e:
+            # Other branches' postings in its categories include a closed fiscal period
+            messages.error(request, f'Cannot delete branch "{branch.name}". {e.messages[0]}')
+            return redirect('manage_branches')
+        # Hidden at once; its transactions are removed in chunks by a background job
+        job = deletion.start(branch, request.user)
+        messages.success(request,
+            f'Branch "{branch.name}" is being deleted (job #{job.id}). '
+            f'It is hidden until its transactions have been removed.'
+        )
         return redirect('manage_branches')
 
     # Check for related data for confirmation page
     transaction_count = branch.transactions.count()
+    category_transaction_count = deletion.category_transactions(branch.id).count()
 
     return render(request, 'confirm_delete.html', {
         'object_name': f'Branch "{branch.name}"',
         'object_type': 'branch',
         'related_data': {
             'Transactions': transaction_count,
+            "Other branches' transactions in its categories": category_transaction_count,
         },
-        'warning': 'Deleting this branch will also delete all related transactions.',
+        'warning': 'Deleting this branch will also delete all related transactions. It is hidden at once and removed in the background.',
         'delete_url': request.path
     })
 
@@ -1207,8 +1427,18 @@ def delete_user(request, user_id):
 
     if request.method == 'POST':
         user_name = user.get_full_name()
-        user.delete()
-        messages.success(request, f'User "{user_name}" deleted successfully!')
+        try:
+            deletion.check_user(user.id)
+        except ValidationError as e:
+            # Their transactions include postings in a closed fiscal period
+            messages.error(request, f'Cannot delete user "{user_name}". {e.messages[0]}')
+            return redirect('manage_users')
+        # Hidden at once; their transactions are removed in chunks by a background job
+        job = deletion.start(user, request.user)
+        messages.success(request,
+            f'User "{user_name}" is being deleted (job #{job.id}). '
+            f'They are hidden until their transactions have been removed.'
+        )
         return redirect('manage_users')
 
     # Check for related data
@@ -1222,7 +1452,7 @@ def delete_user(request, user_id):
             'Transactions': transaction_count,
             'Managed Branches': branch_count,
         },
-        'warning': 'Deleting this user will transfer their created transactions to your account.',
+        'warning': 'Deleting this user will also delete the transactions they created. They are hidden at once and removed in the background.',
         'delete_url': request.path
     })
 
@@ -1301,168 +1531,353 @@ def reset_user_password(request, user_id):
 
 
 @login_required
+@read_replica
 def reports(request):
-    from datetime import datetime, timedelta
-    from django.db.models import Count, Avg
-    
-    # Get date range filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    report_type = request.GET.get('report_type', 'overview')
-    branch_filter = request.GET.get('branch')
-    
-    # Default to current month if no dates provided
-    if not start_date:
-        start_date = datetime.now().replace(day=1).strftime('%Y-%m-%d')
-    if not end_date:
-        end_date = datetime.now().strftime('%Y-%m-%d')
-    
-    # Convert to date objects for filtering
-    start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-    end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    # Base queryset for transactions in date range
-    transactions_qs = Transaction.objects.filter(
-        date__range=[start_date_obj, end_date_obj],
-        branch__is_active=True
+    params = reporting.parse_report_params(request.GET)
+    scope = reporting.report_scope(request.user, params)
+    queries = reporting.report_queries(request.user, params, scope)
+    results = report_cache.fetch(
+        reporting.report_cache_key(request.user, params, scope),
+        lambda: reporting.run_queries(queries),
     )
+    context = reporting.report_context(request.user, params, results)
     
-    # Filter by user type and branch
-    if request.user.user_type == 'super_admin':
-        # Super admin can see all branches or filter by specific branch
-        branches = Branch.objects.filter(is_active=True).order_by('name')
-        if branch_filter:
-            transactions_qs = transactions_qs.filter(branch_id=branch_filter)
-    else:
-        # Branch admin can only see their own branch
-        branch = request.user.managed_branch
-        if branch:
-            transactions_qs = transactions_qs.filter(branch=branch)
-        else:
-            transactions_qs = Transaction.objects.none()
-        branches = None
-    
-    # Calculate financial metrics
-    total_income = transactions_qs.filter(transaction_type='income').aggregate(
-        Sum('amount'))['amount__sum'] or Decimal('0')
-    total_expenditure = transactions_qs.filter(transaction_type='expenditure').aggregate(
-        Sum('amount'))['amount__sum'] or Decimal('0')
-    net_balance = total_income - total_expenditure
-    
-    # Transaction counts
-    income_count = transactions_qs.filter(transaction_type='income').count()
-    expenditure_count = transactions_qs.filter(transaction_type='expenditure').count()
-    total_transactions = income_count + expenditure_count
-    
-    # Calculate average transaction value
-    average_transaction_value = Decimal('0')
-    if total_transactions > 0:
-        total_amount = total_income + total_expenditure
-        average_transaction_value = total_amount / total_transactions
-    
-    # Daily transaction trends (last 30 days)
-    daily_trends = []
-    for i in range(30):
-        date = datetime.now().date() - timedelta(days=i)
-        day_income = transactions_qs.filter(
-            transaction_type='income', 
-            date=date
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        day_expenditure = transactions_qs.filter(
-            transaction_type='expenditure', 
-            date=date
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        daily_trends.append({
-            'date': date,
-            'income': day_income,
-            'expenditure': day_expenditure,
-            'net': day_income - day_expenditure
-        })
-    
-    # Top categories
-    income_categories = transactions_qs.filter(transaction_type='income').values(
-        'income_category__name'
-    ).annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')[:5]
-    
-    expenditure_categories = transactions_qs.filter(transaction_type='expenditure').values(
-        'expenditure_category__name'
-    ).annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')[:5]
-    
-    # Branch performance (super admin only)
-    branch_performance = []
-    if request.user.user_type == 'super_admin':
-        branches = Branch.objects.filter(is_active=True)
-        for branch in branches:
-            branch_transactions = transactions_qs.filter(branch=branch)
-            branch_income = branch_transactions.filter(transaction_type='income').aggregate(
-                Sum('amount'))['amount__sum'] or Decimal('0')
-            branch_expenditure = branch_transactions.filter(transaction_type='expenditure').aggregate(
-                Sum('amount'))['amount__sum'] or Decimal('0')
-            branch_performance.append({
-                'branch': branch,
-                'income': branch_income,
-                'expenditure': branch_expenditure,
-                'net': branch_income - branch_expenditure,
-                'transaction_count': branch_transactions.count()
-            })
-    
-    # Recent transactions
-    recent_transactions = transactions_qs.select_related(
-        'branch', 'created_by', 'income_category', 'expenditure_category'
-    ).order_by('-created_date')[:10]
-    
-    # Monthly comparison (current vs previous month)
-    current_month_start = datetime.now().replace(day=1).date()
-    previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-    previous_month_end = current_month_start - timedelta(days=1)
-    
-    current_month_income = transactions_qs.filter(
-        transaction_type='income',
-        date__gte=current_month_start
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-    
-    previous_month_income = Transaction.objects.filter(
-        transaction_type='income',
-        date__range=[previous_month_start, previous_month_end],
-        branch__is_active=True
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-    
-    income_growth = 0
-    if previous_month_income > 0:
-        income_growth = ((current_month_income - previous_month_income) / previous_month_income) * 100
-    
-    context = {
-        'start_date': start_date,
-        'end_date': end_date,
-        'report_type': report_type,
-        'branches': branches,
-        'selected_branch': branch_filter,
-        'total_income': total_income,
-        'total_expenditure': total_expenditure,
-        'net_balance': net_balance,
-        'income_count': income_count,
-        'expenditure_count': expenditure_count,
-        'total_transactions': total_transactions,
-        'average_transaction_value': average_transaction_value,
-        'daily_trends': daily_trends,
-        'income_categories': income_categories,
-        'expenditure_categories': expenditure_categories,
-        'branch_performance': branch_performance,
-        'recent_transactions': recent_transactions,
-        'current_month_income': current_month_income,
-        'previous_month_income': previous_month_income,
-        'income_growth': income_growth,
+    return render(request, 'reports.html', context)
+
+
+@login_required
+@read_replica
+async def reports_async(request):
+    """
+    Async reports: the independent aggregates run concurrently on the
+    aggregate thread pool and the page is rendered once.
+    """
+    user = await request.auser()
+    params = reporting.parse_report_params(request.GET)
+    scope = await sync_to_async(reporting.report_scope)(user, params)
+    queries = reporting.report_queries(user, params, scope)
+    # The cache may block while an identical request computes; keep that off the event loop.
+    results = await sync_to_async(report_cache.fetch, thread_sensitive=False)(
+        reporting.report_cache_key(user, params, scope),
+        lambda: async_to_sync(reporting.arun_queries)(queries),
+    )
+    context = reporting.report_context(user, params, results)
+
+    return await sync_to_async(render)(request, 'reports.html', context)
+
+
+@login_required
+def save_report(request):
+    if request.method != 'POST':
+        return redirect('reports')
+
+    form = SavedReportForm(request.POST, user=request.user)
+    if form.is_valid():
+        saved_report = form.save(commit=False)
+        saved_report.created_by = request.user
+        if saved_report.range_type != 'custom':
+            # Relative ranges are resolved each time the report is computed
+            saved_report.start_date = saved_report.end_date = None
+        try:
+            saved_report.clean()
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('reports')
+        saved_report.save()
+        messages.success(request, f'Report "{saved_report.name}" saved successfully!')
+        return redirect('saved_report', report_id=saved_report.id)
+
+    for field, errors in form.errors.items():
+        for error in errors:
+            messages.error(request, error)
+    return redirect('reports')
+
+
+@login_required
+def saved_reports_list(request):
+    reports_list = SavedReport.objects.filter(created_by=request.user).select_related('branch', 'result')
+    return render(request, 'saved_reports.html', {'saved_reports': reports_list})
+
+
+@login_required
+def saved_report(request, report_id):
+    """Open a saved report: one row fetch of its materialized result"""
+    result = SavedReportResult.objects.select_related('saved_report').filter(
+        saved_report_id=report_id, saved_report__created_by=request.user
+    ).first()
+    if result is None:
+        # Not materialized yet: compute it now
+        saved = get_object_or_404(SavedReport, id=report_id, created_by=request.user)
+        result = saved_reports.materialize(saved)
+
+    context = dict(result.payload)
+    context['saved_report'] = result.saved_report
+    context['computed_at'] = result.computed_at
+    return render(request, 'reports.html', context)
+
+
+@login_required
+def refresh_saved_report(request, report_id):
+    saved = get_object_or_404(SavedReport, id=report_id, created_by=request.user)
+    if request.method == 'POST':
+        saved_reports.materialize(saved)
+        messages.success(request, f'Report "{saved.name}" refreshed.')
+    return redirect('saved_report', report_id=saved.id)
+
+
+@login_required
+def delete_saved_report(request, report_id):
+    saved = get_object_or_404(SavedReport, id=report_id, created_by=request.user)
+    if request.method == 'POST':
+        saved.delete()
+        messages.success(request, f'Report "{saved.name}" deleted successfully!')
+    return redirect('saved_reports')
+
+
+def _get_job(request, job_id):
+    job = get_object_or_404(Job, id=job_id)
+    if job.created_by_id != request.user.id and request.user.user_type != 'super_admin':
+        raise Http404
+    return job
+
+
+def _job_data(job):
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'created_date': job.created_date,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
     }
-    
+    if job.status == 'succeeded':
+        if job.result_file:
+            data['download_url'] = reverse('job_download', args=[job.id])
+        if job.kind == 'report':
+            data['result_url'] = reverse('job_result', args=[job.id])
+    summary = _job_summary(job.kind, job.status, job.result)
+    if summary:
+        data['summary'] = summary
+    return data
+
+
+def _import_summary(result):
+    if result.get('errors'):
+        return f"Nothing imported: {len(result['errors'])} row(s) no longer valid"
+    return f"{result['created']} admins created, {result['assigned']} branch links"
+
+
+def _deletion_summary(result):
+    if result.get('cancelled'):
+        return f"Cancelled: {result['cancelled']}"
+    if result.get('running'):
+        return f"{result['transactions']} transactions deleted so far"
+    return f"Deleted with {result['transactions']} transactions"
+
+
+_JOB_SUMMARIES = {
+    'import_branch_admins': _import_summary,
+    'delete_branch': _deletion_summary,
+    'delete_user': _deletion_summary,
+}
+
+
+def _job_summary(kind, status, result):
+    """One line describing a job's result (or progress) for the kinds that report one"""
+    if kind in _JOB_SUMMARIES and status in ('running', 'succeeded') and result:
+        return _JOB_SUMMARIES[kind](result)
+    return ''
+
+
+@login_required
+def run_report_job(request):
+    """Queue the current reports page (its query string) as a background job"""
+    if request.method != 'POST':
+        return redirect('reports')
+    params = {key: request.POST.get(key, '') for key in ('start_date', 'end_date', 'report_type', 'branch', 'as_of')}
+    job = jobs.enqueue('report', request.user, params)
+    messages.success(request, f'Report queued as job #{job.id}. It will appear here when ready.')
+    return redirect('jobs')
+
+
+@login_required
+def export_report_xlsx(request):
+    """Queue an Excel workbook of the reports page with its current filters"""
+    if request.method != 'POST':
+        return redirect('reports')
+    params = {key: request.POST.get(key, '') for key in ('start_date', 'end_date', 'branch')}
+    job = jobs.enqueue('report_xlsx', request.user, params)
+    messages.success(request, f'Excel export queued as job #{job.id}. Download it here when ready.')
+    return redirect('jobs')
+
+
+@login_required
+def export_transactions(request):
+    """Queue a CSV export of the transactions page with its current filters"""
+    if request.method != 'POST':
+        return redirect('transactions')
+    params = {key: request.POST[key] for key in reporting.TRANSACTION_FILTERS if request.POST.get(key)}
+    job = jobs.enqueue('transactions_csv', request.user, params)
+    messages.success(request, f'Export queued as job #{job.id}. Download it here when ready.')
+    return redirect('jobs')
+
+
+def _pdf_or_job(request, kind, params):
+    """The stored PDF when this version exists, otherwise queue it for rendering"""
+    if default_storage.exists(params['path']):
+        return FileResponse(default_storage.open(params['path'], 'rb'), as_attachment=True,
+                            filename=os.path.basename(params['path']))
+    job = jobs.enqueue(kind, request.user, params)
+    messages.success(request, f'PDF queued as job #{job.id}. Download it here when ready.')
+    return redirect('jobs')
+
+
+@login_required
+def statement_pdf(request):
+    """Branch statement PDF for the transactions page's branch and date range"""
+    if request.method != 'POST':
+        return redirect('transactions')
+    try:
+        params = statements.statement_params(request.user, request.POST)
+    except ValueError:
+        params = None
+    if params is None:
+        messages.error(request, 'Invalid statement request.')
+        return redirect('transactions')
+    return _pdf_or_job(request, 'statement_pdf', params)
+
+
+@login_required
+def report_pdf(request):
+    """PDF export of the reports page as currently filtered"""
+    if request.method != 'POST':
+        return redirect('reports')
+    try:
+        params = statements.report_params(request.user, request.POST)
+    except ValueError:
+        params = None
+    if params is None:
+        messages.error(request, 'Invalid report request.')
+        return redirect('reports')
+    return _pdf_or_job(request, 'report_pdf', params)
+
+
+@login_required
+def jobs_list(request):
+    jobs_qs = list(Job.objects.filter(created_by=request.user).defer('params', 'result')[:50])
+    # Results can be large (report payloads); load only the ones summarized here.
+    results = dict(Job.objects.filter(
+        pk__in=[job.pk for job in jobs_qs if job.kind in _JOB_SUMMARIES]
+    ).values_list('pk', 'result'))
+    for job in jobs_qs:
+        job.summary = _job_summary(job.kind, job.status, results.get(job.pk))
+    return render(request, 'jobs.html', {'jobs': jobs_qs})
+
+
+@login_required
+def job_status(request, job_id):
+    return JsonResponse({'success': True, 'job': _job_data(_get_job(request, job_id))}, encoder=DjangoJSONEncoder)
+
+
+@login_required
+def job_download(request, job_id):
+    job = _get_job(request, job_id)
+    # Stored PDFs are deleted once a newer version of the document is rendered.
+    if job.status != 'succeeded' or not job.result_file or not default_storage.exists(job.result_file.name):
+        raise Http404
+    return FileResponse(job.result_file.open('rb'), as_attachment=True,
+                        filename=os.path.basename(job.result_file.name))
+
+
+@login_required
+def job_result(request, job_id):
+    job = _get_job(request, job_id)
+    if job.status != 'succeeded' or job.kind != 'report':
+        raise Http404
+    context = dict(job.result)
+    context['computed_at'] = job.finished_at
     return render(request, 'reports.html', context)
 
 
+@login_required
+def report_cache_stats(request):
+    if request.user.user_type != 'super_admin':
+        return JsonResponse({'success': False, 'message': 'Unauthorized access'}, status=403)
+
+    if request.method == 'POST' and request.POST.get('reset'):
+        report_cache.reset_stats()
+    return JsonResponse({'success': True, 'stats': report_cache.stats()})
+
+
+@login_required
+@read_replica
+def reports_cube(request):
+    """
+    JSON drill-down over the ledger cube, e.g.
+    ?group_by=branch,category,month&type=expenditure&start_month=2025-01
+    """
+    try:
+        data = reporting.cube_drilldown(request.user, request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'success': True, **data}, encoder=DjangoJSONEncoder)
+
+
+@login_required
+def fiscal_periods(request):
+    if request.user.user_type != 'super_admin':
+        messages.error(request, 'Only super admin can manage fiscal periods.')
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        form = FiscalPeriodForm(request.POST)
+        if form.is_valid():
+            # The form has already run FiscalPeriod.clean (dates and overlaps).
+            period = form.save(commit=False)
+            period.created_by = request.user
+            period.save()
+            messages.success(request, f'Fiscal period "{period.name}" created successfully!')
+            return redirect('fiscal_periods')
+        else:
+            for field, errors in form.errors.items():
+                for error in errors:
+                    messages.error(request, error)
+    else:
+        form = FiscalPeriodForm()
+
+    return render(request, 'fiscal_periods.html', {
+        'form': form,
+        'periods': FiscalPeriod.objects.select_related('closed_by'),
+        'closed_through': FiscalPeriod.closed_through(),
+    })
+
+
+@login_required
+def close_fiscal_period(request, period_id):
+    """
+    Close a fiscal period - super admin only
+
+    Snapshots the period's per-branch and per-category totals and freezes
+    every transaction dated on or before its end date. This cannot be undone.
+    """
+    if request.user.user_type != 'super_admin':
+        messages.error(request, 'Only super admin can close fiscal periods.')
+        return redirect('dashboard')
+
+    period = get_object_or_404(FiscalPeriod, id=period_id)
+    if request.method == 'POST':
+        try:
+            periods.close_period(period, request.user)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(request, f'Fiscal period "{period.name}" closed. Its transactions are now locked.')
+    return redirect('fiscal_periods')
+
+
 @login_required
 def edit_transaction(request, transaction_id):
     """
@@ -1520,6 +1935,12 @@ def edit_transaction(request, transaction_id):
         return JsonResponse(data)
     
     elif request.method == 'POST':
+        # BLOCK editing postings in (or moving them into) a closed fiscal period
+        try:
+            FiscalPeriod.check_open(transaction.date, request.POST.get('date'))
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'message': f"❌ Period Closed!\n\n{e.messages[0]}"}, status=403)
+
         # Update transaction with validation to prevent negative balances
         try:
             old_amount = transaction.amount
@@ -1635,6 +2056,12 @@ def delete_transaction(request, transaction_id):
                 )
             }, status=403)
         
+        # BLOCK deletion of postings in a closed fiscal period
+        try:
+            FiscalPeriod.check_open(transaction.date)
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'message': f"❌ Period Closed!\n\n{e.messages[0]}"}, status=403)
+
         # VALIDATE: Check if deleting this transaction would cause negative balance
         branch = transaction.branch
         current_balance = branch.get_balance()